@@ -1,6 +1,5 @@
 # Create your views here.
 
-from functools import lru_cache
 from typing import Any, Literal, cast, overload
 
 from django.contrib import messages
@@ -23,6 +22,7 @@ from nomnom.nominate.decorators import (
     user_passes_test_or_forbidden,
 )
 from nomnom.nominate.models import NominatingMemberProfile
+from nomnom.view_utils import request_cached
 
 from . import forms, models
 
@@ -107,7 +107,7 @@ class Vote(WaffleSwitchMixin, FormView):
     context_object_name = "vote"
     form_class = forms.VoteForm
 
-    @lru_cache
+    @request_cached
     def get_profile(self) -> NominatingMemberProfile:
         return get_profile(self.request, deny=True)
 
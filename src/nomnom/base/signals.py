@@ -1,3 +1,11 @@
 from django.dispatch import Signal
 
 index_content_load = Signal()
+
+# sent with `category_ids` when an administrator changes the validity of
+# nominations in bulk.
+nomination_validity_changed = Signal()
+
+# sent with `category_ids` and `changed_nomination_ids` when a member's ballot
+# save removes nominations or replaces their text.
+nominations_changed = Signal()
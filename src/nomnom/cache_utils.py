@@ -0,0 +1,25 @@
+import time
+
+from django.core.cache import cache
+
+
+def version_token(key: str) -> str:
+    """The current version token stored at `key`, making one if there is none.
+
+    Cached content is keyed by the token, and is replaced by changing it. The
+    token is a timestamp rather than a counter, so losing it from the cache is
+    harmless: a new one is made, and the content is built again.
+    """
+    version = cache.get(key)
+    if version is None:
+        version = str(time.time_ns())
+        if not cache.add(key, version, timeout=None):
+            # someone else got there first
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_version_token(key: str) -> None:
+    """Replace the version token at `key`, invalidating what was cached by it."""
+    cache.set(key, str(time.time_ns()), timeout=None)
@@ -1,8 +1,8 @@
 import csv
-import functools
 import io
+import time
 from collections import Counter
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from itertools import groupby
 from typing import Any
 from urllib.parse import urlencode
@@ -11,12 +11,15 @@ import sentry_sdk
 from django import forms
 from django.contrib import admin, messages
 from django.contrib.auth.decorators import permission_required, user_passes_test
-from django.db import IntegrityError, transaction
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
 from django.db.models import Count, F, Q, QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django_admin_action_forms import (
@@ -24,12 +27,15 @@ from django_admin_action_forms import (
     AdminActionFormsMixin,
     action_with_form,
 )
+from markdown import markdown
 from waffle.decorators import waffle_switch
 
 from nomnom.canonicalize import models
 from nomnom.canonicalize.feature_switches import SWITCH_FINALIST_CSV_TABLE
 from nomnom.nominate import models as nominate
+from nomnom.nominate.templatetags.nomnom_filters import html_text
 from nomnom.reporting import Report, ReportView
+from nomnom.view_utils import request_cached
 from nomnom.wsfs.rules import eph
 from nomnom.wsfs.rules.constitution_2023 import CountData
 
@@ -153,6 +159,7 @@ def group_works(
     modeladmin: admin.ModelAdmin, request: HttpRequest, queryset: QuerySet, data: dict
 ) -> None:
     selection_type, selection_obj = data.get("work_selection")
+    queryset = queryset.select_related("category", "canonicalizednomination__work")
 
     with transaction.atomic():
         if selection_type == "work":
@@ -303,6 +310,44 @@ class CanonicalizedFilter(admin.SimpleListFilter):
             return queryset.filter(works=None)
 
 
+class EstimatedCountPaginator(Paginator):
+    """A paginator that trusts the planner's row estimate for unfiltered lists.
+
+    An exact COUNT over every raw nomination in an election is slow enough to
+    time the admin out; when nothing is filtered, the table statistics are
+    plenty for paging. Filtered lists and small tables are counted exactly.
+    """
+
+    estimate_threshold = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        query_set = self.object_list
+        if isinstance(query_set, QuerySet) and not query_set.query.where:
+            estimate = self.estimated_count(query_set)
+            if estimate >= self.estimate_threshold:
+                return estimate
+
+        return super().count
+
+    @staticmethod
+    def estimated_count(query_set: QuerySet) -> int:
+        with connections[query_set.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [query_set.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+
+        # reltuples is -1 for tables that have never been analyzed
+        return max(int(row[0]), 0) if row else 0
+
+
+def _category_display(name: str | None) -> str | None:
+    # mirrors Category.__str__, without needing the Category instance
+    return html_text(markdown(name)) if name is not None else None
+
+
 class NominationGroupingView(AdminActionFormsMixin, admin.ModelAdmin):
     model = models.CanonicalizedNomination
 
@@ -323,15 +368,32 @@ class NominationGroupingView(AdminActionFormsMixin, admin.ModelAdmin):
 
     actions = [group_works, remove_canonicalization]
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     def get_queryset(self, request: HttpRequest) -> QuerySet[nominate.Nomination]:
+        """Annotate everything the changelist displays onto the nominations.
+
+        The nomination's own category is joined, since rendering a nomination
+        needs it; the canonicalization side is flattened into annotations. A
+        page of nominations is a single query no matter how many works and
+        categories it touches."""
         self.request = request
-        return nominate.Nomination.objects.select_related(
-            "canonicalizednomination",
-            "canonicalizednomination__work",
-            "canonicalizednomination__work__category",
-            "canonicalizednomination__nomination",
-            "canonicalizednomination__nomination__category",
-        ).order_by("field_1")
+        return (
+            nominate.Nomination.objects.prefetch_related(None)
+            .select_related("category")
+            .annotate(
+                matched_work_id=F("canonicalizednomination__work_id"),
+                matched_work_name=F("canonicalizednomination__work__name"),
+                matched_work_category_id=F(
+                    "canonicalizednomination__work__category_id"
+                ),
+                matched_work_category_name=F(
+                    "canonicalizednomination__work__category__name"
+                ),
+            )
+            .order_by("field_1")
+        )
 
     @admin.display(description="Raw Nomination", ordering="field_1")
     def proposed_work_name(self, obj):
@@ -343,33 +405,36 @@ class NominationGroupingView(AdminActionFormsMixin, admin.ModelAdmin):
 
     @admin.display(description="Canonicalized?", boolean=True)
     def has_matched_work(self, obj):
-        return obj.work is not None
+        return obj.matched_work_id is not None
 
     @admin.display(description="Recategorized?", boolean=True)
     def is_recategorized(self, obj):
-        return obj.work is not None and obj.category != obj.work.category
+        return (
+            obj.matched_work_id is not None
+            and obj.category_id != obj.matched_work_category_id
+        )
 
-    @admin.display(description="Canonical Work", ordering="works__name")
+    @admin.display(description="Canonical Work", ordering="matched_work_name")
     def matched_work(self, obj):
-        if obj.work is not None:
-            link = reverse("admin:canonicalize_work_change", args=[obj.work.id])
+        if obj.matched_work_id is not None:
+            link = reverse("admin:canonicalize_work_change", args=[obj.matched_work_id])
             return format_html(
                 '<a href="{}">{}</a>',
                 link,
-                obj.work.name,
+                obj.matched_work_name,
             )
         else:
             return self.make_work_button(obj)
 
     def matched_work_category(self, obj):
-        if obj.work:
-            return obj.work.category
+        if obj.matched_work_id is not None:
+            return _category_display(obj.matched_work_category_name)
 
     def make_work_button(self, obj):
         # Create an HTTP button that triggers the canonicalize:match-work view with the selected row
-        if obj.work is None:
+        if obj.matched_work_id is None:
             action_url = reverse(
-                "canonicalize:make-work", args=[obj.category.id, obj.id]
+                "canonicalize:make-work", args=[obj.category_id, obj.id]
             )
             query_params = urlencode({"next": self.get_admin_url_with_filters()})
             full_url = f"{action_url}?{query_params}"
@@ -429,20 +494,10 @@ class BallotReport(Report):
                 "nomination",
                 "nomination__nominator",
                 "nomination__category",
-                "nomination__admin",
                 "work",
                 "work__category",
             )
-            .annotate(
-                admin_id=F("nomination__admin__id"),
-                valid=F("nomination__admin__valid_nomination"),
-            )
-            .filter(
-                work__category=self.category,
-            )
-            .filter(
-                Q(valid=True) | Q(admin_id=None),
-            )
+            .filter(work__category=self.category, nomination__is_valid=True)
             .order_by("nomination__nominator")
         )
 
@@ -464,7 +519,7 @@ class BallotReportView(ReportView):
     report_class = BallotReport
     html_template_name = "canonicalize/ballots.html"
 
-    @functools.lru_cache
+    @request_cached
     def category(self) -> nominate.Category:
         return get_object_or_404(nominate.Category, pk=self.kwargs.get("category_id"))
 
@@ -476,26 +531,167 @@ class BallotReportView(ReportView):
 @permission_required("nominate.report")
 def finalists(request: HttpRequest, category_id: int) -> HttpResponse:
     category = get_object_or_404(nominate.Category, pk=category_id)
-    ballot_builder = BallotReport(category)
-    ballot_objs = [r[1:] for r in ballot_builder.get_report_rows()]
-    ballots = [[w.name for w in ballot] for ballot in ballot_objs]
+    finalists, steps = cached_eph_result(category, "eph", run_eph)
+    return render(
+        request,
+        "canonicalize/eph.html",
+        {
+            "category": category,
+            "finalists": finalists,
+            "step_numbers": range(1, len(steps) + 1),
+        },
+    )
+
+
+EPH_STEP_DEFAULT_LIMIT = 50
+
+
+@user_passes_test(lambda u: u.is_staff, login_url="/admin/login/")
+@permission_required("nominate.report")
+def eph_step(request: HttpRequest, category_id: int, step: int) -> HttpResponse:
+    """Serve one round of the category's EPH step log.
+
+    Only the top `limit` works by points are included. htmx requests get the
+    rendered step, everything else gets JSON.
+    """
+    category = get_object_or_404(nominate.Category, pk=category_id)
+    _finalists, steps = cached_eph_result(category, "eph", run_eph)
+    if not 1 <= step <= len(steps):
+        raise Http404("No such EPH step")
+
+    try:
+        limit = max(int(request.GET.get("limit", EPH_STEP_DEFAULT_LIMIT)), 1)
+    except ValueError:
+        limit = EPH_STEP_DEFAULT_LIMIT
+
+    counts, eliminations = steps[step - 1]
+    top_counts = dict(
+        sorted(counts.items(), key=lambda item: (-item[1].points, item[0]))[:limit]
+    )
+
+    if request.htmx:
+        return render(
+            request,
+            "canonicalize/bits/eph_step.html",
+            {
+                "index": step,
+                "counts": top_counts,
+                "eliminations": eliminations,
+                "hidden_count": len(counts) - len(top_counts),
+            },
+        )
+
+    return JsonResponse(
+        {
+            "step": step,
+            "step_count": len(steps),
+            "work_count": len(counts),
+            "eliminations": eliminations,
+            "counts": [
+                {
+                    "work": work,
+                    "nominations": count_data.nominations,
+                    "ballot_count": count_data.ballot_count,
+                    "points": count_data.points,
+                }
+                for work, count_data in top_counts.items()
+            ],
+        }
+    )
+
+
+EPH_CACHE_TIMEOUT = 60 * 60 * 24
+EPH_LOCK_TIMEOUT = 60 * 5
+EPH_LOCK_WAIT = 10
+EPH_LOCK_POLL_INTERVAL = 0.1
+
+EPHSteps = list[tuple[dict[str, CountData], list[str]]]
+
 
-    steps = []
+def run_eph(ballots: list[list[str]]) -> tuple[list[str], EPHSteps]:
+    """Run EPH, returning the finalists and each round's counts and eliminations."""
+    steps: EPHSteps = []
 
     def recorder(
         ballots: list[str], counts: dict[str, CountData], eliminations: list[str]
     ):
-        steps.append((ballots, counts, eliminations))
+        steps.append((counts, eliminations))
 
     finalists = eph(ballots, finalist_count=6, record_steps=recorder)
+    return finalists, steps
+
+
+def cached_eph_result(
+    category: nominate.Category, name: str, compute: Callable[[list[list[str]]], Any]
+) -> Any:
+    """Compute an EPH-derived result for a category, or fetch it from the cache.
+
+    Results are keyed by the category's canonicalization version, so they are
+    recomputed only after the category's canonicalization actually changes.
+
+    Only one request computes a missing result. The finalists page fires a
+    request per EPH step at once, and each of them would otherwise run the
+    whole count again; the others wait for the stored result instead, and
+    compute it themselves only if it doesn't show up in time.
+    """
+
+    def key(version: int) -> str:
+        return f"canonicalize:{name}:{category.pk}:{version}"
+
+    version = models.CanonicalBallot.current_version(category)
+    result = cache.get(key(version))
+    if result is not None:
+        return result
+
+    lock_key = f"canonicalize:{name}:{category.pk}:computing"
+    locked = cache.add(lock_key, 1, EPH_LOCK_TIMEOUT)
+    if not locked:
+        deadline = time.monotonic() + EPH_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(EPH_LOCK_POLL_INTERVAL)
+            version = models.CanonicalBallot.current_version(category)
+            result = cache.get(key(version))
+            if result is not None:
+                return result
+
+    try:
+        ballots = models.CanonicalBallot.for_category(category)
+        # reading a stale snapshot rebuilds it, which moves the version on
+        version = models.CanonicalBallot.current_version(category)
+        result = compute(ballots)
+        cache.set(key(version), result, EPH_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+    return result
+
+
+@user_passes_test(lambda u: u.is_staff, login_url="/admin/login/")
+@permission_required("nominate.report")
+def progress(request: HttpRequest, election_id: str) -> HttpResponse:
+    """Show canonicalization progress for every category in an election.
+
+    This only reads the maintained `CategoryProgress` counters; categories that
+    have not been counted yet are listed without numbers until the next refresh.
+    """
+    election = get_object_or_404(nominate.Election, slug=election_id)
+    categories = nominate.Category.objects.filter(election=election).select_related(
+        "canonicalization_progress"
+    )
+
+    rows = []
+    for category in categories:
+        try:
+            category_progress = category.canonicalization_progress
+        except models.CategoryProgress.DoesNotExist:
+            category_progress = None
+        rows.append((category, category_progress))
+
     return render(
         request,
-        "canonicalize/eph.html",
-        {
-            "category": category,
-            "finalists": finalists,
-            "steps": steps,
-        },
+        "canonicalize/progress.html",
+        {"election": election, "rows": rows},
     )
 
 
@@ -577,11 +773,7 @@ def build_eph_csv(ballots: list[list[str]], finalist_count: int = 6) -> str:
 @permission_required("nominate.report")
 def finalists_csv(request: HttpRequest, category_id: int) -> HttpResponse:
     category = get_object_or_404(nominate.Category, pk=category_id)
-    ballot_builder = BallotReport(category)
-    ballot_objs = [r[1:] for r in ballot_builder.get_report_rows()]
-    ballots = [[w.name for w in ballot] for ballot in ballot_objs]
-
-    csv_content = build_eph_csv(ballots)
+    csv_content = cached_eph_result(category, "eph-csv", build_eph_csv)
 
     filename = f"{category.election}-{category.id}-eph-elimination.csv"
     response = HttpResponse(csv_content, content_type="text/csv")
@@ -605,6 +797,8 @@ def make_work(request: HttpRequest, category_id: int, nominee_id: int) -> HttpRe
             models.CanonicalizedNomination.objects.create(nomination=nominee, work=work)
         except IntegrityError:
             reload_nominee = True
+        else:
+            models.record_canonicalization_change([category.id, nominee.category_id])
 
     if reload_nominee:
         nominee = get_object_or_404(nominate.Nomination, pk=nominee_id)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("canonicalize", "0005_create_csv_switch"),
+        ("nominate", "0027_alter_category_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nominations", models.PositiveIntegerField(default=0)),
+                ("valid_nominations", models.PositiveIntegerField(default=0)),
+                ("canonicalized_nominations", models.PositiveIntegerField(default=0)),
+                ("works", models.PositiveIntegerField(default=0)),
+                ("stale", models.BooleanField(default=True)),
+                ("refreshed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="canonicalization_progress",
+                        to="nominate.category",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Canonicalization Progress",
+                "verbose_name_plural": "Canonicalization Progress",
+            },
+        ),
+    ]
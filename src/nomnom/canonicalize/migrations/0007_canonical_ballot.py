@@ -0,0 +1,58 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:17
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("canonicalize", "0006_category_progress"),
+        ("nominate", "0027_alter_category_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CanonicalBallot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "works",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), size=None
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="canonical_ballots",
+                        to="nominate.category",
+                    ),
+                ),
+                (
+                    "nominator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="nominate.nominatingmemberprofile",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "nominator"), name="unique_canonical_ballot"
+                    )
+                ],
+            },
+        ),
+    ]
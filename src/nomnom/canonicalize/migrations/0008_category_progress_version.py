@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("canonicalize", "0007_canonical_ballot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="categoryprogress",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,9 +1,14 @@
+from collections.abc import Iterable
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import F, Q, Value
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Value
 from django.db.models.functions import Concat, Lower
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.contrib.postgres.search import TrigramWordSimilarity
 from django.db.models.functions import Greatest
 
@@ -100,7 +105,10 @@ class Work(models.Model):
 
         This will associate all nominations from the other works with this work, and then delete the other works.
         """
+        affected_categories = {self.category_id}
         for other_work in other_works:
+            affected_categories.add(other_work.category_id)
+
             # Get nominations associated with the other work
             nominations_to_transfer = list(other_work.nominations.all())
 
@@ -115,6 +123,8 @@ class Work(models.Model):
             # Finally, delete the other work entry
             other_work.delete()
 
+        record_canonicalization_change(affected_categories)
+
 
 class CanonicalizedNomination(models.Model):
     """Associate works with nominations.
@@ -153,16 +163,27 @@ def link_work_to_nomination(sender, instance, created, **kwargs):
     if work is not None:
         work.nominations.add(instance)
         work.save()
+        record_canonicalization_change([instance.category_id, work.category_id])
 
 
 def remove_canonicalization(
-    nominations: models.QuerySet["nominate.Nomination"],
+    nominations: models.QuerySet["nominate.Nomination"], recount: bool = True
 ) -> None:
     """Remove canonicalization for a set of nominations.
 
     This is a destructive operation; it will remove the association between the nominations and the Work.
+    With `recount=False`, as for member ballot saves, the affected categories are
+    only marked stale.
     """
-    CanonicalizedNomination.objects.filter(nomination__in=nominations).delete()
+    canonicalizations = CanonicalizedNomination.objects.filter(
+        nomination__in=nominations
+    )
+    affected_categories = set(
+        canonicalizations.values_list("nomination__category_id", "work__category_id")
+    )
+    canonicalizations.delete()
+    record = record_canonicalization_change if recount else mark_canonicalization_stale
+    record(category_id for pair in affected_categories for category_id in pair)
 
 
 def group_nominations(nominations: models.QuerySet, work: Work | None) -> Work:
@@ -180,9 +201,11 @@ def group_nominations(nominations: models.QuerySet, work: Work | None) -> Work:
 
     # if any of those nominations are already associated with a work, we need to remove them from that work, as
     # we are assigning them to an existing one.
+    affected_categories = set()
     if work is not None:
         for nomination in nominations:
             if nomination.work is not None:
+                affected_categories.add(nomination.work.category_id)
                 nomination.work.nominations.remove(nomination)
 
     else:
@@ -207,4 +230,281 @@ def group_nominations(nominations: models.QuerySet, work: Work | None) -> Work:
 
     work.nominations.add(*nominations)
 
+    affected_categories.add(work.category_id)
+    affected_categories.update(nomination.category_id for nomination in nominations)
+    record_canonicalization_change(affected_categories)
+
     return work
+
+
+class CategoryProgress(models.Model):
+    """Canonicalization counters for a single category.
+
+    The progress dashboard reads these rows instead of counting across the
+    nomination tables on every page load. Anything that changes the
+    canonicalization of a category calls `record_canonicalization_change`,
+    which marks the row stale and schedules a recount for just that category.
+    Member ballot saves only mark their categories stale, and a periodic
+    compaction task recounts those along with anything that slipped through.
+    """
+
+    category = models.OneToOneField(
+        "nominate.Category",
+        on_delete=models.CASCADE,
+        related_name="canonicalization_progress",
+    )
+    nominations = models.PositiveIntegerField(default=0)
+    valid_nominations = models.PositiveIntegerField(default=0)
+    canonicalized_nominations = models.PositiveIntegerField(default=0)
+    works = models.PositiveIntegerField(default=0)
+
+    # bumped on every canonicalization change; derived results (like EPH) are
+    # cached against it
+    version = models.PositiveIntegerField(default=0)
+
+    stale = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Canonicalization Progress"
+        verbose_name_plural = "Canonicalization Progress"
+
+    def __str__(self) -> str:
+        return f"Canonicalization progress for {self.category}"
+
+    @property
+    def unmatched_nominations(self) -> int:
+        return self.nominations - self.canonicalized_nominations
+
+    @property
+    def percent_canonicalized(self) -> float:
+        if not self.nominations:
+            return 100.0
+
+        return 100.0 * self.canonicalized_nominations / self.nominations
+
+    @classmethod
+    def refresh(cls, category_ids: Iterable[int] | None = None) -> None:
+        """Recount the progress for the given categories (or all of them)."""
+        categories = nominate.Category.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=list(category_ids))
+        category_ids = list(categories.values_list("pk", flat=True))
+
+        if not category_ids:
+            return
+
+        nomination_counts = {
+            row["category_id"]: row
+            for row in nominate.Nomination.objects.prefetch_related(None)
+            .filter(category_id__in=category_ids)
+            .order_by()
+            .values("category_id")
+            .annotate(
+                total=Count("id"),
+                valid=Count("id", filter=Q(is_valid=True)),
+                canonicalized=Count(
+                    "id", filter=Q(canonicalizednomination__isnull=False)
+                ),
+            )
+        }
+        work_counts = dict(
+            Work.objects.filter(category_id__in=category_ids)
+            .order_by()
+            .values("category_id")
+            .annotate(total=Count("id"))
+            .values_list("category_id", "total")
+        )
+
+        refreshed_at = timezone.now()
+        empty = {"total": 0, "valid": 0, "canonicalized": 0}
+        rows = []
+        for category_id in category_ids:
+            counts = nomination_counts.get(category_id, empty)
+            rows.append(
+                cls(
+                    category_id=category_id,
+                    nominations=counts["total"],
+                    valid_nominations=counts["valid"],
+                    canonicalized_nominations=counts["canonicalized"],
+                    works=work_counts.get(category_id, 0),
+                    stale=False,
+                    refreshed_at=refreshed_at,
+                )
+            )
+
+        cls.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["category"],
+            update_fields=[
+                "nominations",
+                "valid_nominations",
+                "canonicalized_nominations",
+                "works",
+                "stale",
+                "refreshed_at",
+            ],
+        )
+
+
+class CanonicalBallot(models.Model):
+    """A nominator's canonicalized ballot in one category.
+
+    This is a snapshot of the valid, canonicalized nominations for a nominator, as
+    the ids of the Works they map to, and is the input to EPH. The category is the
+    Work's category, so recategorized nominations count where their Work landed.
+    """
+
+    category = models.ForeignKey(
+        "nominate.Category", on_delete=models.CASCADE, related_name="canonical_ballots"
+    )
+    nominator = models.ForeignKey(
+        "nominate.NominatingMemberProfile", on_delete=models.CASCADE, related_name="+"
+    )
+    works = ArrayField(models.BigIntegerField())
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "nominator"], name="unique_canonical_ballot"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Canonical ballot for {self.nominator_id} in {self.category_id}"
+
+    @classmethod
+    def rebuild(cls, category_ids: Iterable[int]) -> None:
+        """Bring the snapshot for the given categories up to date.
+
+        Only the ballots that actually changed are written.
+        """
+        category_ids = list(category_ids)
+        current = {
+            (row["work__category_id"], row["nomination__nominator_id"]): row["works"]
+            for row in CanonicalizedNomination.objects.filter(
+                work__category_id__in=category_ids
+            )
+            .filter(nomination__is_valid=True)
+            .order_by()
+            .values("work__category_id", "nomination__nominator_id")
+            .annotate(works=ArrayAgg("work_id", order_by="nomination_id"))
+        }
+
+        removed = []
+        changed = []
+        changed_categories = set()
+        for ballot in cls.objects.filter(category_id__in=category_ids):
+            works = current.pop((ballot.category_id, ballot.nominator_id), None)
+            if works is None:
+                removed.append(ballot.pk)
+                changed_categories.add(ballot.category_id)
+            elif works != ballot.works:
+                ballot.works = works
+                changed.append(ballot)
+                changed_categories.add(ballot.category_id)
+
+        if removed:
+            cls.objects.filter(pk__in=removed).delete()
+        if changed:
+            cls.objects.bulk_update(changed, ["works"])
+        if current:
+            changed_categories.update(category_id for category_id, _ in current)
+            cls.objects.bulk_create(
+                [
+                    cls(category_id=category_id, nominator_id=nominator_id, works=works)
+                    for (category_id, nominator_id), works in current.items()
+                ]
+            )
+
+        # catches changes that were not recorded, like members editing their ballots
+        if changed_categories:
+            CategoryProgress.objects.filter(category_id__in=changed_categories).update(
+                version=F("version") + 1
+            )
+
+    @classmethod
+    def current_version(cls, category: "nominate.Category") -> int:
+        """Return the category's canonicalization version.
+
+        If the category has pending canonicalization changes, the snapshot is
+        brought up to date first, so anything read or cached against the returned
+        version reflects them.
+        """
+        progress = (
+            CategoryProgress.objects.filter(category=category)
+            .values_list("stale", "version")
+            .first()
+        )
+        if progress is not None and not progress[0]:
+            return progress[1]
+
+        cls.rebuild([category.pk])
+        CategoryProgress.refresh([category.pk])
+        return CategoryProgress.objects.values_list("version", flat=True).get(
+            category=category
+        )
+
+    @classmethod
+    def for_category(cls, category: "nominate.Category") -> list[list[str]]:
+        """Return the category's ballots as lists of Work names, ready for EPH.
+
+        A snapshot that still lists a work since moved out of the category is
+        rebuilt first.
+        """
+        for rebuilt in (False, True):
+            names = dict(
+                Work.objects.filter(category=category).values_list("id", "name")
+            )
+            ballots = list(
+                cls.objects.filter(category=category)
+                .order_by("nominator_id")
+                .values_list("works", flat=True)
+            )
+            if rebuilt or all(
+                work_id in names for works in ballots for work_id in works
+            ):
+                break
+
+            cls.rebuild([category.pk])
+
+        return [
+            [names[work_id] for work_id in works if work_id in names]
+            for works in ballots
+        ]
+
+
+def record_canonicalization_change(category_ids: Iterable[int]) -> None:
+    """Note that canonicalization or validity changed for the given categories.
+
+    The categories' versions are bumped and their progress counters marked stale
+    right away, and the counters and canonical ballots are rebuilt once the
+    surrounding transaction commits.
+    """
+    category_ids = sorted({category_id for category_id in category_ids if category_id})
+    if not category_ids:
+        return
+
+    CategoryProgress.objects.filter(category_id__in=category_ids).update(
+        stale=True, version=F("version") + 1
+    )
+
+    from nomnom.canonicalize import tasks
+
+    transaction.on_commit(
+        lambda: tasks.refresh_canonicalization_progress.delay(category_ids)
+    )
+
+
+def mark_canonicalization_stale(category_ids: Iterable[int]) -> None:
+    """Note that member ballot saves may have changed the given categories.
+
+    Ballots are saved far more often than canonicalization changes, so rather
+    than recounting on each save, the categories are only marked stale. The
+    periodic compaction task recounts them, and `CanonicalBallot.current_version`
+    rebuilds a stale category before anything is cached against its version.
+    """
+    category_ids = sorted({category_id for category_id in category_ids if category_id})
+    if category_ids:
+        CategoryProgress.objects.filter(category_id__in=category_ids).update(stale=True)
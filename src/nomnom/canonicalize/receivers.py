@@ -1 +1,51 @@
-# none yet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from nomnom.base.signals import nomination_validity_changed, nominations_changed
+from nomnom.canonicalize.models import (
+    Work,
+    mark_canonicalization_stale,
+    record_canonicalization_change,
+    remove_canonicalization,
+)
+from nomnom.nominate.models import Nomination, NominationAdminData
+
+
+@receiver(nomination_validity_changed)
+def nominations_revalidated(sender, category_ids, **kwargs):
+    record_canonicalization_change(category_ids)
+
+
+@receiver(nominations_changed)
+def ballot_changed(sender, category_ids, changed_nomination_ids, **kwargs):
+    # the old text's canonicalization no longer applies to the changed nominations
+    if changed_nomination_ids:
+        remove_canonicalization(
+            Nomination.objects.filter(pk__in=changed_nomination_ids), recount=False
+        )
+    mark_canonicalization_stale(category_ids)
+
+
+@receiver(post_save, sender=NominationAdminData)
+def nomination_admin_data_saved(sender, instance, **kwargs):
+    record_canonicalization_change([instance.nomination.category_id])
+
+
+@receiver(pre_save, sender=Work)
+def work_saving(sender, instance, **kwargs):
+    # a work moved to another category changes the one it left, too
+    instance._previous_category_id = (
+        Work.objects.filter(pk=instance.pk)
+        .values_list("category_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Work)
+@receiver(post_delete, sender=Work)
+def work_changed(sender, instance, **kwargs):
+    record_canonicalization_change(
+        [instance.category_id, getattr(instance, "_previous_category_id", None)]
+    )
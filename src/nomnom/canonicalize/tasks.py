@@ -0,0 +1,47 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.db.models import Exists, OuterRef, Q
+
+from nomnom.canonicalize import models
+from nomnom.nominate import models as nominate
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def refresh_canonicalization_progress(category_ids: list[int] | None = None):
+    """Rebuild the canonical ballots and progress for the given categories, or all of them."""
+    if category_ids is None:
+        category_ids = list(nominate.Category.objects.values_list("pk", flat=True))
+
+    models.CanonicalBallot.rebuild(category_ids)
+    models.CategoryProgress.refresh(category_ids)
+
+
+@shared_task
+def compact_canonicalization_progress():
+    """Periodic catch-up for the canonicalization progress counters and ballots.
+
+    Rebuilds every category whose counters are stale or missing; member ballot
+    saves mark their categories stale and leave the recount to this. It also
+    recounts any category whose counters are older than its newest nomination.
+    """
+    newer_nominations = nominate.Nomination.objects.filter(
+        category=OuterRef("pk"),
+        nomination_date__gt=OuterRef("canonicalization_progress__refreshed_at"),
+    )
+    categories = nominate.Category.objects.filter(
+        Q(canonicalization_progress__isnull=True)
+        | Q(canonicalization_progress__stale=True)
+        | Q(canonicalization_progress__refreshed_at__isnull=True)
+        | Exists(newer_nominations)
+    )
+    category_ids = list(categories.values_list("pk", flat=True))
+    if not category_ids:
+        return
+
+    logger.info(
+        f"Refreshing canonicalization progress for {len(category_ids)} categories"
+    )
+    models.CanonicalBallot.rebuild(category_ids)
+    models.CategoryProgress.refresh(category_ids)
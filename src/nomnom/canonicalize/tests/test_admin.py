@@ -1,27 +1,35 @@
 import csv
 import io
 import random
+from unittest import mock
 
 import pytest
 from django.contrib import admin
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test.client import RequestFactory
 from django.urls import reverse
 from waffle.testutils import override_switch
 
-from nomnom.canonicalize import feature_switches
+from nomnom.canonicalize import admin as admin_module
+from nomnom.canonicalize import feature_switches, models
 from nomnom.canonicalize.admin import (
+    BallotReport,
+    EstimatedCountPaginator,
     GroupNominationsForm,
     NominationGroupingView,
     build_eph_csv,
 )
 from nomnom.canonicalize.factories import WorkFactory
-from nomnom.canonicalize.models import CanonicalizedNomination
+from nomnom.canonicalize.models import CanonicalizedNomination, CategoryProgress
 from nomnom.nominate.factories import (
     CategoryFactory,
     NominatingMemberProfileFactory,
     NominationFactory,
 )
+from nomnom.nominate.admin import set_validation
 from nomnom.nominate.models import Nomination
 
 pytestmark = pytest.mark.usefixtures("db")
@@ -201,6 +209,89 @@ def test_matching_works_uses_average_similarity_across_nominations(
     assert form.matching_works[0] == dune_work
 
 
+def _changelist_query_count(client) -> int:
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(
+            reverse("admin:canonicalize_canonicalizednomination_changelist")
+        )
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+def test_changelist_query_count_is_independent_of_rows(
+    admin_client, work_factory, nomination_factory, category_factory
+):
+    category = category_factory()
+    other_category = category_factory(election=category.election)
+
+    def populate(count):
+        for i in range(count):
+            work = work_factory(category=other_category, name=f"Work {i}")
+            # a recategorized, canonicalized nomination, and an unmatched one
+            work.nominations.add(nomination_factory(category=category, field_1=f"W{i}"))
+            nomination_factory(category=category, field_1=f"Unmatched {i}")
+
+    populate(2)
+    # warm up any per-process lookups (content types, switches) first
+    _changelist_query_count(admin_client)
+    small = _changelist_query_count(admin_client)
+
+    populate(20)
+    large = _changelist_query_count(admin_client)
+
+    assert small == large
+
+
+def test_changelist_displays_annotated_columns(
+    work_factory, nomination_factory, category_factory, modeladmin
+):
+    category = category_factory()
+    other_category = category_factory(election=category.election)
+    work = work_factory(category=other_category, name="The Work")
+    work.nominations.add(nomination_factory(category=category, field_1="The Wrk"))
+    nomination_factory(category=category, field_1="Unmatched")
+    request = RequestFactory().get("/admin/canonicalize/canonicalizednomination/")
+
+    rows = {n.field_1: n for n in modeladmin.get_queryset(request)}
+
+    matched = rows["The Wrk"]
+    assert modeladmin.has_matched_work(matched)
+    assert modeladmin.is_recategorized(matched)
+    assert "The Work" in modeladmin.matched_work(matched)
+    assert modeladmin.matched_work_category(matched) == str(other_category)
+
+    unmatched = rows["Unmatched"]
+    assert not modeladmin.has_matched_work(unmatched)
+    assert not modeladmin.is_recategorized(unmatched)
+    assert "Create Work" in modeladmin.matched_work(unmatched)
+    assert modeladmin.matched_work_category(unmatched) is None
+
+
+class TestEstimatedCountPaginator:
+    def test_unfiltered_large_table_uses_estimate(self, nomination_factory):
+        nomination_factory.create_batch(3)
+        with mock.patch.object(
+            EstimatedCountPaginator, "estimated_count", return_value=50_000
+        ):
+            paginator = EstimatedCountPaginator(Nomination.objects.order_by("id"), 100)
+            assert paginator.count == 50_000
+
+    def test_filtered_uses_exact_count(self, nomination_factory):
+        nomination_factory.create_batch(3, field_1="Counted")
+        with mock.patch.object(
+            EstimatedCountPaginator, "estimated_count", return_value=50_000
+        ):
+            paginator = EstimatedCountPaginator(
+                Nomination.objects.filter(field_1="Counted").order_by("id"), 100
+            )
+            assert paginator.count == 3
+
+    def test_small_table_uses_exact_count(self, nomination_factory):
+        nomination_factory.create_batch(3)
+        paginator = EstimatedCountPaginator(Nomination.objects.order_by("id"), 100)
+        assert paginator.count == 3
+
+
 @pytest.mark.django_db
 class TestFinalistsCsv:
     """Test the EPH elimination CSV report includes Final Score and Number of Ballots columns."""
@@ -316,3 +407,184 @@ class TestFinalistsCsv:
         assert data["C"] == ["40", "2", "40", "40"]
         # D eliminated after round 1 — no Round 2 or Finalists
         assert data["D"] == ["20", "1", "20"]
+
+
+def test_progress_dashboard_reads_counters(admin_client, election):
+    counted = CategoryFactory.create(election=election, ballot_position=1)
+    uncounted = CategoryFactory.create(election=election, ballot_position=2)
+    NominationFactory.create(category=counted)
+    CategoryProgress.refresh([counted.pk])
+
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(
+            reverse("canonicalize:progress", args=[election.slug])
+        )
+
+    assert response.status_code == 200
+    rows = response.context["rows"]
+    assert [category for category, _ in rows] == [counted, uncounted]
+    assert rows[0][1].nominations == 1
+    assert rows[1][1] is None
+    assert not any(
+        '"nominate_nomination"' in query["sql"] for query in context.captured_queries
+    )
+
+
+class TestFinalistsCache:
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def eph_category(self, election):
+        category = CategoryFactory.create(election=election, fields=1)
+        works = [WorkFactory(category=category, name=f"Work {i}") for i in range(8)]
+        for i in range(8):
+            nominator = NominatingMemberProfileFactory()
+            for work in works[i : i + 3]:
+                NominationFactory(
+                    category=category, nominator=nominator, field_1=work.name
+                )
+        return category
+
+    def _ballot_reads(self, client, category) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(reverse("canonicalize:finalists", args=[category.pk]))
+        assert response.status_code == 200
+        return sum(
+            '"canonicalize_canonicalballot"' in query["sql"]
+            for query in context.captured_queries
+        )
+
+    def test_repeated_views_are_served_from_cache(self, admin_client, eph_category):
+        assert self._ballot_reads(admin_client, eph_category) > 0
+        assert self._ballot_reads(admin_client, eph_category) == 0
+
+    def test_canonicalization_change_recomputes(self, admin_client, eph_category):
+        self._ballot_reads(admin_client, eph_category)
+
+        work = models.Work.objects.filter(category=eph_category).first()
+        work.combine_works(
+            models.Work.objects.filter(category=eph_category).exclude(pk=work.pk)[:1]
+        )
+
+        assert self._ballot_reads(admin_client, eph_category) > 0
+
+    def test_moving_a_work_out_recomputes(self, admin_client, eph_category):
+        self._ballot_reads(admin_client, eph_category)
+
+        work = models.Work.objects.filter(category=eph_category).first()
+        work.category = CategoryFactory.create(election=eph_category.election)
+        work.save()
+
+        assert self._ballot_reads(admin_client, eph_category) > 0
+        assert self._ballot_reads(admin_client, eph_category) == 0
+
+
+class TestEphSteps:
+    @pytest.fixture
+    def eph_category(self, election):
+        category = CategoryFactory.create(election=election, fields=1)
+        works = [WorkFactory(category=category, name=f"Work {i}") for i in range(9)]
+        for i in range(9):
+            nominator = NominatingMemberProfileFactory()
+            for work in works[: i + 1]:
+                NominationFactory(
+                    category=category, nominator=nominator, field_1=work.name
+                )
+        return category
+
+    def test_page_defers_steps(self, admin_client, eph_category):
+        response = admin_client.get(
+            reverse("canonicalize:finalists", args=[eph_category.pk])
+        )
+
+        assert response.status_code == 200
+        step_url = reverse("canonicalize:eph-step", args=[eph_category.pk, 1])
+        assert step_url in response.content.decode()
+        assert "Nominated" not in response.content.decode()
+
+    def test_step_json(self, admin_client, eph_category):
+        url = reverse("canonicalize:eph-step", args=[eph_category.pk, 1])
+        response = admin_client.get(url, {"limit": 3})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["step"] == 1
+        assert data["work_count"] == 9
+        assert [row["work"] for row in data["counts"]] == [
+            "Work 0",
+            "Work 1",
+            "Work 2",
+        ]
+        assert data["eliminations"] == ["Work 8"]
+
+    def test_step_fragment_for_htmx(self, admin_client, eph_category):
+        url = reverse("canonicalize:eph-step", args=[eph_category.pk, 1])
+        response = admin_client.get(url, {"limit": 3}, headers={"HX-Request": "true"})
+
+        assert response.status_code == 200
+        content = response.content.decode()
+        assert "Step 1" in content
+        assert "6 more works" in content
+
+    def test_missing_step(self, admin_client, eph_category):
+        url = reverse("canonicalize:eph-step", args=[eph_category.pk, 99])
+        assert admin_client.get(url).status_code == 404
+
+    def test_steps_share_one_eph_run(self, admin_client, eph_category):
+        cache.clear()
+        with mock.patch(
+            "nomnom.canonicalize.admin.run_eph", wraps=admin_module.run_eph
+        ) as run_eph:
+            for step in range(1, 4):
+                url = reverse("canonicalize:eph-step", args=[eph_category.pk, step])
+                assert admin_client.get(url).status_code == 200
+
+        assert run_eph.call_count == 1
+
+    def test_steps_wait_for_a_run_in_progress(self, admin_client, eph_category):
+        cache.clear()
+        version = models.CanonicalBallot.current_version(eph_category)
+        result = admin_module.run_eph(models.CanonicalBallot.for_category(eph_category))
+        cache.add(f"canonicalize:eph:{eph_category.pk}:computing", 1)
+
+        def finish_run(seconds):
+            cache.set(f"canonicalize:eph:{eph_category.pk}:{version}", result)
+
+        url = reverse("canonicalize:eph-step", args=[eph_category.pk, 1])
+        with (
+            mock.patch("nomnom.canonicalize.admin.time.sleep", side_effect=finish_run),
+            mock.patch("nomnom.canonicalize.admin.run_eph") as run_eph,
+        ):
+            assert admin_client.get(url).status_code == 200
+
+        run_eph.assert_not_called()
+        cache.clear()
+
+    def test_steps_compute_when_a_run_never_finishes(self, admin_client, eph_category):
+        cache.clear()
+        cache.add(f"canonicalize:eph:{eph_category.pk}:computing", 1)
+
+        url = reverse("canonicalize:eph-step", args=[eph_category.pk, 1])
+        with mock.patch("nomnom.canonicalize.admin.EPH_LOCK_WAIT", 0):
+            assert admin_client.get(url).status_code == 200
+
+        # the lock belongs to the other run, so it is left in place
+        assert cache.get(f"canonicalize:eph:{eph_category.pk}:computing") == 1
+        cache.clear()
+
+
+def test_ballot_report_excludes_invalid_nominations(election):
+    category = CategoryFactory.create(election=election)
+    work = WorkFactory.create(category=category)
+    valid = NominationFactory.create(category=category)
+    invalid = NominationFactory.create(category=category)
+    work.nominations.add(valid, invalid)
+    set_validation(Nomination.objects.filter(pk=invalid.pk), False)
+
+    rows = BallotReport(category).query_set()
+
+    assert [row.nomination for row in rows] == [valid]
@@ -5,7 +5,17 @@ from django.db import IntegrityError, connection
 from django.test.utils import CaptureQueriesContext
 
 from nomnom.canonicalize.factories import WorkFactory
-from nomnom.canonicalize.models import CanonicalizedNomination, Work, group_nominations
+from nomnom.canonicalize.models import (
+    CanonicalBallot,
+    CanonicalizedNomination,
+    CategoryProgress,
+    Work,
+    group_nominations,
+    remove_canonicalization,
+)
+from nomnom.canonicalize.tasks import compact_canonicalization_progress
+from nomnom.nominate.admin import set_validation
+from nomnom.nominate.tasks import link_nominations_to_works
 from nomnom.nominate import models as nominate
 from nomnom.nominate.factories import (
     CategoryFactory,
@@ -382,3 +392,289 @@ def test_find_matches_by_linked_nomination_fields(db):
     results = Work.find_fuzzy_matches("The Hobbit Tolkien", category)
 
     assert work in results
+
+
+class TestCategoryProgress:
+    def test_refresh_counts_the_category(self, category):
+        work = WorkFactory.create(category=category)
+        WorkFactory.create(category=category)
+        linked = NominationFactory.create(category=category)
+        invalid = NominationFactory.create(category=category)
+        NominationFactory.create(category=category)
+        work.nominations.add(linked)
+        set_validation(nominate.Nomination.objects.filter(pk=invalid.pk), False)
+
+        CategoryProgress.refresh([category.pk])
+
+        progress = CategoryProgress.objects.get(category=category)
+        assert progress.nominations == 3
+        assert progress.valid_nominations == 2
+        assert progress.canonicalized_nominations == 1
+        assert progress.unmatched_nominations == 2
+        assert progress.works == 2
+        assert not progress.stale
+        assert progress.refreshed_at is not None
+
+    def test_refresh_creates_rows_for_empty_categories(self, category):
+        CategoryProgress.refresh()
+
+        progress = CategoryProgress.objects.get(category=category)
+        assert progress.nominations == 0
+        assert progress.percent_canonicalized == 100.0
+
+    def test_grouping_refreshes_after_commit(
+        self, category, django_capture_on_commit_callbacks
+    ):
+        nominations = [NominationFactory.create(category=category) for _ in range(2)]
+        CategoryProgress.refresh([category.pk])
+
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            group_nominations(
+                nominate.Nomination.objects.filter(pk__in=[n.pk for n in nominations]),
+                None,
+            )
+
+        assert CategoryProgress.objects.get(category=category).stale
+
+        for callback in callbacks:
+            callback()
+
+        progress = CategoryProgress.objects.get(category=category)
+        assert not progress.stale
+        assert progress.canonicalized_nominations == 2
+        assert progress.works == 1
+
+    def test_removing_canonicalization_marks_stale(self, category):
+        nomination = NominationFactory.create(category=category)
+        WorkFactory.create(category=category).nominations.add(nomination)
+        CategoryProgress.refresh([category.pk])
+
+        remove_canonicalization(nominate.Nomination.objects.filter(pk=nomination.pk))
+
+        assert CategoryProgress.objects.get(category=category).stale
+
+    def test_validity_change_marks_stale(self, category):
+        nomination = NominationFactory.create(category=category)
+        CategoryProgress.refresh([category.pk])
+
+        set_validation(nominate.Nomination.objects.filter(pk=nomination.pk), False)
+
+        assert CategoryProgress.objects.get(category=category).stale
+
+    def test_ballot_saves_only_mark_stale(
+        self, category, django_capture_on_commit_callbacks
+    ):
+        work = WorkFactory.create(category=category, name="The Book")
+        nominator = NominatingMemberProfileFactory.create()
+        edited = NominationFactory.create(
+            category=category, nominator=nominator, field_1="Old"
+        )
+        work.nominations.add(edited)
+        CategoryProgress.refresh([category.pk])
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            nominations = nominate.save_ballot(
+                nominator,
+                [category],
+                [
+                    nominate.Nomination(category=category, field_1="New"),
+                    nominate.Nomination(category=category, field_1="The Book"),
+                ],
+                "127.0.0.1",
+            )
+            link_nominations_to_works([n.pk for n in nominations])
+
+        assert not callbacks
+        progress = CategoryProgress.objects.get(category=category)
+        assert progress.stale
+        assert progress.canonicalized_nominations == 1
+
+        compact_canonicalization_progress()
+
+        progress = CategoryProgress.objects.get(category=category)
+        assert not progress.stale
+        assert progress.nominations == 2
+
+    def test_compaction_catches_new_nominations(self, category):
+        CategoryProgress.refresh([category.pk])
+        NominationFactory.create(category=category)
+
+        compact_canonicalization_progress()
+
+        assert CategoryProgress.objects.get(category=category).nominations == 1
+
+    def test_compaction_skips_current_categories(self, category):
+        NominationFactory.create(category=category)
+        CategoryProgress.refresh([category.pk])
+
+        with CaptureQueriesContext(connection) as context:
+            compact_canonicalization_progress()
+
+        assert len(context.captured_queries) == 1
+
+
+class TestCanonicalBallot:
+    @pytest.fixture
+    def nominator(self):
+        return NominatingMemberProfileFactory.create()
+
+    def _nominate(self, category, nominator, work):
+        nomination = NominationFactory.create(category=category, nominator=nominator)
+        work.nominations.add(nomination)
+        return nomination
+
+    def test_rebuild_snapshots_valid_nominations(self, category, nominator):
+        w1 = WorkFactory.create(category=category, name="One")
+        w2 = WorkFactory.create(category=category, name="Two")
+        self._nominate(category, nominator, w1)
+        invalid = self._nominate(category, nominator, w2)
+        set_validation(nominate.Nomination.objects.filter(pk=invalid.pk), False)
+
+        CanonicalBallot.rebuild([category.pk])
+
+        ballot = CanonicalBallot.objects.get(category=category, nominator=nominator)
+        assert ballot.works == [w1.pk]
+
+    def test_recategorized_works_count_in_their_category(self, category, nominator):
+        other = CategoryFactory.create(election=category.election)
+        work = WorkFactory.create(category=other)
+        self._nominate(category, nominator, work)
+
+        CanonicalBallot.rebuild([category.pk, other.pk])
+
+        assert not CanonicalBallot.objects.filter(category=category).exists()
+        assert CanonicalBallot.objects.get(category=other).works == [work.pk]
+
+    def test_rebuild_only_writes_changed_ballots(self, category, nominator):
+        work = WorkFactory.create(category=category)
+        unchanged = NominatingMemberProfileFactory.create()
+        self._nominate(category, nominator, work)
+        self._nominate(category, unchanged, work)
+        CanonicalBallot.rebuild([category.pk])
+
+        removed = CategoryFactory.create(election=category.election)
+        self._nominate(category, nominator, WorkFactory.create(category=category))
+
+        with CaptureQueriesContext(connection) as context:
+            CanonicalBallot.rebuild([category.pk, removed.pk])
+
+        writes = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+            and '"canonicalize_canonicalballot"' in query["sql"]
+        ]
+        # only the changed ballot is updated
+        assert len(writes) == 1
+        assert writes[0].startswith("UPDATE")
+
+    def test_removed_ballots_are_deleted(self, category, nominator):
+        nomination = self._nominate(
+            category, nominator, WorkFactory.create(category=category)
+        )
+        CanonicalBallot.rebuild([category.pk])
+
+        remove_canonicalization(nominate.Nomination.objects.filter(pk=nomination.pk))
+        CanonicalBallot.rebuild([category.pk])
+
+        assert not CanonicalBallot.objects.filter(category=category).exists()
+
+    def test_for_category_returns_names(self, category, nominator):
+        self._nominate(
+            category, nominator, WorkFactory.create(category=category, name="A")
+        )
+        self._nominate(
+            category, nominator, WorkFactory.create(category=category, name="B")
+        )
+        CanonicalBallot.rebuild([category.pk])
+
+        assert CanonicalBallot.for_category(category) == [["A", "B"]]
+
+    def test_moving_a_work_changes_both_categories(self, category, nominator):
+        other = CategoryFactory.create(election=category.election)
+        work = WorkFactory.create(category=category, name="Moved")
+        self._nominate(category, nominator, work)
+        before = CanonicalBallot.current_version(category)
+        assert CanonicalBallot.for_category(category) == [["Moved"]]
+
+        work.category = other
+        work.save()
+
+        assert CanonicalBallot.current_version(category) > before
+        assert CanonicalBallot.for_category(category) == []
+        CanonicalBallot.current_version(other)
+        assert CanonicalBallot.for_category(other) == [["Moved"]]
+
+    def test_stale_snapshots_are_rebuilt(self, category, nominator):
+        work = WorkFactory.create(category=category, name="Moved")
+        self._nominate(category, nominator, work)
+        CanonicalBallot.rebuild([category.pk])
+
+        # as if the move had not been recorded
+        Work.objects.filter(pk=work.pk).update(
+            category=CategoryFactory.create(election=category.election)
+        )
+
+        assert CanonicalBallot.for_category(category) == []
+
+    def test_current_version_rebuilds_pending_changes(self, category, nominator):
+        self._nominate(
+            category, nominator, WorkFactory.create(category=category, name="A")
+        )
+
+        CanonicalBallot.current_version(category)
+
+        assert CanonicalBallot.for_category(category) == [["A"]]
+        assert not CategoryProgress.objects.get(category=category).stale
+
+    def test_current_version_is_a_single_query_when_current(self, category):
+        CanonicalBallot.current_version(category)
+
+        with CaptureQueriesContext(connection) as context:
+            CanonicalBallot.current_version(category)
+
+        assert len(context.captured_queries) == 1
+
+    def test_canonicalization_changes_bump_the_version(self, category, nominator):
+        nomination = NominationFactory.create(category=category, nominator=nominator)
+        before = CanonicalBallot.current_version(category)
+
+        group_nominations(nominate.Nomination.objects.filter(pk=nomination.pk), None)
+
+        assert CanonicalBallot.current_version(category) > before
+
+    def test_unrecorded_ballot_changes_bump_the_version(self, category, nominator):
+        nomination = self._nominate(
+            category, nominator, WorkFactory.create(category=category)
+        )
+        before = CanonicalBallot.current_version(category)
+
+        # a member removing a nomination from their ballot isn't recorded
+        nominate.Nomination.objects.filter(pk=nomination.pk).delete()
+        CanonicalBallot.rebuild([category.pk])
+
+        assert CanonicalBallot.current_version(category) > before
+
+
+def test_ballot_save_keeps_canonicalization_of_unchanged_nominations(category):
+    nominator = NominatingMemberProfileFactory.create()
+    kept, replaced = [
+        NominationFactory.create(
+            category=category, nominator=nominator, field_1=t, field_2="", field_3=""
+        )
+        for t in ("Kept", "Replaced")
+    ]
+    work = WorkFactory.create(category=category)
+    work.nominations.add(kept, replaced)
+
+    nominate.save_ballot(
+        nominator,
+        [category],
+        [
+            nominate.Nomination(category=category, field_1="Kept"),
+            nominate.Nomination(category=category, field_1="Something Else"),
+        ],
+        "127.0.0.1",
+    )
+
+    assert set(work.nominations.all()) == {kept}
@@ -5,6 +5,11 @@ from . import admin
 app_name = "canonicalize"
 
 urlpatterns = [
+    path(
+        "<election_id>/canonicalization/",
+        admin.progress,
+        name="progress",
+    ),
     path(
         "<int:category_id>/ballots/",
         admin.BallotReportView.as_view(),
@@ -15,6 +20,11 @@ urlpatterns = [
         admin.finalists,
         name="finalists",
     ),
+    path(
+        "<int:category_id>/finalists/steps/<int:step>/",
+        admin.eph_step,
+        name="eph-step",
+    ),
     path(
         "<int:category_id>/finalists.csv",
         admin.finalists_csv,
@@ -1,26 +1,26 @@
-import csv
 from io import TextIOWrapper
 
 from django import forms
 from django.contrib import admin
-from django.db import models as django_models
-from django.http import HttpResponse
+from django.http import Http404
 from django.shortcuts import redirect, render
 from django.urls import path
+from django.utils import timezone
 from django_admin_action_forms import (
     AdminActionForm,
     AdminActionFormsMixin,
     action_with_form,
 )
 
-from . import models
+from . import code_import, exports, models, tasks
+from .structure import bump_structure_version
 
 
 @admin.register(models.ElectionPacket)
 class ElectionPacketAdmin(admin.ModelAdmin):
     list_display = ["name", "election", "enabled"]
     list_filter = ["enabled"]
-    actions = ["create_sections_from_categories"]
+    actions = ["create_sections_from_categories", "refresh_file_metadata"]
 
     def create_sections_from_categories(self, request, queryset):
         """Create hierarchical section structure from election categories."""
@@ -64,6 +64,18 @@ class ElectionPacketAdmin(admin.ModelAdmin):
         "Create sections from election categories"
     )
 
+    def refresh_file_metadata(self, request, queryset):
+        """Queue a refresh of the file sizes and dates shown on the packet page."""
+        for packet in queryset:
+            tasks.refresh_packet_metadata.delay(packet.id)
+
+        self.message_user(
+            request,
+            f"Refreshing file details for {queryset.count()} packet(s)",
+        )
+
+    refresh_file_metadata.short_description = "Refresh file sizes and dates from S3"
+
 
 @admin.register(models.PacketSection)
 class PacketSectionAdmin(admin.ModelAdmin):
@@ -122,7 +134,11 @@ def assign_section(modeladmin, request, queryset, data):
     """Bulk action to assign a section to multiple packet files."""
     section = data.get("section")
     if section:
+        packet_ids = set(queryset.values_list("packet_id", flat=True))
         count = queryset.update(section=section)
+        # update() doesn't send the signals that keep the packet page current
+        for packet_id in packet_ids:
+            bump_structure_version(packet_id)
         modeladmin.message_user(
             request,
             f"Successfully assigned {count} packet file(s) to section '{section.name}'",
@@ -146,15 +162,15 @@ class PacketFileAdmin(AdminActionFormsMixin, admin.ModelAdmin):
     readonly_fields = ["code_import_link"]
     actions = [assign_section]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("stats")
+
     def access_stats(self, obj):
-        count = obj.member_accesses.count()
-        total_accesses = (
-            obj.member_accesses.aggregate(total=django_models.Sum("access_count"))[
-                "total"
-            ]
-            or 0
-        )
-        return "{} members ({} total)".format(count, total_accesses)
+        stats = getattr(obj, "stats", None)
+        if stats is None:
+            return "(not counted yet)"
+
+        return "{} members ({} total)".format(stats.members, stats.accesses)
 
     access_stats.short_description = "Access Stats"
 
@@ -164,15 +180,19 @@ class PacketFileAdmin(AdminActionFormsMixin, admin.ModelAdmin):
             from django.utils.html import format_html
 
             url = reverse("admin:hugopacket_distributioncode_import", args=[obj.pk])
-            code_count = obj.code_pool.count()
-            unassigned_count = obj.code_pool.filter(access_record__isnull=True).count()
+            stats = getattr(obj, "stats", None)
+            if stats is None:
+                return format_html(
+                    '<a href="{}" class="button">Import Codes from CSV</a>', url
+                )
+
             return format_html(
                 '<a href="{}" class="button">Import Codes from CSV</a><br>'
                 '<span style="color: #666; font-size: 11px;">'
                 "Current pool: {} total ({} unassigned)</span>",
                 url,
-                code_count,
-                unassigned_count,
+                stats.codes,
+                stats.codes_remaining,
             )
         return "(Save file first, or change access type to CODE)"
 
@@ -250,8 +270,26 @@ class PacketFileAdmin(AdminActionFormsMixin, admin.ModelAdmin):
         return fieldsets
 
 
+class MarksStatsStaleMixin:
+    """Admin changes to codes and accesses have their files' stats recounted."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        models.PacketFileStats.mark_stale([obj.packet_file_id])
+
+    def delete_model(self, request, obj):
+        packet_file_id = obj.packet_file_id
+        super().delete_model(request, obj)
+        models.PacketFileStats.mark_stale([packet_file_id])
+
+    def delete_queryset(self, request, queryset):
+        packet_file_ids = set(queryset.values_list("packet_file_id", flat=True))
+        super().delete_queryset(request, queryset)
+        models.PacketFileStats.mark_stale(packet_file_ids)
+
+
 @admin.register(models.PacketItemAccess)
-class PacketItemAccessAdmin(admin.ModelAdmin):
+class PacketItemAccessAdmin(MarksStatsStaleMixin, admin.ModelAdmin):
     list_display = [
         "member",
         "packet_file",
@@ -272,6 +310,7 @@ class PacketItemAccessAdmin(admin.ModelAdmin):
         "access_count",
     ]
     date_hierarchy = "last_accessed_at"
+    actions = ["export_accesses"]
 
     def has_code(self, obj):
         return obj.distribution_code is not None
@@ -279,6 +318,28 @@ class PacketItemAccessAdmin(admin.ModelAdmin):
     has_code.boolean = True
     has_code.short_description = "Code Assigned"
 
+    def save_model(self, request, obj, form, change):
+        # a code taken away from the member goes back into the pool
+        previous = form.initial.get("distribution_code")
+        if change and previous is not None and "distribution_code" in form.changed_data:
+            models.DistributionCode.objects.filter(pk=previous).release()
+
+        # codes handed out here are no longer in the pool
+        code = obj.distribution_code
+        if code is not None and code.assigned_at is None:
+            code.assigned_at = timezone.now()
+            code.assigned_by = request.user
+            code.save(update_fields=["assigned_at", "assigned_by"])
+
+        super().save_model(request, obj, form, change)
+
+    def export_accesses(self, request, queryset):
+        return exports.stream_csv(
+            "packet_accesses.csv", exports.ACCESS_HEADER, exports.access_rows(queryset)
+        )
+
+    export_accesses.short_description = "Export selected accesses to CSV"
+
 
 class DistributionCodeImportForm(forms.Form):
     csv_file = forms.FileField(
@@ -287,7 +348,7 @@ class DistributionCodeImportForm(forms.Form):
 
 
 @admin.register(models.DistributionCode)
-class DistributionCodeAdmin(admin.ModelAdmin):
+class DistributionCodeAdmin(MarksStatsStaleMixin, admin.ModelAdmin):
     list_display = [
         "code",
         "packet_file",
@@ -312,116 +373,55 @@ class DistributionCodeAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.import_codes_view),
                 name="hugopacket_distributioncode_import",
             ),
+            path(
+                "<int:packet_file_id>/import-codes/<str:job_id>/",
+                self.admin_site.admin_view(self.import_progress_view),
+                name="hugopacket_distributioncode_import_progress",
+            ),
         ]
         return custom_urls + urls
 
     def import_codes_view(self, request, packet_file_id):
         from django.contrib import messages
-        from django.db import IntegrityError
 
         packet_file = models.PacketFile.objects.get(pk=packet_file_id)
 
         if request.method == "POST":
             form = DistributionCodeImportForm(request.POST, request.FILES)
             if form.is_valid():
-                csv_file = TextIOWrapper(
-                    request.FILES["csv_file"].file, encoding="utf-8"
-                )
+                upload = request.FILES["csv_file"]
+
+                if upload.size > code_import.BACKGROUND_IMPORT_SIZE:
+                    job_id = code_import.stage_import(packet_file, upload)
+                    return redirect(
+                        "admin:hugopacket_distributioncode_import_progress",
+                        packet_file_id,
+                        job_id,
+                    )
 
-                # Read entire file to detect format
-                content = csv_file.read()
-                csv_file.seek(0)
-
-                # Try to detect if there's a header
-                lines = content.strip().split("\n")
-                first_line = lines[0] if lines else ""
-                has_header = "," in first_line and "code" in first_line.lower()
-
-                codes_created = 0
-                codes_updated = 0
-                duplicates = []
-                seen_codes = set()
-
-                if has_header:
-                    # CSV with headers
-                    reader = csv.DictReader(csv_file)
-                    for row_num, row in enumerate(
-                        reader, start=2
-                    ):  # Start at 2 since header is line 1
-                        code = row.get("code", "").strip()
-                        notes = row.get("notes", "").strip()
-
-                        if not code:
-                            continue
-
-                        # Check for duplicates within file
-                        if code in seen_codes:
-                            duplicates.append(f"Line {row_num}: {code}")
-                            continue
-                        seen_codes.add(code)
-
-                        try:
-                            models.DistributionCode.objects.create(
-                                packet_file=packet_file,
-                                code=code,
-                                notes=notes,
-                            )
-                            codes_created += 1
-                        except IntegrityError:
-                            # Code exists - check if we need to update notes
-                            existing = models.DistributionCode.objects.filter(
-                                packet_file=packet_file, code=code
-                            ).first()
-                            if existing and notes and existing.notes != notes:
-                                existing.notes = notes
-                                existing.save()
-                                codes_updated += 1
-                else:
-                    # Simple format: one code per line (no notes to update)
-                    for row_num, line in enumerate(lines, start=1):
-                        code = line.strip()
-
-                        if not code:
-                            continue
-
-                        # Check for duplicates within file
-                        if code in seen_codes:
-                            duplicates.append(f"Line {row_num}: {code}")
-                            continue
-                        seen_codes.add(code)
-
-                        try:
-                            models.DistributionCode.objects.create(
-                                packet_file=packet_file,
-                                code=code,
-                            )
-                            codes_created += 1
-                        except IntegrityError:
-                            # Code exists - simple format has no notes to update
-                            pass
+                progress = code_import.import_codes(
+                    packet_file, TextIOWrapper(upload.file, encoding="utf-8")
+                )
 
                 # Show results
-                if codes_created > 0 or codes_updated > 0:
+                if progress.created > 0 or progress.updated > 0:
                     msg_parts = []
-                    if codes_created > 0:
-                        msg_parts.append(f"imported {codes_created} new codes")
-                    if codes_updated > 0:
-                        msg_parts.append(f"updated {codes_updated} existing codes")
+                    if progress.created > 0:
+                        msg_parts.append(f"imported {progress.created} new codes")
+                    if progress.updated > 0:
+                        msg_parts.append(f"updated {progress.updated} existing codes")
                     messages.success(
                         request,
                         f"Successfully {' and '.join(msg_parts)} for {packet_file.name}",
                     )
 
-                if duplicates:
+                if progress.duplicates:
+                    unlisted = progress.duplicates - len(progress.duplicate_examples)
                     messages.warning(
                         request,
-                        f"Skipped {len(duplicates)} duplicate codes within file: "
-                        + ", ".join(duplicates[:5])
-                        + (
-                            f" (and {len(duplicates) - 5} more)"
-                            if len(duplicates) > 5
-                            else ""
-                        ),
+                        f"Skipped {progress.duplicates} duplicate codes within file: "
+                        + ", ".join(progress.duplicate_examples)
+                        + (f" (and {unlisted} more)" if unlisted else ""),
                     )
 
                 return redirect("admin:hugopacket_packetfile_change", packet_file_id)
@@ -435,28 +435,43 @@ class DistributionCodeAdmin(admin.ModelAdmin):
         }
         return render(request, "admin/hugopacket/import_codes.html", context)
 
+    def import_progress_view(self, request, packet_file_id, job_id):
+        packet_file = models.PacketFile.objects.get(pk=packet_file_id)
+        progress = code_import.import_progress(job_id)
+        if progress is None:
+            raise Http404("No such import")
+
+        context = {
+            "packet_file": packet_file,
+            "progress": progress,
+            "opts": self.model._meta,
+        }
+        return render(request, "admin/hugopacket/import_codes_progress.html", context)
+
     actions = ["export_codes"]
 
     def export_codes(self, request, queryset):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = (
-            'attachment; filename="distribution_codes.csv"'
+        return exports.stream_csv(
+            "distribution_codes.csv",
+            exports.DISTRIBUTION_CODE_HEADER,
+            exports.distribution_code_rows(queryset),
         )
 
-        writer = csv.writer(response)
-        writer.writerow(["Code", "Packet File", "Member", "Assigned At", "Notes"])
-
-        for code in queryset:
-            writer.writerow(
-                [
-                    code.code,
-                    str(code.packet_file),
-                    code.member.display_name if code.member else "",
-                    code.assigned_at.isoformat() if code.assigned_at else "",
-                    code.notes,
-                ]
-            )
+    export_codes.short_description = "Export selected codes to CSV"
 
-        return response
 
-    export_codes.short_description = "Export selected codes to CSV"
+@admin.register(models.PacketFileDailyStats)
+class PacketFileDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ["day", "packet_file", "members", "new_members"]
+    list_filter = ["packet_file__packet", "packet_file"]
+    list_select_related = ["packet_file"]
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
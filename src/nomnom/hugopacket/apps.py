@@ -1,3 +1,7 @@
+import asyncio
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Annotated
 from urllib.parse import urlparse
@@ -7,6 +11,7 @@ import botocore.client
 from botocore.exceptions import BotoCoreError
 from django.apps import AppConfig
 from django.conf import settings
+from django.core.cache import cache
 from django.http import Http404
 from django_svcs.apps import get_registry, svcs_from
 
@@ -15,6 +20,24 @@ from nomnom.convention import ConventionConfiguration
 S3Client = Annotated[botocore.client.BaseClient, "s3"]
 
 
+# a cached URL is handed out only while it has at least this long left to run
+URL_SAFETY_MARGIN = 60 * 5
+
+
+@functools.cache
+def s3_executor() -> ThreadPoolExecutor:
+    """The threads that async views make their S3 calls on.
+
+    There are only `HUGOPACKET_S3_MAX_WORKERS` of them, so when the object
+    store is slow, requests queue here instead of taking every thread the
+    server has.
+    """
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "HUGOPACKET_S3_MAX_WORKERS", 8),
+        thread_name_prefix="hugopacket-s3",
+    )
+
+
 @dataclass
 class PacketItemResolver:
     s3_client: S3Client
@@ -22,8 +45,35 @@ class PacketItemResolver:
     file_key: str
     expiry: int = 60 * 60  # 1 hour
 
+    def cache_key(self) -> str:
+        digest = hashlib.sha256(
+            f"{self.bucket_name}\0{self.file_key}".encode()
+        ).hexdigest()
+        return f"hugopacket:url:{type(self).__qualname__}:{digest}"
+
     def get_url(self) -> str:
-        """Get a presigned URL for the file key in the bucket."""
+        """Get a presigned URL for the file key in the bucket.
+
+        The same few files are downloaded over and over, so signed URLs are
+        cached and reused until shortly before they expire.
+        """
+        key = self.cache_key()
+        url = cache.get(key)
+        if url is None:
+            url = self.sign_url()
+            timeout = self.expiry - URL_SAFETY_MARGIN
+            if timeout > 0:
+                cache.set(key, url, timeout)
+
+        return url
+
+    async def aget_url(self) -> str:
+        """`get_url`, run on the S3 executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(s3_executor(), self.get_url)
+
+    def sign_url(self) -> str:
+        """Sign a new URL for the file key in the bucket."""
         try:
             url = self.s3_client.generate_presigned_url(
                 "get_object",
@@ -36,9 +86,9 @@ class PacketItemResolver:
 
 
 class DigitalOceanCDNResolver(PacketItemResolver):
-    def get_url(self) -> str:
-        """Get a presigned URL for the file key in the bucket."""
-        base_url = super().get_url()
+    def sign_url(self) -> str:
+        """Sign a new URL for the file key in the bucket, served from the CDN."""
+        base_url = super().sign_url()
         parsed_url = urlparse(base_url)
         region_name = getattr(settings, "HUGOPACKET_AWS_REGION", "nyc3")
         cdn_url = getattr(
@@ -90,6 +140,8 @@ class HugopacketConfig(AppConfig):
             registry.register_factory(S3Client, self.make_s3_client)
             registry.register_factory(PacketAccess, self.make_s3_packet_access)
 
+        from . import signals  # noqa: F401
+
     def make_s3_client(self) -> botocore.client.BaseClient:
         # assume the region and credentials are set up in the environment
         return boto3.client(
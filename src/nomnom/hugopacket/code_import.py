@@ -0,0 +1,270 @@
+"""Importing distribution codes from a CSV upload.
+
+Publishers hand over codes in files of tens of thousands of lines, so the
+upload is parsed as a stream and written in batches. Small files are imported
+while the admin waits; larger ones are staged in the cache, in chunks, and
+imported by `tasks.import_distribution_codes`, which records its progress as it
+goes.
+"""
+
+import csv
+import io
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from itertools import batched, chain
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from nomnom.hugopacket.models import DistributionCode, PacketFile, PacketFileStats
+
+BATCH_SIZE = 1000
+
+# uploads bigger than this are imported in the background
+BACKGROUND_IMPORT_SIZE = 1024 * 1024
+
+# how long a staged upload and its progress are kept
+STAGING_TIMEOUT = 60 * 60 * 24
+
+# the size of each cache value a staged upload is split into
+STAGING_CHUNK_SIZE = 256 * 1024
+
+# duplicates within the file that are listed, rather than just counted
+DUPLICATE_EXAMPLES = 5
+
+
+@dataclass
+class ImportProgress:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    duplicates: int = 0
+    duplicate_examples: list[str] = field(default_factory=list)
+    finished: bool = False
+    # why a background import stopped, if it failed
+    error: str = ""
+
+
+@dataclass(frozen=True)
+class CodeRow:
+    line: int
+    code: str
+    notes: str
+
+
+def read_codes(lines: Iterable[str]) -> Iterator[CodeRow]:
+    """The codes in an upload, in either of its two formats.
+
+    A first line with a comma and "code" in it is a header, and the upload is
+    read as a CSV with `code` and optional `notes` columns. Otherwise every
+    line is a code.
+    """
+    lines = iter(lines)
+    first_line = next(lines, "")
+    lines = chain([first_line], lines)
+
+    if "," in first_line and "code" in first_line.lower():
+        # the header is line 1
+        for line, row in enumerate(csv.DictReader(lines), start=2):
+            code = (row.get("code") or "").strip()
+            if code:
+                yield CodeRow(line, code, (row.get("notes") or "").strip())
+    else:
+        for line, text in enumerate(lines, start=1):
+            code = text.strip()
+            if code:
+                yield CodeRow(line, code, "")
+
+
+def import_codes(
+    packet_file: PacketFile,
+    lines: Iterable[str],
+    on_progress: Callable[[ImportProgress], None] | None = None,
+) -> ImportProgress:
+    """Add the codes in an upload to the file's pool.
+
+    Codes repeated within the upload are skipped. Codes already in the pool are
+    left alone, except that their notes are replaced by any in the upload.
+    """
+    progress = ImportProgress()
+    seen: set[str] = set()
+
+    def unique_rows() -> Iterator[CodeRow]:
+        for row in read_codes(lines):
+            progress.rows += 1
+            if row.code in seen:
+                progress.duplicates += 1
+                if len(progress.duplicate_examples) < DUPLICATE_EXAMPLES:
+                    progress.duplicate_examples.append(f"Line {row.line}: {row.code}")
+                continue
+
+            seen.add(row.code)
+            yield row
+
+    for batch in batched(unique_rows(), BATCH_SIZE):
+        _import_batch(packet_file, batch, progress)
+        if on_progress is not None:
+            on_progress(progress)
+
+    PacketFileStats.mark_stale([packet_file.id])
+    progress.finished = True
+    if on_progress is not None:
+        on_progress(progress)
+
+    return progress
+
+
+def _existing_codes(
+    packet_file: PacketFile, codes: list[str]
+) -> dict[str, DistributionCode]:
+    return {
+        code.code: code
+        for code in DistributionCode.objects.filter(
+            packet_file=packet_file, code__in=codes
+        ).only("pk", "code", "notes")
+    }
+
+
+def _import_batch(
+    packet_file: PacketFile, rows: tuple[CodeRow, ...], progress: ImportProgress
+) -> None:
+    with transaction.atomic():
+        existing = _existing_codes(packet_file, [row.code for row in rows])
+
+        new = [
+            DistributionCode(packet_file=packet_file, code=row.code, notes=row.notes)
+            for row in rows
+            if row.code not in existing
+        ]
+        # a code added by a concurrent import since `existing` is skipped, and
+        # bulk_create doesn't say which, so the new rows are counted
+        new_codes = DistributionCode.objects.filter(
+            packet_file=packet_file, code__in=[code.code for code in new]
+        )
+        before = new_codes.count() if new else 0
+        DistributionCode.objects.bulk_create(new, ignore_conflicts=True)
+        created = new_codes.count() - before if new else 0
+
+        renoted = []
+        for row in rows:
+            code = existing.get(row.code)
+            if code is not None and row.notes and code.notes != row.notes:
+                code.notes = row.notes
+                renoted.append(code)
+        DistributionCode.objects.bulk_update(renoted, ["notes"])
+
+    progress.created += created
+    progress.updated += len(renoted)
+
+
+def _upload_key(job_id: str) -> str:
+    return f"hugopacket:code-import:upload:{job_id}"
+
+
+def _chunk_key(job_id: str, index: int) -> str:
+    return f"hugopacket:code-import:upload:{job_id}:{index}"
+
+
+def _progress_key(job_id: str) -> str:
+    return f"hugopacket:code-import:progress:{job_id}"
+
+
+class StagedUploadMissing(Exception):
+    pass
+
+
+class _StagedUpload(io.RawIOBase):
+    """A staged upload, read back from the cache a chunk at a time."""
+
+    def __init__(self, job_id: str, chunks: int):
+        self._keys = iter([_chunk_key(job_id, index) for index in range(chunks)])
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            key = next(self._keys, None)
+            if key is None:
+                return 0
+            self._pending = cache.get(key)
+            if self._pending is None:
+                raise StagedUploadMissing("Part of the upload expired from the cache")
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def stage_import(packet_file: PacketFile, upload: UploadedFile) -> str:
+    """Keep an upload for a background import, and queue it.
+
+    The upload goes in the cache, which (unlike local disk) the workers share
+    with the web servers. It is stored in chunks of `STAGING_CHUNK_SIZE`, so
+    neither side holds all of it at once, and no single value runs into the
+    cache's size limits. Returns the job's id, for `import_progress`.
+    """
+    from nomnom.hugopacket import tasks
+
+    job_id = uuid.uuid4().hex
+    chunks = 0
+    upload.seek(0)
+    # not upload.chunks(), which hands back an in-memory upload all at once
+    while chunk := upload.read(STAGING_CHUNK_SIZE):
+        cache.set(_chunk_key(job_id, chunks), chunk, STAGING_TIMEOUT)
+        chunks += 1
+    cache.set(_upload_key(job_id), chunks, STAGING_TIMEOUT)
+    cache.set(_progress_key(job_id), ImportProgress(), STAGING_TIMEOUT)
+
+    tasks.import_distribution_codes.delay(packet_file.id, job_id)
+    return job_id
+
+
+def _forget_upload(job_id: str, chunks: int) -> None:
+    cache.delete_many(
+        [_upload_key(job_id)] + [_chunk_key(job_id, index) for index in range(chunks)]
+    )
+
+
+def import_staged(packet_file: PacketFile, job_id: str) -> ImportProgress | None:
+    """Import a staged upload, recording progress; None if it has expired.
+
+    If the import fails, the failure is recorded in its progress before the
+    error is raised again.
+    """
+    chunks = cache.get(_upload_key(job_id))
+    if chunks is None:
+        return None
+
+    latest = ImportProgress()
+
+    def save_progress(progress: ImportProgress) -> None:
+        nonlocal latest
+        latest = progress
+        cache.set(_progress_key(job_id), progress, STAGING_TIMEOUT)
+
+    try:
+        progress = import_codes(
+            packet_file,
+            io.TextIOWrapper(
+                io.BufferedReader(_StagedUpload(job_id, chunks)), encoding="utf-8"
+            ),
+            on_progress=save_progress,
+        )
+    except Exception as e:
+        latest.error = str(e) or e.__class__.__name__
+        latest.finished = True
+        cache.set(_progress_key(job_id), latest, STAGING_TIMEOUT)
+        raise
+    finally:
+        _forget_upload(job_id, chunks)
+
+    return progress
+
+
+def import_progress(job_id: str) -> ImportProgress | None:
+    return cache.get(_progress_key(job_id))
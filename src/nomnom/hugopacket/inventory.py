@@ -0,0 +1,168 @@
+"""Object metadata for the files in a packet.
+
+The packet index shows the size and age of each file, which come from listing
+the packet's bucket (see `scan`). That is far too slow to do on every page
+view, so the listing is cached here and refreshed in the background by
+`tasks.refresh_packet_metadata`. The index only ever reads the cache; when
+there's nothing there yet it shows the files without their details.
+"""
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.cache import cache
+
+from nomnom.hugopacket.apps import S3Client
+from nomnom.hugopacket.models import ElectionPacket
+
+# bucket listings run concurrently, but no more than this many at once
+SCAN_MAX_WORKERS = 8
+
+# only one refresh is queued for a packet at a time; if one is lost, another
+# can be queued after this long.
+REFRESH_LOCK_TIMEOUT = 60 * 5
+
+
+@dataclass(frozen=True)
+class PacketFileMetadata:
+    last_modified: datetime
+    size: int
+
+
+def _metadata_key(packet_id: int) -> str:
+    return f"hugopacket:metadata:{packet_id}"
+
+
+def _refreshing_key(packet_id: int) -> str:
+    return f"hugopacket:metadata-refreshing:{packet_id}"
+
+
+def cached_metadata(packet: ElectionPacket) -> dict[str, PacketFileMetadata]:
+    """The cached metadata for the packet's objects, by key.
+
+    If there is none, a refresh is queued and an empty mapping returned.
+    """
+    metadata = cache.get(_metadata_key(packet.id))
+    if metadata is None:
+        schedule_refresh(packet)
+        return {}
+
+    return metadata
+
+
+def schedule_refresh(packet: ElectionPacket) -> bool:
+    """Queue a metadata refresh for the packet, unless one is already queued."""
+    from nomnom.hugopacket import tasks
+
+    if not cache.add(_refreshing_key(packet.id), True, timeout=REFRESH_LOCK_TIMEOUT):
+        return False
+
+    tasks.refresh_packet_metadata.delay(packet.id)
+    return True
+
+
+def key_prefix(key: str) -> str:
+    """The "directory" a key is in, or the key itself if it's at the top level."""
+    directory, slash, _name = key.rpartition("/")
+    return directory + slash if slash else key
+
+
+def merge_prefixes(prefixes: Iterable[str]) -> list[str]:
+    """The fewest prefixes that cover all of `prefixes`.
+
+    A prefix that starts with another one is dropped, since listing the shorter
+    one already finds everything under it.
+    """
+    merged: list[str] = []
+    # once sorted, everything under a prefix directly follows it
+    for prefix in sorted(set(prefixes)):
+        if merged and prefix.startswith(merged[-1]):
+            continue
+        merged.append(prefix)
+
+    return merged
+
+
+def list_prefix(
+    s3: S3Client, bucket: str, prefix: str
+) -> dict[str, PacketFileMetadata]:
+    """Every object under the prefix, following the listing across pages."""
+    metadata: dict[str, PacketFileMetadata] = {}
+
+    params = {"Bucket": bucket, "Prefix": prefix}
+    while True:
+        response = s3.list_objects_v2(**params)
+        for object in response.get("Contents", []):
+            metadata[object["Key"]] = PacketFileMetadata(
+                object["LastModified"], object["Size"]
+            )
+
+        if not response.get("IsTruncated"):
+            return metadata
+
+        params["ContinuationToken"] = response["NextContinuationToken"]
+
+
+@dataclass
+class Inventory:
+    objects: dict[str, PacketFileMetadata]
+    # the prefixes that couldn't be listed
+    failed: list[str]
+
+
+def scan(
+    s3: S3Client,
+    bucket: str,
+    keys: Iterable[str],
+    max_workers: int = SCAN_MAX_WORKERS,
+) -> Inventory:
+    """List every object the given keys could refer to.
+
+    The keys' prefixes are merged and listed concurrently, each to completion.
+    """
+    prefixes = merge_prefixes(key_prefix(key) for key in keys if key)
+    inventory = Inventory(objects={}, failed=[])
+    if not prefixes:
+        return inventory
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prefixes))) as pool:
+        listings = {
+            prefix: pool.submit(list_prefix, s3, bucket, prefix) for prefix in prefixes
+        }
+
+        for prefix, listing in listings.items():
+            try:
+                inventory.objects.update(listing.result())
+            except (BotoCoreError, ClientError):
+                inventory.failed.append(prefix)
+
+    return inventory
+
+
+def refresh_metadata(
+    packet: ElectionPacket, s3: S3Client
+) -> dict[str, PacketFileMetadata]:
+    """Scan the packet's objects and replace the cached metadata with the result.
+
+    Prefixes that can't be listed keep whatever was cached for them before.
+    """
+    previous = cache.get(_metadata_key(packet.id)) or {}
+
+    inventory = scan(
+        s3,
+        packet.s3_bucket_name,
+        packet.packetfile_set.values_list("s3_object_key", flat=True),
+    )
+
+    metadata = inventory.objects
+    for prefix in inventory.failed:
+        metadata.update(
+            (key, value) for key, value in previous.items() if key.startswith(prefix)
+        )
+
+    cache.set(_metadata_key(packet.id), metadata, timeout=None)
+    cache.delete(_refreshing_key(packet.id))
+    return metadata
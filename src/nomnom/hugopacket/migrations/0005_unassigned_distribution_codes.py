@@ -0,0 +1,45 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def mark_assigned_codes(apps, schema):
+    # codes used to count as assigned when an access record pointed at them;
+    # now they are assigned once they have an assigned_at, so the two have to
+    # agree: codes held by an access are stamped, and the rest are released.
+    DistributionCode = apps.get_model("hugopacket", "DistributionCode")
+    PacketItemAccess = apps.get_model("hugopacket", "PacketItemAccess")
+
+    DistributionCode.objects.filter(
+        assigned_at__isnull=True, access_record__isnull=False
+    ).update(
+        assigned_at=Subquery(
+            PacketItemAccess.objects.filter(distribution_code=OuterRef("pk")).values(
+                "first_accessed_at"
+            )[:1]
+        )
+    )
+    DistributionCode.objects.filter(
+        assigned_at__isnull=False, access_record__isnull=True
+    ).update(assigned_at=None, assigned_by=None)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("hugopacket", "0004_remove_packetfile_group_packetfile_access_type_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_assigned_codes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="distributioncode",
+            index=models.Index(
+                condition=models.Q(("assigned_at__isnull", True)),
+                fields=["packet_file", "id"],
+                name="unassigned_code_idx",
+            ),
+        ),
+    ]
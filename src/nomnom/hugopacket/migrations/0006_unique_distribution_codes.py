@@ -0,0 +1,61 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def remove_duplicate_codes(apps, schema):
+    # Imports used to add a code again every time it was uploaded. Keep one row
+    # for each code: the copy that was handed out, if any, or else the first.
+    # Copies handed out to more than one member can't be merged without taking
+    # a code back from someone, so those are left for an administrator.
+    DistributionCode = apps.get_model("hugopacket", "DistributionCode")
+
+    duplicated = (
+        DistributionCode.objects.values("packet_file", "code")
+        .annotate(copies=Count("pk"))
+        .filter(copies__gt=1)
+    )
+    conflicts = []
+    for group in duplicated:
+        copies = DistributionCode.objects.filter(
+            packet_file=group["packet_file"], code=group["code"]
+        )
+        handed_out = Q(assigned_at__isnull=False) | Q(access_record__isnull=False)
+        assigned = list(copies.filter(handed_out).values_list("pk", flat=True))
+        if len(assigned) > 1:
+            conflicts.append(
+                f"packet file {group['packet_file']}, code {group['code']!r}: "
+                f"assigned copies {', '.join(map(str, assigned))}"
+            )
+            continue
+
+        unassigned = copies.exclude(handed_out).order_by("pk")
+        if not assigned:
+            unassigned = unassigned.exclude(pk=unassigned.first().pk)
+        unassigned.delete()
+
+    if conflicts:
+        raise RuntimeError(
+            "These distribution codes were handed out more than once. Give all "
+            "but one of the members with each code a different one, delete "
+            "their copies, and run the migration again:\n" + "\n".join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("hugopacket", "0005_unassigned_distribution_codes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_codes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="distributioncode",
+            constraint=models.UniqueConstraint(
+                fields=("packet_file", "code"), name="unique_code_per_packet_file"
+            ),
+        ),
+    ]
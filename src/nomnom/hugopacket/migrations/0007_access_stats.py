@@ -0,0 +1,92 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("hugopacket", "0006_unique_distribution_codes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PacketFileStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("members", models.PositiveIntegerField(default=0)),
+                ("accesses", models.PositiveIntegerField(default=0)),
+                ("codes", models.PositiveIntegerField(default=0)),
+                ("codes_remaining", models.PositiveIntegerField(default=0)),
+                ("stale", models.BooleanField(default=True)),
+                ("refreshed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "packet_file",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="hugopacket.packetfile",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Packet File Stats",
+                "verbose_name_plural": "Packet File Stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="PacketFileDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "members",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Members who accessed the file on this day"
+                    ),
+                ),
+                (
+                    "new_members",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Members who accessed the file for the first time",
+                    ),
+                ),
+                (
+                    "packet_file",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="hugopacket.packetfile",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Packet File Stats",
+                "verbose_name_plural": "Daily Packet File Stats",
+                "ordering": ["-day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("packet_file", "day"),
+                        name="unique_daily_stats_per_file",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,10 +1,17 @@
+from collections.abc import Iterable
+from datetime import date, datetime, time
+from itertools import batched
+
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
 from django.http import HttpRequest
 from django.utils import timezone
 from django_svcs.apps import svcs_from
 
-from nomnom.hugopacket.apps import PacketAccess
+from nomnom.hugopacket.apps import PacketAccess, PacketItemResolver
 from nomnom.nominate.models import NominatingMemberProfile
 
 
@@ -212,27 +219,247 @@ class PacketItemAccess(models.Model):
 
     def get_download_url(self, request: HttpRequest) -> str:
         """Get pre-signed S3 URL for downloading the file."""
+        return self.download_resolver(request).get_url()
 
+    def download_resolver(self, request: HttpRequest) -> PacketItemResolver:
         packet_access = svcs_from(request).get(PacketAccess)
-        resolver = packet_access.resolver(
+        return packet_access.resolver(
             bucket_name=self.packet_file.packet.s3_bucket_name,
             file_key=self.packet_file.s3_object_key,
         )
 
-        return resolver.get_url()
+    def assign_code(self) -> "DistributionCode | None":
+        """Assign this member a code from the file's pool, if they don't have one.
+
+        Returns the member's code, or None if the pool has run out.
+        """
+        with transaction.atomic():
+            # a member who double-clicks must not be handed two codes
+            access = PacketItemAccess.objects.select_for_update().get(pk=self.pk)
+            if access.distribution_code_id is None:
+                code = DistributionCode.objects.claim(self.packet_file_id)
+                if code is None:
+                    return None
+
+                access.distribution_code = code
+                access.save(update_fields=["distribution_code"])
+
+        self.distribution_code = access.distribution_code
+        return self.distribution_code
 
     def increment_access(self) -> None:
-        """Record an access event."""
-        self.access_count += 1
-        self.last_accessed_at = timezone.now()
-        self.save(update_fields=["access_count", "last_accessed_at"])
+        """Record an access event.
+
+        With `HUGOPACKET_BUFFER_ACCESS_COUNTS`, the access is only counted in
+        the cache, and written to the database by `flush_access_counts`.
+        """
+        now = timezone.now()
+        pending = None
+        if getattr(settings, "HUGOPACKET_BUFFER_ACCESS_COUNTS", False):
+            pending = _buffer_access(self.pk, now)
+
+        if pending is not None:
+            # this instance was loaded without the accesses still in the cache
+            self.access_count += pending
+        else:
+            PacketItemAccess.objects.filter(pk=self.pk).update(
+                access_count=F("access_count") + 1, last_accessed_at=now
+            )
+            self.access_count += 1
+
+        self.last_accessed_at = now
+
+
+def _pending_count_key(access_id: int) -> str:
+    return f"hugopacket:access-count:{access_id}"
+
+
+def _pending_time_key(access_id: int) -> str:
+    return f"hugopacket:access-time:{access_id}"
+
+
+# the buffered accesses are listed by generation: each flush starts a new one,
+# and writes the accesses listed in the two before it
+_DIRTY_GENERATION_KEY = "hugopacket:access-dirty:generation"
+
+# a generation's list is only read by the next two flushes; this lets one that
+# no flush gets to (if the task stops being scheduled) expire
+DIRTY_TIMEOUT = 60 * 60 * 24
+
+
+def _dirty_length_key(generation: int) -> str:
+    return f"hugopacket:access-dirty:{generation}:length"
+
+
+def _dirty_entry_key(generation: int, index: int) -> str:
+    return f"hugopacket:access-dirty:{generation}:entry:{index}"
+
+
+def _dirty_marker_key(generation: int, access_id: int) -> str:
+    return f"hugopacket:access-dirty:{generation}:access:{access_id}"
+
+
+def _buffer_access(access_id: int, now) -> int | None:
+    """Count an access in the cache, returning the accesses pending for it.
+
+    Returns None if the cache lost a counter while it was being updated; the
+    access is then written to the database instead.
+    """
+    try:
+        cache.add(_pending_count_key(access_id), 0, timeout=None)
+        pending = cache.incr(_pending_count_key(access_id))
+        cache.set(_pending_time_key(access_id), now, timeout=None)
+
+        # list the access for the next flush, once per generation
+        cache.add(_DIRTY_GENERATION_KEY, 0, timeout=None)
+        generation = cache.get(_DIRTY_GENERATION_KEY, 0)
+        if cache.add(_dirty_marker_key(generation, access_id), 1, DIRTY_TIMEOUT):
+            cache.add(_dirty_length_key(generation), 0, DIRTY_TIMEOUT)
+            index = cache.incr(_dirty_length_key(generation))
+            cache.set(_dirty_entry_key(generation, index), access_id, DIRTY_TIMEOUT)
+    except ValueError:
+        # incr on a key that was evicted since it was added
+        return None
+
+    return pending
+
+
+def _dirty_access_ids(generation: int, batch_size: int) -> set[int]:
+    length = cache.get(_dirty_length_key(generation)) or 0
+    access_ids: set[int] = set()
+    for indexes in batched(range(1, length + 1), batch_size):
+        keys = [_dirty_entry_key(generation, index) for index in indexes]
+        access_ids.update(cache.get_many(keys).values())
+
+    return access_ids
+
+
+def _forget_generation(generation: int, access_ids: Iterable[int]) -> None:
+    length = cache.get(_dirty_length_key(generation)) or 0
+    cache.delete_many(
+        [_dirty_length_key(generation)]
+        + [_dirty_entry_key(generation, index) for index in range(1, length + 1)]
+        + [_dirty_marker_key(generation, pk) for pk in access_ids]
+    )
+
+
+def pending_access_counts(access_ids: Iterable[int]) -> dict[int, int]:
+    """The accesses counted in the cache but not yet flushed, by access id."""
+    if not getattr(settings, "HUGOPACKET_BUFFER_ACCESS_COUNTS", False):
+        return {}
+
+    keys = {_pending_count_key(pk): pk for pk in access_ids}
+    return {keys[key]: count for key, count in cache.get_many(keys).items()}
+
+
+def flush_access_counts(batch_size: int = 1000) -> int:
+    """Write the access counts buffered in the cache to the database.
+
+    Returns the number of accesses written. Only the accesses counted since the
+    last flush are looked at; accesses counted while this runs stay in the cache
+    for the next one.
+    """
+    cache.add(_DIRTY_GENERATION_KEY, 0, timeout=None)
+    closed = cache.incr(_DIRTY_GENERATION_KEY) - 1
+    # the generation before is read again, for accesses that were still being
+    # listed in it when the last flush read it
+    previous_ids = _dirty_access_ids(closed - 1, batch_size)
+    access_ids = _dirty_access_ids(closed, batch_size) | previous_ids
+
+    flushed = 0
+    for batch in batched(sorted(access_ids), batch_size):
+        count_keys = {_pending_count_key(pk): pk for pk in batch}
+        counts = {
+            count_keys[key]: count
+            for key, count in cache.get_many(count_keys).items()
+            if count
+        }
+        if not counts:
+            continue
+
+        times = cache.get_many([_pending_time_key(pk) for pk in counts])
+        now = timezone.now()
+        PacketItemAccess.objects.bulk_update(
+            [
+                PacketItemAccess(
+                    pk=pk,
+                    access_count=F("access_count") + count,
+                    last_accessed_at=times.get(_pending_time_key(pk), now),
+                )
+                for pk, count in counts.items()
+            ],
+            ["access_count", "last_accessed_at"],
+        )
+
+        # the accesses keep the time they were made, which can be before the
+        # last stats refresh, so the refresh can't find them by time alone
+        PacketFileStats.mark_stale(
+            PacketItemAccess.objects.filter(pk__in=list(counts))
+            .values_list("packet_file_id", flat=True)
+            .distinct()
+        )
+
+        for pk, count in counts.items():
+            try:
+                cache.decr(_pending_count_key(pk), count)
+            except ValueError:
+                # evicted since it was read; the count is written all the same
+                pass
+        flushed += sum(counts.values())
+
+    _forget_generation(closed - 1, previous_ids)
+    return flushed
+
+
+class DistributionCodeQuerySet(models.QuerySet):
+    def unassigned(self) -> "DistributionCodeQuerySet":
+        return self.filter(assigned_at__isnull=True)
+
+    def release(self) -> int:
+        """Return the codes to the pool, for claiming again."""
+        return self.update(assigned_at=None, assigned_by=None)
+
+    def claim(self, packet_file_id: int) -> "DistributionCode | None":
+        """Mark one of the file's unassigned codes as assigned, and return it.
+
+        Rows other claimers have locked are skipped rather than waited for, so
+        concurrent claimers each take a different code without queueing.
+        """
+        with transaction.atomic():
+            code = (
+                self.unassigned()
+                .filter(packet_file_id=packet_file_id)
+                .order_by("pk")
+                .select_for_update(skip_locked=True)
+                .first()
+            )
+            if code is not None:
+                code.assigned_at = timezone.now()
+                code.save(update_fields=["assigned_at"])
+
+        return code
 
 
 class DistributionCode(models.Model):
-    """Pool of codes available for assignment to a packet file."""
+    """Pool of codes available for assignment to a packet file.
+
+    A code is unassigned until it has an `assigned_at`.
+    """
 
     class Meta:
         ordering = ["packet_file", "assigned_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["packet_file", "code"], name="unique_code_per_packet_file"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["packet_file", "id"],
+                condition=models.Q(assigned_at__isnull=True),
+                name="unassigned_code_idx",
+            )
+        ]
         verbose_name = "Distribution Code"
         verbose_name_plural = "Distribution Codes"
 
@@ -254,6 +481,8 @@ class DistributionCode(models.Model):
 
     notes = models.TextField(blank=True, help_text="Internal notes about this code")
 
+    objects = DistributionCodeQuerySet.as_manager()
+
     def __str__(self) -> str:
         access = getattr(self, "access_record", None)
         if access:
@@ -265,3 +494,216 @@ class DistributionCode(models.Model):
         """Convenience property to get assigned member through access_record."""
         access = getattr(self, "access_record", None)
         return access.member if access else None
+
+
+class PacketFileStats(models.Model):
+    """Access counters for a single packet file.
+
+    The packet admin reads these rows instead of aggregating the access
+    records on every page load. `refresh` recounts the given files; the
+    `refresh_packet_access_stats` task finds the files that have been accessed
+    or had codes handed out since they were last counted.
+    """
+
+    packet_file = models.OneToOneField(
+        PacketFile, on_delete=models.CASCADE, related_name="stats"
+    )
+    members = models.PositiveIntegerField(default=0)
+    accesses = models.PositiveIntegerField(default=0)
+    codes = models.PositiveIntegerField(default=0)
+    codes_remaining = models.PositiveIntegerField(default=0)
+
+    stale = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Packet File Stats"
+        verbose_name_plural = "Packet File Stats"
+
+    def __str__(self) -> str:
+        return f"Access stats for {self.packet_file}"
+
+    @classmethod
+    def mark_stale(cls, packet_file_ids: Iterable[int]) -> None:
+        """Have the next refresh recount the given files."""
+        cls.objects.filter(packet_file_id__in=list(packet_file_ids)).update(stale=True)
+
+    @classmethod
+    def refresh(cls, packet_file_ids: Iterable[int] | None = None) -> None:
+        """Recount the stats for the given files (or all of them)."""
+        files = PacketFile.objects.all()
+        if packet_file_ids is not None:
+            files = files.filter(pk__in=list(packet_file_ids))
+        packet_file_ids = list(files.values_list("pk", flat=True))
+
+        if not packet_file_ids:
+            return
+
+        previous = dict(
+            cls.objects.filter(packet_file_id__in=packet_file_ids).values_list(
+                "packet_file_id", "refreshed_at"
+            )
+        )
+
+        access_counts = {
+            row["packet_file_id"]: row
+            for row in PacketItemAccess.objects.filter(
+                packet_file_id__in=packet_file_ids
+            )
+            .order_by()
+            .values("packet_file_id")
+            .annotate(members=Count("id"), accesses=Sum("access_count"))
+        }
+        code_counts = {
+            row["packet_file_id"]: row
+            for row in DistributionCode.objects.filter(
+                packet_file_id__in=packet_file_ids
+            )
+            .order_by()
+            .values("packet_file_id")
+            .annotate(
+                codes=Count("id"),
+                remaining=Count("id", filter=Q(assigned_at__isnull=True)),
+            )
+        }
+
+        refreshed_at = timezone.now()
+        rows = []
+        for packet_file_id in packet_file_ids:
+            accesses = access_counts.get(packet_file_id, {})
+            codes = code_counts.get(packet_file_id, {})
+            rows.append(
+                cls(
+                    packet_file_id=packet_file_id,
+                    members=accesses.get("members", 0),
+                    accesses=accesses.get("accesses") or 0,
+                    codes=codes.get("codes", 0),
+                    codes_remaining=codes.get("remaining", 0),
+                    stale=False,
+                    refreshed_at=refreshed_at,
+                )
+            )
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["packet_file"],
+                update_fields=[
+                    "members",
+                    "accesses",
+                    "codes",
+                    "codes_remaining",
+                    "stale",
+                    "refreshed_at",
+                ],
+            )
+            PacketFileDailyStats.refresh(previous, packet_file_ids)
+
+
+class PacketFileDailyStats(models.Model):
+    """Access counters for a packet file on one day.
+
+    Access records only keep when a member first and last opened a file, so
+    `members` is counted from the members whose last access was on the day.
+    Every refresh that covers the day keeps the highest count it has seen, so
+    a day's count is complete as long as a refresh ran shortly before its end.
+    """
+
+    packet_file = models.ForeignKey(
+        PacketFile, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    day = models.DateField()
+    members = models.PositiveIntegerField(
+        default=0, help_text="Members who accessed the file on this day"
+    )
+    new_members = models.PositiveIntegerField(
+        default=0, help_text="Members who accessed the file for the first time"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["packet_file", "day"], name="unique_daily_stats_per_file"
+            )
+        ]
+        ordering = ["-day"]
+        verbose_name = "Daily Packet File Stats"
+        verbose_name_plural = "Daily Packet File Stats"
+
+    def __str__(self) -> str:
+        return f"Access stats for {self.packet_file} on {self.day}"
+
+    @classmethod
+    def refresh(
+        cls,
+        previously_refreshed: dict[int, datetime | None],
+        packet_file_ids: Iterable[int],
+    ) -> None:
+        """Recount the days since each file's stats were last refreshed."""
+        packet_file_ids = list(packet_file_ids)
+        since: dict[int, datetime | None] = {}
+        for packet_file_id in packet_file_ids:
+            refreshed_at = previously_refreshed.get(packet_file_id)
+            since[packet_file_id] = (
+                datetime.combine(
+                    timezone.localdate(refreshed_at),
+                    time.min,
+                    tzinfo=timezone.get_current_timezone(),
+                )
+                if refreshed_at
+                else None
+            )
+
+        def accessed_since(field: str) -> Q:
+            condition = Q(pk__in=[])
+            for packet_file_id, start in since.items():
+                if start is None:
+                    condition |= Q(packet_file_id=packet_file_id)
+                else:
+                    condition |= Q(
+                        packet_file_id=packet_file_id, **{f"{field}__gte": start}
+                    )
+            return condition
+
+        def count_by_day(field: str) -> dict[tuple[int, date], int]:
+            return {
+                (row["packet_file_id"], row["day"]): row["count"]
+                for row in PacketItemAccess.objects.filter(accessed_since(field))
+                .order_by()
+                .annotate(day=TruncDate(field))
+                .values("packet_file_id", "day")
+                .annotate(count=Count("id"))
+            }
+
+        members = count_by_day("last_accessed_at")
+        new_members = count_by_day("first_accessed_at")
+
+        days = members.keys() | new_members.keys()
+        if not days:
+            return
+
+        existing = {
+            (row.packet_file_id, row.day): row.members
+            for row in cls.objects.filter(
+                packet_file_id__in=packet_file_ids,
+                day__in={day for _, day in days},
+            )
+        }
+        cls.objects.bulk_create(
+            [
+                cls(
+                    packet_file_id=packet_file_id,
+                    day=day,
+                    members=max(
+                        members.get((packet_file_id, day), 0),
+                        existing.get((packet_file_id, day), 0),
+                    ),
+                    new_members=new_members.get((packet_file_id, day), 0),
+                )
+                for packet_file_id, day in days
+            ],
+            update_conflicts=True,
+            unique_fields=["packet_file", "day"],
+            update_fields=["members", "new_members"],
+        )
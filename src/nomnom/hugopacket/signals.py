@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from nomnom.hugopacket.models import (
+    DistributionCode,
+    PacketFile,
+    PacketFileStats,
+    PacketItemAccess,
+    PacketSection,
+)
+from nomnom.hugopacket.structure import bump_structure_version
+
+
+@receiver(post_save, sender=PacketSection)
+@receiver(post_delete, sender=PacketSection)
+@receiver(post_save, sender=PacketFile)
+@receiver(post_delete, sender=PacketFile)
+def structure_changed(sender, instance, **kwargs):
+    bump_structure_version(instance.packet_id)
+
+
+@receiver(post_delete, sender=PacketItemAccess)
+def access_deleted(sender, instance, **kwargs):
+    # a code is only taken while an access holds it
+    if instance.distribution_code_id is not None:
+        DistributionCode.objects.filter(pk=instance.distribution_code_id).release()
+        PacketFileStats.mark_stale([instance.packet_file_id])
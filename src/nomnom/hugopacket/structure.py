@@ -0,0 +1,87 @@
+"""The section tree of a packet.
+
+Every member sees the same sections and files, so the tree is loaded with one
+query for the sections and one for the files, put together in memory, and
+cached until the packet's structure next changes. Only what a member has
+accessed differs between requests; the views lay that over the cached tree.
+"""
+
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+
+from nomnom.cache_utils import bump_version_token, version_token
+from nomnom.hugopacket.models import ElectionPacket, PacketFile, PacketSection
+
+STRUCTURE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass
+class SectionNode:
+    section: PacketSection
+    files: list[PacketFile] = field(default_factory=list)
+    subsections: list["SectionNode"] = field(default_factory=list)
+
+
+@dataclass
+class PacketStructure:
+    sections: list[SectionNode]
+    # files that aren't in any section
+    orphan_files: list[PacketFile]
+
+
+def _version_key(packet_id: int) -> str:
+    return f"hugopacket:structure-version:{packet_id}"
+
+
+def structure_version(packet_id: int) -> str:
+    """The current version of a packet's structure."""
+    return version_token(_version_key(packet_id))
+
+
+def bump_structure_version(packet_id: int) -> None:
+    """Invalidate the cached section tree for a packet."""
+    bump_version_token(_version_key(packet_id))
+
+
+def load_structure(packet: ElectionPacket) -> PacketStructure:
+    """Load the packet's sections and files, and assemble them into a tree."""
+    nodes = {
+        section.id: SectionNode(section)
+        for section in PacketSection.objects.filter(packet=packet).order_by(
+            "position", "id"
+        )
+    }
+
+    sections = []
+    for node in nodes.values():
+        parent = nodes.get(node.section.parent_id)
+        if parent is None:
+            sections.append(node)
+        else:
+            node.section.parent = parent.section
+            parent.subsections.append(node)
+
+    orphan_files = []
+    for packet_file in PacketFile.objects.filter(packet=packet).order_by(
+        "position", "id"
+    ):
+        node = nodes.get(packet_file.section_id)
+        if node is None:
+            orphan_files.append(packet_file)
+        else:
+            packet_file.section = node.section
+            node.files.append(packet_file)
+
+    return PacketStructure(sections=sections, orphan_files=orphan_files)
+
+
+def packet_structure(packet: ElectionPacket) -> PacketStructure:
+    """The packet's section tree, from the cache if it's there."""
+    key = f"hugopacket:structure:{packet.id}:{structure_version(packet.id)}"
+    structure = cache.get(key)
+    if structure is None:
+        structure = load_structure(packet)
+        cache.set(key, structure, STRUCTURE_TIMEOUT)
+
+    return structure
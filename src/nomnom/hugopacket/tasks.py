@@ -0,0 +1,82 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.db.models import Exists, OuterRef, Q
+from django_svcs.apps import svcs_from
+
+from nomnom.hugopacket import code_import, inventory
+from nomnom.hugopacket.apps import S3Client
+from nomnom.hugopacket.models import (
+    DistributionCode,
+    ElectionPacket,
+    PacketFile,
+    PacketFileStats,
+    PacketItemAccess,
+    flush_access_counts,
+)
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def refresh_packet_metadata(packet_id: int | None = None):
+    """Refresh the cached object metadata for a packet, or for all of them."""
+    packets = ElectionPacket.objects.all()
+    if packet_id is not None:
+        packets = packets.filter(pk=packet_id)
+
+    s3 = svcs_from().get(S3Client)
+    for packet in packets:
+        metadata = inventory.refresh_metadata(packet, s3)
+        logger.info(f"Refreshed metadata for {len(metadata)} objects in {packet}")
+
+
+@shared_task
+def flush_packet_access_counts():
+    """Write the packet access counts buffered in the cache to the database."""
+    flushed = flush_access_counts()
+    logger.info(f"Flushed {flushed} buffered packet accesses")
+
+
+@shared_task
+def import_distribution_codes(packet_file_id: int, job_id: str):
+    """Import a CSV of distribution codes staged by the admin."""
+    packet_file = PacketFile.objects.get(pk=packet_file_id)
+    progress = code_import.import_staged(packet_file, job_id)
+    if progress is None:
+        logger.warning(f"Code import {job_id} for {packet_file} has expired")
+        return
+
+    logger.info(
+        f"Imported {progress.created} codes ({progress.updated} updated) "
+        f"for {packet_file}"
+    )
+
+
+@shared_task
+def refresh_packet_access_stats():
+    """Periodic catch-up for the packet file access stats.
+
+    Recounts every file whose stats are stale or missing, or that has been
+    accessed or had a code handed out since it was last counted.
+    """
+    newer_accesses = PacketItemAccess.objects.filter(
+        packet_file=OuterRef("pk"),
+        last_accessed_at__gt=OuterRef("stats__refreshed_at"),
+    )
+    newer_assignments = DistributionCode.objects.filter(
+        packet_file=OuterRef("pk"),
+        assigned_at__gt=OuterRef("stats__refreshed_at"),
+    )
+    files = PacketFile.objects.filter(
+        Q(stats__isnull=True)
+        | Q(stats__stale=True)
+        | Q(stats__refreshed_at__isnull=True)
+        | Exists(newer_accesses)
+        | Exists(newer_assignments)
+    )
+    packet_file_ids = list(files.values_list("pk", flat=True))
+    if not packet_file_ids:
+        return
+
+    logger.info(f"Refreshing access stats for {len(packet_file_ids)} packet files")
+    PacketFileStats.refresh(packet_file_ids)
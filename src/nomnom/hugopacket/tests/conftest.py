@@ -1,6 +1,27 @@
 import pytest
 from unittest.mock import MagicMock, patch
 
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+from nomnom.hugopacket.models import ElectionPacket
+from nomnom.nominate.models import (
+    Category,
+    Election,
+    NominatingMemberProfile,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Packet metadata and signed URLs are cached; start each test without them."""
+    cache.clear()
+    yield
+    cache.clear()
+
 
 @pytest.fixture(autouse=True)
 def mock_s3_client():
@@ -32,5 +53,67 @@ def mock_s3_client():
     mock_container.get = mock_get
 
     # Patch svcs_from to return our mock container
-    with patch("nomnom.hugopacket.views.svcs_from", return_value=mock_container):
+    with patch("nomnom.hugopacket.tasks.svcs_from", return_value=mock_container):
         yield mock_client
+
+
+@pytest.fixture
+def election(db):
+    """Create a test election in voting state."""
+    election = Election.objects.create(
+        slug="test-2025",
+        name="Test Hugo Awards 2025",
+    )
+    # Set election to voting state so users can access packets
+    election.state = Election.STATE.VOTING
+    election.save()
+    return election
+
+
+@pytest.fixture
+def user(db):
+    """Create a test user with vote permission."""
+    user = User.objects.create_user(
+        username="testuser",
+        email="test@example.com",
+        password="testpass123",
+    )
+    # Grant vote permission
+    vote_perm = Permission.objects.get(
+        codename="vote",
+        content_type__app_label="nominate",
+    )
+    user.user_permissions.add(vote_perm)
+    return user
+
+
+@pytest.fixture
+def member(db, user):
+    """Create a test member profile."""
+    return NominatingMemberProfile.objects.create(
+        user=user,
+        preferred_name="Test User",
+    )
+
+
+@pytest.fixture
+def packet(db, election):
+    """Create a test packet."""
+    return ElectionPacket.objects.create(
+        election=election,
+        name="Test Packet 2025",
+        s3_bucket_name="test-bucket",
+        enabled=True,
+    )
+
+
+@pytest.fixture
+def category(db, election):
+    """Create a test category."""
+    return Category.objects.create(
+        election=election,
+        name="Best Novel",
+        description="Test category",
+        field_1_description="Title",
+        ballot_position=0,
+    )
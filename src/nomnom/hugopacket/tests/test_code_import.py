@@ -0,0 +1,219 @@
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from nomnom.hugopacket import code_import, tasks
+from nomnom.hugopacket.code_import import CodeRow, import_codes, read_codes
+from nomnom.hugopacket.models import DistributionCode, PacketFile
+
+
+@pytest.fixture
+def code_file(packet):
+    return PacketFile.objects.create(
+        packet=packet,
+        name="Game Download",
+        access_type=PacketFile.AccessType.CODE,
+        s3_object_key="",
+        position=0,
+    )
+
+
+def pool(packet_file):
+    return dict(
+        DistributionCode.objects.filter(packet_file=packet_file).values_list(
+            "code", "notes"
+        )
+    )
+
+
+class TestReadCodes:
+    def test_simple_format(self):
+        assert list(read_codes(["ABC123\n", "\n", "  DEF456  \n"])) == [
+            CodeRow(1, "ABC123", ""),
+            CodeRow(3, "DEF456", ""),
+        ]
+
+    def test_csv_with_headers(self):
+        assert list(
+            read_codes(["code,notes\n", "ABC123,Batch 1\n", ",\n", "DEF456,\n"])
+        ) == [
+            CodeRow(2, "ABC123", "Batch 1"),
+            CodeRow(4, "DEF456", ""),
+        ]
+
+    def test_empty_upload(self):
+        assert list(read_codes([])) == []
+
+
+@pytest.mark.django_db
+class TestImportCodes:
+    def test_codes_are_created(self, code_file):
+        progress = import_codes(code_file, ["code,notes\n", "ABC,one\n", "DEF,\n"])
+
+        assert pool(code_file) == {"ABC": "one", "DEF": ""}
+        assert progress.created == 2
+        assert progress.finished
+
+    def test_duplicates_within_the_file_are_skipped(self, code_file):
+        progress = import_codes(code_file, ["ABC\n", "DEF\n", "ABC\n"])
+
+        assert pool(code_file) == {"ABC": "", "DEF": ""}
+        assert progress.duplicates == 1
+        assert progress.duplicate_examples == ["Line 3: ABC"]
+
+    def test_existing_codes_get_new_notes(self, code_file):
+        DistributionCode.objects.create(packet_file=code_file, code="ABC", notes="old")
+        DistributionCode.objects.create(packet_file=code_file, code="DEF", notes="kept")
+
+        progress = import_codes(
+            code_file, ["code,notes\n", "ABC,new\n", "DEF,\n", "GHI,\n"]
+        )
+
+        assert pool(code_file) == {"ABC": "new", "DEF": "kept", "GHI": ""}
+        assert progress.created == 1
+        assert progress.updated == 1
+
+    def test_reimporting_adds_nothing(self, code_file):
+        import_codes(code_file, ["ABC\n", "DEF\n"])
+        progress = import_codes(code_file, ["ABC\n", "DEF\n"])
+
+        assert DistributionCode.objects.filter(packet_file=code_file).count() == 2
+        assert progress.created == 0
+
+    def test_assigned_codes_are_untouched(self, code_file):
+        assigned_at = timezone.now()
+        DistributionCode.objects.create(
+            packet_file=code_file, code="ABC", assigned_at=assigned_at
+        )
+
+        import_codes(code_file, ["code,notes\n", "ABC,replacement\n"])
+
+        code = DistributionCode.objects.get()
+        assert code.assigned_at == assigned_at
+
+    def test_imports_in_batches(self, code_file, monkeypatch):
+        monkeypatch.setattr(code_import, "BATCH_SIZE", 100)
+        lines = [f"CODE-{i}\n" for i in range(1000)]
+
+        with CaptureQueriesContext(connection) as context:
+            progress = import_codes(code_file, lines)
+
+        assert progress.created == 1000
+        # a lookup, an insert counted before and after, and the savepoint around
+        # them, per batch, and marking the file's stats stale
+        assert len(context.captured_queries) <= 10 * 6 + 1
+        assert DistributionCode.objects.filter(packet_file=code_file).count() == 1000
+
+    def test_codes_added_concurrently_are_not_counted(self, code_file, monkeypatch):
+        DistributionCode.objects.create(packet_file=code_file, code="RACED")
+        # as if another import added the code after this one looked it up
+        monkeypatch.setattr(code_import, "_existing_codes", lambda *args: {})
+
+        progress = import_codes(code_file, ["RACED\n", "NEW\n"])
+
+        assert progress.created == 1
+        assert set(pool(code_file)) == {"RACED", "NEW"}
+
+    def test_reports_progress_per_batch(self, code_file, monkeypatch):
+        monkeypatch.setattr(code_import, "BATCH_SIZE", 2)
+        reports = []
+
+        import_codes(
+            code_file,
+            ["A\n", "B\n", "C\n"],
+            on_progress=lambda progress: reports.append(progress.created),
+        )
+
+        assert reports == [2, 3, 3]
+
+
+@pytest.mark.django_db
+class TestImportCodesAdmin:
+    def url(self, code_file):
+        return reverse("admin:hugopacket_distributioncode_import", args=[code_file.pk])
+
+    def test_small_upload_is_imported_immediately(self, admin_client, code_file):
+        upload = SimpleUploadedFile("codes.csv", b"code,notes\nABC,one\nABC,two\n")
+
+        response = admin_client.post(self.url(code_file), {"csv_file": upload})
+
+        assert response.status_code == 302
+        assert pool(code_file) == {"ABC": "one"}
+        messages = [str(m) for m in response.wsgi_request._messages]
+        assert messages == [
+            "Successfully imported 1 new codes for Game Download",
+            "Skipped 1 duplicate codes within file: Line 3: ABC",
+        ]
+
+    def test_large_upload_is_imported_in_the_background(
+        self, admin_client, code_file, monkeypatch
+    ):
+        monkeypatch.setattr(code_import, "BACKGROUND_IMPORT_SIZE", 10)
+        upload = SimpleUploadedFile(
+            "codes.csv", "".join(f"CODE-{i}\n" for i in range(50)).encode()
+        )
+
+        response = admin_client.post(self.url(code_file), {"csv_file": upload})
+
+        assert response.status_code == 302
+        assert DistributionCode.objects.filter(packet_file=code_file).count() == 50
+
+        progress_page = admin_client.get(response.url)
+        assert progress_page.status_code == 200
+        assert progress_page.context["progress"].created == 50
+        assert progress_page.context["progress"].finished
+        assert b"http-equiv" not in progress_page.content
+
+    def test_staged_uploads_are_read_back_in_chunks(self, code_file, monkeypatch):
+        monkeypatch.setattr(code_import, "STAGING_CHUNK_SIZE", 16)
+        monkeypatch.setattr(tasks.import_distribution_codes, "delay", Mock())
+        content = "".join(f"CODE-{i}\n" for i in range(50)).encode()
+
+        job_id = code_import.stage_import(
+            code_file, SimpleUploadedFile("codes.csv", content)
+        )
+        assert cache.get(code_import._upload_key(job_id)) == len(content) // 16 + 1
+
+        progress = code_import.import_staged(code_file, job_id)
+
+        assert progress.created == 50
+        assert set(pool(code_file)) == {f"CODE-{i}" for i in range(50)}
+        assert cache.get(code_import._chunk_key(job_id, 0)) is None
+
+    def test_failed_imports_are_reported(self, admin_client, code_file, monkeypatch):
+        monkeypatch.setattr(code_import, "STAGING_CHUNK_SIZE", 16)
+        monkeypatch.setattr(tasks.import_distribution_codes, "delay", Mock())
+        content = "".join(f"CODE-{i}\n" for i in range(50)).encode()
+        job_id = code_import.stage_import(
+            code_file, SimpleUploadedFile("codes.csv", content)
+        )
+        cache.delete(code_import._chunk_key(job_id, 2))
+
+        with pytest.raises(code_import.StagedUploadMissing):
+            code_import.import_staged(code_file, job_id)
+
+        response = admin_client.get(
+            reverse(
+                "admin:hugopacket_distributioncode_import_progress",
+                args=[code_file.pk, job_id],
+            )
+        )
+        assert response.context["progress"].finished
+        assert b"The import failed" in response.content
+        assert b"http-equiv" not in response.content
+
+    def test_unknown_import_is_not_found(self, admin_client, code_file):
+        response = admin_client.get(
+            reverse(
+                "admin:hugopacket_distributioncode_import_progress",
+                args=[code_file.pk, "missing"],
+            )
+        )
+
+        assert response.status_code == 404
@@ -0,0 +1,123 @@
+import csv
+import io
+
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from nomnom.hugopacket import exports
+from nomnom.hugopacket.admin import DistributionCodeAdmin, PacketItemAccessAdmin
+from nomnom.hugopacket.models import DistributionCode, PacketFile, PacketItemAccess
+from nomnom.nominate.models import NominatingMemberProfile
+
+
+@pytest.fixture
+def code_file(packet):
+    return PacketFile.objects.create(
+        packet=packet,
+        name="Game Download",
+        access_type=PacketFile.AccessType.CODE,
+        s3_object_key="",
+    )
+
+
+@pytest.fixture
+def members(django_user_model):
+    users = django_user_model.objects.bulk_create(
+        django_user_model(username=f"member-{i}", email=f"member-{i}@example.com")
+        for i in range(10)
+    )
+    return NominatingMemberProfile.objects.bulk_create(
+        NominatingMemberProfile(user=user, preferred_name=f"Member {i}")
+        for i, user in enumerate(users)
+    )
+
+
+@pytest.fixture
+def assigned_codes(code_file, members):
+    codes = DistributionCode.objects.bulk_create(
+        DistributionCode(
+            packet_file=code_file,
+            code=f"CODE-{i:02}",
+            assigned_at=timezone.now() if i < len(members) else None,
+            notes=f"note {i}",
+        )
+        for i in range(15)
+    )
+    PacketItemAccess.objects.bulk_create(
+        PacketItemAccess(
+            packet_file=code_file, member=member, distribution_code=code, access_count=i
+        )
+        for i, (member, code) in enumerate(zip(members, codes))
+    )
+    return codes
+
+
+def read_csv(response):
+    assert isinstance(response, StreamingHttpResponse)
+    content = b"".join(response.streaming_content).decode()
+    return list(csv.reader(io.StringIO(content)))
+
+
+@pytest.mark.django_db
+def test_chunked_reads_everything_in_order(assigned_codes):
+    codes = list(exports.chunked(DistributionCode.objects.all(), chunk_size=4))
+
+    assert codes == sorted(assigned_codes, key=lambda code: code.pk)
+
+
+@pytest.mark.django_db
+class TestExportCodes:
+    def export(self):
+        admin = DistributionCodeAdmin(DistributionCode, AdminSite())
+        request = RequestFactory().post("/admin/")
+        return admin.export_codes(request, DistributionCode.objects.all())
+
+    def test_export_lists_every_code(self, assigned_codes):
+        rows = read_csv(self.export())
+
+        assert rows[0] == exports.DISTRIBUTION_CODE_HEADER
+        assert len(rows) == 16
+        assert rows[1][:3] == ["CODE-00", "Game Download", "Member 0"]
+        assert rows[-1] == ["CODE-14", "Game Download", "", "", "note 14"]
+
+    def test_export_queries_per_chunk(self, assigned_codes, monkeypatch):
+        monkeypatch.setattr(exports, "CHUNK_SIZE", 5)
+        response = self.export()
+
+        with CaptureQueriesContext(connection) as context:
+            read_csv(response)
+
+        # 15 codes in three chunks of five, and a last empty one
+        assert len(context.captured_queries) == 4
+
+
+@pytest.mark.django_db
+class TestExportAccesses:
+    def export(self):
+        admin = PacketItemAccessAdmin(PacketItemAccess, AdminSite())
+        request = RequestFactory().post("/admin/")
+        return admin.export_accesses(request, PacketItemAccess.objects.all())
+
+    def test_export_lists_every_access(self, assigned_codes):
+        rows = read_csv(self.export())
+
+        assert rows[0] == exports.ACCESS_HEADER
+        assert len(rows) == 11
+        assert rows[1][:4] == [
+            "Member 0",
+            "member-0@example.com",
+            "Game Download",
+            "0",
+        ]
+        assert rows[1][-1] == "CODE-00"
+
+    def test_export_queries_do_not_grow_with_rows(self, assigned_codes):
+        with CaptureQueriesContext(connection) as context:
+            read_csv(self.export())
+
+        assert len(context.captured_queries) == 1
@@ -0,0 +1,224 @@
+import threading
+import time
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+from botocore.exceptions import ClientError
+from django.contrib.admin.sites import AdminSite
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory
+from django.urls import reverse
+
+from nomnom.hugopacket import inventory
+from nomnom.hugopacket.admin import ElectionPacketAdmin
+from nomnom.hugopacket.inventory import PacketFileMetadata
+from nomnom.hugopacket.models import ElectionPacket, PacketFile
+
+MODIFIED = datetime(2025, 5, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def packet_file(packet):
+    return PacketFile.objects.create(
+        packet=packet,
+        name="Novel PDF",
+        access_type=PacketFile.AccessType.DOWNLOAD,
+        s3_object_key="novels/novel.pdf",
+    )
+
+
+def listing(*keys: str, size: int = 2048) -> dict:
+    return {
+        "Contents": [
+            {"Key": key, "Size": size, "LastModified": MODIFIED} for key in keys
+        ]
+    }
+
+
+@pytest.mark.django_db
+class TestRefreshMetadata:
+    def test_refresh_caches_the_listing(self, packet, packet_file, mock_s3_client):
+        mock_s3_client.list_objects_v2.return_value = listing("novels/novel.pdf")
+
+        inventory.refresh_metadata(packet, mock_s3_client)
+
+        assert inventory.cached_metadata(packet) == {
+            "novels/novel.pdf": PacketFileMetadata(MODIFIED, 2048)
+        }
+
+    def test_failed_listing_keeps_previous_metadata(
+        self, packet, packet_file, mock_s3_client
+    ):
+        mock_s3_client.list_objects_v2.return_value = listing("novels/novel.pdf")
+        inventory.refresh_metadata(packet, mock_s3_client)
+
+        mock_s3_client.list_objects_v2.side_effect = ClientError(
+            {"Error": {"Code": "SlowDown"}}, "ListObjectsV2"
+        )
+        inventory.refresh_metadata(packet, mock_s3_client)
+
+        assert "novels/novel.pdf" in inventory.cached_metadata(packet)
+
+    def test_missing_metadata_queues_one_refresh(self, packet):
+        with patch("nomnom.hugopacket.tasks.refresh_packet_metadata.delay") as delay:
+            assert inventory.cached_metadata(packet) == {}
+            assert inventory.cached_metadata(packet) == {}
+
+        delay.assert_called_once_with(packet.id)
+
+    def test_task_refreshes_the_packet(self, packet, packet_file, mock_s3_client):
+        from nomnom.hugopacket import tasks
+
+        mock_s3_client.list_objects_v2.return_value = listing("novels/novel.pdf")
+
+        tasks.refresh_packet_metadata(packet.id)
+
+        assert "novels/novel.pdf" in inventory.cached_metadata(packet)
+
+
+@pytest.mark.django_db
+class TestIndexUsesTheCache:
+    def url(self, packet):
+        return reverse(
+            "hugopacket:election_packet", kwargs={"election_id": packet.election.slug}
+        )
+
+    def test_index_does_not_list_the_bucket(
+        self, client, user, member, packet, packet_file, mock_s3_client
+    ):
+        mock_s3_client.list_objects_v2.return_value = listing(
+            "novels/novel.pdf", size=3 * 1024 * 1024
+        )
+        inventory.refresh_metadata(packet, mock_s3_client)
+        mock_s3_client.list_objects_v2.reset_mock()
+
+        client.force_login(user)
+        response = client.get(self.url(packet))
+
+        assert response.status_code == 200
+        assert "3.0\xa0MB" in response.content.decode()
+        mock_s3_client.list_objects_v2.assert_not_called()
+
+    def test_index_without_metadata_still_renders(
+        self, client, user, member, packet, packet_file
+    ):
+        client.force_login(user)
+        with patch("nomnom.hugopacket.tasks.refresh_packet_metadata.delay") as delay:
+            response = client.get(self.url(packet))
+
+        assert response.status_code == 200
+        assert "Novel PDF" in response.content.decode()
+        delay.assert_called_once_with(packet.id)
+
+
+@pytest.mark.django_db
+def test_admin_refresh_action_queues_refreshes(packet):
+    request = RequestFactory().get("/admin/")
+    request.session = {}
+    request._messages = FallbackStorage(request)
+
+    admin = ElectionPacketAdmin(ElectionPacket, AdminSite())
+    with patch("nomnom.hugopacket.tasks.refresh_packet_metadata.delay") as delay:
+        admin.refresh_file_metadata(request, ElectionPacket.objects.all())
+
+    delay.assert_called_once_with(packet.id)
+
+
+class FakeS3:
+    """An in-memory stand-in for a bucket's ListObjectsV2.
+
+    Pages are `page_size` objects long, and the calls are recorded, along with
+    the most that were in flight at once.
+    """
+
+    def __init__(self, keys, page_size=1000, failing_prefixes=()):
+        self.objects = {
+            key: {"Key": key, "Size": 2048, "LastModified": MODIFIED}
+            for key in sorted(keys)
+        }
+        self.page_size = page_size
+        self.failing_prefixes = set(failing_prefixes)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None):
+        with self.lock:
+            self.calls.append((Prefix, ContinuationToken))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            # give the other workers a chance to overlap with this one
+            time.sleep(0.01)
+            if Prefix in self.failing_prefixes:
+                raise ClientError({"Error": {"Code": "SlowDown"}}, "ListObjectsV2")
+
+            matching = [key for key in self.objects if key.startswith(Prefix)]
+            start = int(ContinuationToken or 0)
+            page = matching[start : start + self.page_size]
+            response = {
+                "Contents": [self.objects[key] for key in page],
+                "IsTruncated": start + self.page_size < len(matching),
+            }
+            if response["IsTruncated"]:
+                response["NextContinuationToken"] = str(start + self.page_size)
+            return response
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TestScan:
+    def test_nested_prefixes_are_merged(self):
+        assert inventory.merge_prefixes(
+            ["novels/", "novels/finalists/", "art/", "novels/", "art/pro/x/"]
+        ) == ["art/", "novels/"]
+
+    def test_top_level_keys_are_their_own_prefix(self):
+        assert inventory.key_prefix("readme.txt") == "readme.txt"
+        assert inventory.key_prefix("novels/a/b.pdf") == "novels/a/"
+
+    def test_listing_follows_continuation_tokens(self):
+        keys = [f"novels/{i:03}.pdf" for i in range(25)]
+        s3 = FakeS3(keys, page_size=10)
+
+        result = inventory.scan(s3, "bucket", ["novels/001.pdf"])
+
+        assert sorted(result.objects) == keys
+        assert s3.calls == [("novels/", None), ("novels/", "10"), ("novels/", "20")]
+
+    def test_each_merged_prefix_is_listed_once(self):
+        s3 = FakeS3(["novels/a.pdf", "novels/finalists/b.pdf", "art/c.png"])
+
+        result = inventory.scan(
+            s3,
+            "bucket",
+            ["novels/a.pdf", "novels/finalists/b.pdf", "art/c.png", ""],
+        )
+
+        assert set(result.objects) == {
+            "novels/a.pdf",
+            "novels/finalists/b.pdf",
+            "art/c.png",
+        }
+        assert sorted(prefix for prefix, _ in s3.calls) == ["art/", "novels/"]
+
+    def test_listings_are_bounded(self):
+        keys = [f"section-{i}/{j}.pdf" for i in range(20) for j in range(3)]
+        s3 = FakeS3(keys, page_size=2)
+
+        result = inventory.scan(s3, "bucket", keys, max_workers=4)
+
+        assert set(result.objects) == set(keys)
+        assert 1 < s3.max_in_flight <= 4
+
+    def test_failed_prefixes_are_reported(self):
+        s3 = FakeS3(["novels/a.pdf", "art/c.png"], failing_prefixes=["art/"])
+
+        result = inventory.scan(s3, "bucket", ["novels/a.pdf", "art/c.png"])
+
+        assert set(result.objects) == {"novels/a.pdf"}
+        assert result.failed == ["art/"]
@@ -1,85 +1,43 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import boto3
 import pytest
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Permission
+from django.db import connection
+from django.core.cache import cache
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from nomnom.hugopacket.apps import (
+    URL_SAFETY_MARGIN,
+    DigitalOceanCDNResolver,
+    PacketAccess,
+    PacketItemResolver,
+)
 from nomnom.hugopacket.models import (
     DistributionCode,
     ElectionPacket,
     PacketFile,
     PacketItemAccess,
     PacketSection,
+    _pending_count_key,
+    _pending_time_key,
+    flush_access_counts,
 )
-from nomnom.nominate.models import (
-    Category,
-    Election,
-    NominatingMemberProfile,
-)
+from nomnom.hugopacket.views import download_packet, index
+from nomnom.nominate.models import NominatingMemberProfile
 
 User = get_user_model()
 
-
-@pytest.fixture
-def election(db):
-    """Create a test election in voting state."""
-    election = Election.objects.create(
-        slug="test-2025",
-        name="Test Hugo Awards 2025",
-    )
-    # Set election to voting state so users can access packets
-    election.state = Election.STATE.VOTING
-    election.save()
-    return election
-
-
-@pytest.fixture
-def user(db):
-    """Create a test user with vote permission."""
-    user = User.objects.create_user(
-        username="testuser",
-        email="test@example.com",
-        password="testpass123",
-    )
-    # Grant vote permission
-    vote_perm = Permission.objects.get(
-        codename="vote",
-        content_type__app_label="nominate",
-    )
-    user.user_permissions.add(vote_perm)
-    return user
-
-
-@pytest.fixture
-def member(db, user):
-    """Create a test member profile."""
-    return NominatingMemberProfile.objects.create(
-        user=user,
-        preferred_name="Test User",
-    )
-
-
-@pytest.fixture
-def packet(db, election):
-    """Create a test packet."""
-    return ElectionPacket.objects.create(
-        election=election,
-        name="Test Packet 2025",
-        s3_bucket_name="test-bucket",
-        enabled=True,
-    )
-
-
-@pytest.fixture
-def category(db, election):
-    """Create a test category."""
-    return Category.objects.create(
-        election=election,
-        name="Best Novel",
-        description="Test category",
-        field_1_description="Title",
-        ballot_position=0,
-    )
+# claimers running at once in the concurrency test; each has its own connection
+CLAIM_THREADS = 32
 
 
 @pytest.mark.django_db
@@ -312,6 +270,24 @@ class TestPacketItemAccess:
         assert access.access_count == 1
         assert access.last_accessed_at > initial_time
 
+    def test_increment_access_is_atomic(self, packet, member):
+        """Increments from stale instances are not lost."""
+        file = PacketFile.objects.create(
+            packet=packet,
+            name="Test File",
+            access_type=PacketFile.AccessType.DOWNLOAD,
+            s3_object_key="test/file.pdf",
+            position=0,
+        )
+        access = PacketItemAccess.objects.create(packet_file=file, member=member)
+
+        stale = [PacketItemAccess.objects.get(pk=access.pk) for _ in range(3)]
+        for instance in stale:
+            instance.increment_access()
+
+        access.refresh_from_db()
+        assert access.access_count == 3
+
     def test_unique_constraint(self, packet, member):
         """Test that only one access record per member per file is allowed."""
         file = PacketFile.objects.create(
@@ -335,6 +311,224 @@ class TestPacketItemAccess:
             )
 
 
+class TestPacketItemResolver:
+    """Tests for the presigned URL cache."""
+
+    @pytest.fixture
+    def s3(self):
+        client = MagicMock()
+        client.generate_presigned_url.side_effect = lambda *args, **kwargs: (
+            f"https://bucket.example.com/{kwargs['Params']['Key']}"
+            f"?n={client.generate_presigned_url.call_count}"
+        )
+        return client
+
+    def test_url_is_signed_once(self, s3):
+        urls = {
+            PacketItemResolver(s3, "bucket", "novels/novel.pdf").get_url()
+            for _ in range(5)
+        }
+
+        assert urls == {"https://bucket.example.com/novels/novel.pdf?n=1"}
+        assert s3.generate_presigned_url.call_count == 1
+
+    def test_urls_are_cached_per_file(self, s3):
+        novel = PacketItemResolver(s3, "bucket", "novels/novel.pdf").get_url()
+        story = PacketItemResolver(s3, "bucket", "stories/story.pdf").get_url()
+        other = PacketItemResolver(s3, "other", "novels/novel.pdf").get_url()
+
+        assert len({novel, story, other}) == 3
+
+    @override_settings(HUGOPACKET_AWS_CDN_HOSTNAME="cdn.example.com")
+    def test_urls_are_cached_per_resolver(self, s3):
+        signed = PacketItemResolver(s3, "bucket", "novels/novel.pdf").get_url()
+        cdn = DigitalOceanCDNResolver(s3, "bucket", "novels/novel.pdf").get_url()
+
+        assert signed.startswith("https://bucket.example.com/")
+        assert cdn.startswith("https://cdn.example.com/")
+        assert (
+            DigitalOceanCDNResolver(s3, "bucket", "novels/novel.pdf").get_url() == cdn
+        )
+
+    def test_short_lived_urls_are_not_cached(self, s3):
+        resolver = PacketItemResolver(s3, "bucket", "novels/novel.pdf", expiry=60)
+
+        assert resolver.get_url() != resolver.get_url()
+
+    def test_urls_are_cached_until_the_safety_margin(self, s3):
+        with patch("nomnom.hugopacket.apps.cache") as cache:
+            cache.get.return_value = None
+            PacketItemResolver(s3, "bucket", "novels/novel.pdf").get_url()
+
+        cache.set.assert_called_once()
+        assert cache.set.call_args.args[2] == 60 * 60 - URL_SAFETY_MARGIN
+
+    def test_async_signing_is_bounded(self, s3):
+        running = 0
+        most_running = 0
+        lock = threading.Lock()
+
+        def slow_sign(*args, **kwargs):
+            nonlocal running, most_running
+            with lock:
+                running += 1
+                most_running = max(most_running, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return f"https://bucket.example.com/{kwargs['Params']['Key']}"
+
+        s3.generate_presigned_url.side_effect = slow_sign
+
+        async def sign_all():
+            return await asyncio.gather(
+                *(
+                    PacketItemResolver(s3, "bucket", f"file-{i}.pdf").aget_url()
+                    for i in range(8)
+                )
+            )
+
+        with (
+            ThreadPoolExecutor(max_workers=2) as executor,
+            patch("nomnom.hugopacket.apps.s3_executor", return_value=executor),
+        ):
+            urls = asyncio.run(sign_all())
+
+        assert urls == [f"https://bucket.example.com/file-{i}.pdf" for i in range(8)]
+        assert most_running == 2
+
+
+@pytest.mark.django_db
+class TestBufferedAccessCounts:
+    """Tests for access counts written behind through the cache."""
+
+    @pytest.fixture(autouse=True)
+    def buffered(self, settings):
+        settings.HUGOPACKET_BUFFER_ACCESS_COUNTS = True
+
+    @pytest.fixture
+    def access(self, packet, member):
+        file = PacketFile.objects.create(
+            packet=packet,
+            name="Test File",
+            access_type=PacketFile.AccessType.DOWNLOAD,
+            s3_object_key="test/file.pdf",
+            position=0,
+        )
+        return PacketItemAccess.objects.create(packet_file=file, member=member)
+
+    @pytest.fixture
+    def other_access(self, access):
+        user = User.objects.create_user(username="other")
+        other = NominatingMemberProfile.objects.create(user=user, preferred_name="O")
+        return PacketItemAccess.objects.create(
+            packet_file=access.packet_file, member=other
+        )
+
+    def test_accesses_are_not_written(self, access):
+        with CaptureQueriesContext(connection) as context:
+            access.increment_access()
+            PacketItemAccess.objects.get(pk=access.pk).increment_access()
+
+        assert len(context.captured_queries) == 1  # just the get
+        assert PacketItemAccess.objects.get(pk=access.pk).access_count == 0
+
+    def test_instance_includes_pending_accesses(self, access):
+        for _ in range(2):
+            PacketItemAccess.objects.get(pk=access.pk).increment_access()
+
+        reloaded = PacketItemAccess.objects.get(pk=access.pk)
+        reloaded.increment_access()
+
+        assert reloaded.access_count == 3
+
+    def test_flush_writes_the_counts(self, access, other_access):
+        for _ in range(3):
+            access.increment_access()
+        other_access.increment_access()
+
+        assert flush_access_counts(batch_size=1) == 4
+
+        access.refresh_from_db()
+        other_access.refresh_from_db()
+        assert access.access_count == 3
+        assert access.last_accessed_at == cache.get(_pending_time_key(access.pk))
+        assert other_access.access_count == 1
+
+        # and nothing is written twice
+        assert flush_access_counts() == 0
+        access.refresh_from_db()
+        assert access.access_count == 3
+
+    def test_accesses_during_a_flush_are_kept(self, access):
+        access.increment_access()
+
+        get_many = cache.get_many
+
+        def access_while_flushing(keys):
+            found = get_many(keys)
+            if _pending_count_key(access.pk) in keys:
+                access.increment_access()
+            return found
+
+        with patch.object(cache, "get_many", side_effect=access_while_flushing):
+            flush_access_counts()
+
+        flush_access_counts()
+        access.refresh_from_db()
+        assert access.access_count == 2
+
+    def test_flush_only_reads_buffered_accesses(self, access, other_access):
+        access.increment_access()
+        get_many = cache.get_many
+        read = []
+
+        def recording_get_many(keys):
+            read.extend(keys)
+            return get_many(keys)
+
+        with patch.object(cache, "get_many", side_effect=recording_get_many):
+            flush_access_counts()
+
+        assert _pending_count_key(access.pk) in read
+        assert _pending_count_key(other_access.pk) not in read
+
+    def test_accesses_listed_during_a_flush_are_flushed_next_time(self, access):
+        # as if this access was listed just after a flush read the list
+        access.increment_access()
+        flush_access_counts()
+        cache.incr(_pending_count_key(access.pk))
+
+        assert flush_access_counts() == 1
+        access.refresh_from_db()
+        assert access.access_count == 2
+
+    def test_lost_counters_are_written_directly(self, access):
+        with patch.object(cache, "incr", side_effect=ValueError):
+            access.increment_access()
+
+        access.refresh_from_db()
+        assert access.access_count == 1
+
+    def test_flush_survives_lost_counters(self, access):
+        access.increment_access()
+
+        with patch.object(cache, "decr", side_effect=ValueError):
+            assert flush_access_counts() == 1
+
+        access.refresh_from_db()
+        assert access.access_count == 1
+
+    def test_task_flushes(self, access):
+        from nomnom.hugopacket import tasks
+
+        access.increment_access()
+        tasks.flush_packet_access_counts.delay()
+
+        access.refresh_from_db()
+        assert access.access_count == 1
+
+
 @pytest.mark.django_db
 class TestDistributionCode:
     """Tests for DistributionCode model."""
@@ -387,6 +581,126 @@ class TestDistributionCode:
         assert access.distribution_code == code
 
 
+@pytest.mark.django_db
+class TestClaimingCodes:
+    """Tests for handing out distribution codes."""
+
+    @pytest.fixture
+    def code_file(self, packet):
+        return PacketFile.objects.create(
+            packet=packet,
+            name="Game Download",
+            access_type=PacketFile.AccessType.CODE,
+            s3_object_key="",
+            position=0,
+        )
+
+    def test_claim_takes_an_unassigned_code(self, code_file):
+        DistributionCode.objects.create(
+            packet_file=code_file, code="TAKEN", assigned_at=timezone.now()
+        )
+        DistributionCode.objects.create(packet_file=code_file, code="FREE")
+
+        code = DistributionCode.objects.claim(code_file.id)
+
+        assert code.code == "FREE"
+        assert code.assigned_at is not None
+        assert DistributionCode.objects.claim(code_file.id) is None
+
+    def test_deleting_the_access_releases_its_code(self, code_file, member):
+        DistributionCode.objects.create(packet_file=code_file, code="CODE")
+        access = PacketItemAccess.objects.create(packet_file=code_file, member=member)
+        code = access.assign_code()
+
+        access.delete()
+
+        assert DistributionCode.objects.claim(code_file.id) == code
+
+    def test_changing_the_code_in_the_admin_releases_the_old_one(
+        self, admin_client, code_file, member
+    ):
+        old, new = DistributionCode.objects.bulk_create(
+            DistributionCode(packet_file=code_file, code=code)
+            for code in ["OLD", "NEW"]
+        )
+        access = PacketItemAccess.objects.create(packet_file=code_file, member=member)
+        assert access.assign_code() == old
+
+        response = admin_client.post(
+            reverse("admin:hugopacket_packetitemaccess_change", args=[access.pk]),
+            {
+                "member": member.pk,
+                "packet_file": code_file.pk,
+                "distribution_code": new.pk,
+            },
+        )
+
+        assert response.status_code == 302
+        assert list(DistributionCode.objects.unassigned()) == [old]
+        new.refresh_from_db()
+        assert new.assigned_at is not None
+
+    def test_assign_code_keeps_the_members_code(self, code_file, member):
+        DistributionCode.objects.bulk_create(
+            DistributionCode(packet_file=code_file, code=f"CODE-{i}") for i in range(3)
+        )
+        access = PacketItemAccess.objects.create(packet_file=code_file, member=member)
+
+        code = access.assign_code()
+
+        assert access.assign_code() == code
+        assert PacketItemAccess.objects.get().assign_code() == code
+        assert DistributionCode.objects.unassigned().count() == 2
+
+    def test_assign_code_from_an_empty_pool(self, code_file, member):
+        access = PacketItemAccess.objects.create(packet_file=code_file, member=member)
+
+        assert access.assign_code() is None
+        assert access.distribution_code is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_claimers_get_distinct_codes(self, code_file):
+        claimers, codes = 300, 250
+        users = User.objects.bulk_create(
+            User(username=f"claimer-{i}") for i in range(claimers)
+        )
+        members = NominatingMemberProfile.objects.bulk_create(
+            NominatingMemberProfile(user=user, preferred_name=user.username)
+            for user in users
+        )
+        accesses = PacketItemAccess.objects.bulk_create(
+            PacketItemAccess(packet_file=code_file, member=member) for member in members
+        )
+        DistributionCode.objects.bulk_create(
+            DistributionCode(packet_file=code_file, code=f"CODE-{i}")
+            for i in range(codes)
+        )
+
+        start = threading.Barrier(CLAIM_THREADS, timeout=30)
+
+        def claim(access):
+            try:
+                if access.pk <= accesses[CLAIM_THREADS - 1].pk:
+                    # the first claimers all start at once
+                    start.wait()
+                code = access.assign_code()
+                return code.code if code else None
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=CLAIM_THREADS) as pool:
+            claimed = list(pool.map(claim, accesses))
+
+        handed_out = [code for code in claimed if code is not None]
+        assert len(handed_out) == codes
+        assert len(set(handed_out)) == codes
+        assert not DistributionCode.objects.unassigned().exists()
+        assert (
+            PacketItemAccess.objects.filter(distribution_code__isnull=False).count()
+            == codes
+        )
+
+
 @pytest.mark.django_db
 class TestPacketViews:
     """Tests for packet views."""
@@ -475,6 +789,55 @@ class TestPacketViews:
         assert access.distribution_code == code
         assert access.access_count == 1
 
+    def test_views_are_async(self):
+        assert inspect.iscoroutinefunction(index)
+        assert inspect.iscoroutinefunction(download_packet)
+
+    def test_download_redirects_to_a_signed_url(self, client, user, member, packet):
+        # a local S3 stand-in: presigning happens without contacting it
+        s3 = boto3.client(
+            "s3",
+            endpoint_url="http://localhost:9000",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+            region_name="us-east-1",
+        )
+        signing_threads = []
+        original_sign = PacketItemResolver.sign_url
+
+        def sign_url(resolver):
+            signing_threads.append(threading.current_thread().name)
+            return original_sign(resolver)
+
+        container = MagicMock()
+        container.get.return_value = PacketAccess(s3, PacketItemResolver)
+
+        file = PacketFile.objects.create(
+            packet=packet,
+            name="Novel PDF",
+            access_type=PacketFile.AccessType.DOWNLOAD,
+            s3_object_key="novels/novel.pdf",
+        )
+        client.force_login(user)
+        url = reverse(
+            "hugopacket:download_packet",
+            kwargs={"election_id": packet.election.slug, "packet_file_id": file.id},
+        )
+
+        with (
+            patch("nomnom.hugopacket.models.svcs_from", return_value=container),
+            patch.object(PacketItemResolver, "sign_url", sign_url),
+        ):
+            response = client.get(url)
+
+        assert response.status_code == 302
+        assert response.url.startswith("http://localhost:9000/")
+        assert "novels/novel.pdf" in response.url
+        assert "Signature=" in response.url
+        assert signing_threads[0].startswith("hugopacket-s3")
+        access = PacketItemAccess.objects.get(packet_file=file, member=member)
+        assert access.access_count == 1
+
 
 @pytest.mark.django_db
 class TestAdminActions:
@@ -0,0 +1,195 @@
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from nomnom.hugopacket import tasks
+from nomnom.hugopacket.models import (
+    DistributionCode,
+    PacketFile,
+    PacketFileDailyStats,
+    PacketFileStats,
+    PacketItemAccess,
+    flush_access_counts,
+)
+from nomnom.nominate.models import NominatingMemberProfile
+
+DAY_1 = datetime(2025, 5, 1, 12, tzinfo=UTC)
+DAY_2 = DAY_1 + timedelta(days=1)
+
+
+@pytest.fixture
+def code_file(packet):
+    return PacketFile.objects.create(
+        packet=packet,
+        name="Game Download",
+        access_type=PacketFile.AccessType.CODE,
+        s3_object_key="",
+    )
+
+
+@pytest.fixture
+def members(django_user_model):
+    users = django_user_model.objects.bulk_create(
+        django_user_model(username=f"member-{i}") for i in range(3)
+    )
+    return NominatingMemberProfile.objects.bulk_create(
+        NominatingMemberProfile(user=user, preferred_name=f"Member {i}")
+        for i, user in enumerate(users)
+    )
+
+
+def access(packet_file, member, count, first, last):
+    record = PacketItemAccess.objects.create(
+        packet_file=packet_file, member=member, access_count=count
+    )
+    PacketItemAccess.objects.filter(pk=record.pk).update(
+        first_accessed_at=first, last_accessed_at=last
+    )
+    return record
+
+
+def daily(packet_file):
+    return {
+        row.day: (row.members, row.new_members)
+        for row in PacketFileDailyStats.objects.filter(packet_file=packet_file)
+    }
+
+
+@pytest.mark.django_db
+class TestRefresh:
+    def test_counts_accesses_and_codes(self, code_file, members):
+        codes = DistributionCode.objects.bulk_create(
+            DistributionCode(packet_file=code_file, code=f"CODE-{i}") for i in range(5)
+        )
+        DistributionCode.objects.filter(pk=codes[0].pk).update(
+            assigned_at=timezone.now()
+        )
+        access(code_file, members[0], 3, DAY_1, DAY_1)
+        access(code_file, members[1], 4, DAY_1, DAY_2)
+
+        PacketFileStats.refresh([code_file.id])
+
+        stats = PacketFileStats.objects.get(packet_file=code_file)
+        assert (stats.members, stats.accesses) == (2, 7)
+        assert (stats.codes, stats.codes_remaining) == (5, 4)
+        assert not stats.stale
+
+    def test_files_without_accesses_are_counted(self, code_file):
+        PacketFileStats.refresh()
+
+        stats = PacketFileStats.objects.get(packet_file=code_file)
+        assert (stats.members, stats.accesses, stats.codes) == (0, 0, 0)
+
+    def test_counts_members_per_day(self, code_file, members):
+        access(code_file, members[0], 1, DAY_1, DAY_1)
+        access(code_file, members[1], 2, DAY_1, DAY_2)
+        access(code_file, members[2], 1, DAY_2, DAY_2)
+
+        PacketFileStats.refresh([code_file.id])
+
+        assert daily(code_file) == {
+            date(2025, 5, 1): (1, 2),
+            date(2025, 5, 2): (2, 1),
+        }
+
+    def test_days_keep_their_highest_count(self, code_file, members):
+        first = access(code_file, members[0], 1, DAY_1, DAY_1)
+        access(code_file, members[1], 1, DAY_1, DAY_1)
+        PacketFileStats.refresh([code_file.id])
+        PacketFileStats.objects.update(refreshed_at=DAY_1)
+
+        # a member comes back the next day; they still counted on the first
+        PacketItemAccess.objects.filter(pk=first.pk).update(last_accessed_at=DAY_2)
+        PacketFileStats.refresh([code_file.id])
+
+        assert daily(code_file) == {
+            date(2025, 5, 1): (2, 2),
+            date(2025, 5, 2): (1, 0),
+        }
+
+
+@pytest.mark.django_db
+class TestRefreshTask:
+    def test_refreshes_only_changed_files(self, packet, code_file, members):
+        other = PacketFile.objects.create(
+            packet=packet, name="Novel", s3_object_key="novel.pdf"
+        )
+        tasks.refresh_packet_access_stats()
+        refreshed_at = PacketFileStats.objects.get(packet_file=other).refreshed_at
+
+        PacketItemAccess.objects.create(packet_file=code_file, member=members[0])
+        tasks.refresh_packet_access_stats()
+
+        assert PacketFileStats.objects.get(packet_file=code_file).members == 1
+        assert PacketFileStats.objects.get(packet_file=other).refreshed_at == (
+            refreshed_at
+        )
+
+    def test_refreshes_files_with_handed_out_codes(self, code_file):
+        DistributionCode.objects.create(packet_file=code_file, code="CODE")
+        PacketFileStats.refresh([code_file.id])
+
+        DistributionCode.objects.claim(code_file.id)
+        tasks.refresh_packet_access_stats()
+
+        assert PacketFileStats.objects.get(packet_file=code_file).codes_remaining == 0
+
+    def test_refreshes_stale_files(self, code_file):
+        PacketFileStats.refresh([code_file.id])
+        DistributionCode.objects.create(packet_file=code_file, code="CODE")
+        PacketFileStats.mark_stale([code_file.id])
+
+        tasks.refresh_packet_access_stats()
+
+        assert PacketFileStats.objects.get(packet_file=code_file).codes == 1
+
+    def test_flushed_accesses_made_before_a_refresh_are_counted(
+        self, settings, code_file, members
+    ):
+        settings.HUGOPACKET_BUFFER_ACCESS_COUNTS = True
+        record = access(code_file, members[0], 1, DAY_1, DAY_1)
+        record.increment_access()
+        # a refresh runs between the access and the flush
+        tasks.refresh_packet_access_stats()
+        assert PacketFileStats.objects.get(packet_file=code_file).accesses == 1
+
+        flush_access_counts()
+        tasks.refresh_packet_access_stats()
+
+        assert PacketFileStats.objects.get(packet_file=code_file).accesses == 2
+
+
+@pytest.mark.django_db
+class TestAdmin:
+    def test_changelist_reads_the_stats(self, admin_client, code_file, members):
+        for member in members:
+            access(code_file, member, 5, DAY_1, DAY_1)
+        PacketFileStats.refresh([code_file.id])
+        url = reverse("admin:hugopacket_packetfile_changelist")
+        admin_client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(url)
+
+        assert "3 members (15 total)" in response.content.decode()
+        assert not [
+            query
+            for query in context.captured_queries
+            if "hugopacket_packetitemaccess" in query["sql"]
+        ]
+
+    def test_deleting_codes_marks_the_stats_stale(self, admin_client, code_file):
+        code = DistributionCode.objects.create(packet_file=code_file, code="CODE")
+        PacketFileStats.refresh([code_file.id])
+
+        response = admin_client.post(
+            reverse("admin:hugopacket_distributioncode_delete", args=[code.pk]),
+            {"post": "yes"},
+        )
+
+        assert response.status_code == 302
+        assert PacketFileStats.objects.get(packet_file=code_file).stale
@@ -0,0 +1,165 @@
+from unittest.mock import Mock
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from nomnom.hugopacket import structure
+from nomnom.hugopacket.admin import assign_section
+from nomnom.hugopacket.models import (
+    PacketFile,
+    PacketItemAccess,
+    PacketSection,
+)
+from nomnom.nominate.models import NominatingMemberProfile
+
+
+def make_tree(packet, depth):
+    """A chain of nested sections, with a file in each."""
+    parent = None
+    for level in range(depth):
+        parent = PacketSection.objects.create(
+            packet=packet, parent=parent, name=f"Level {level}", position=0
+        )
+        PacketFile.objects.create(
+            packet=packet,
+            section=parent,
+            name=f"File {level}",
+            s3_object_key=f"level-{level}.pdf",
+        )
+
+
+def section_queries(context):
+    return [
+        query
+        for query in context.captured_queries
+        if "hugopacket_packetsection" in query["sql"]
+    ]
+
+
+@pytest.mark.django_db
+class TestLoadStructure:
+    def test_tree_is_assembled_in_two_queries(self, packet):
+        make_tree(packet, depth=4)
+        PacketFile.objects.create(packet=packet, name="Orphan", s3_object_key="o.pdf")
+        top = PacketSection.objects.create(packet=packet, name="Second", position=1)
+
+        with CaptureQueriesContext(connection) as context:
+            tree = structure.load_structure(packet)
+
+            node = tree.sections[0]
+            for level in range(4):
+                assert node.section.name == f"Level {level}"
+                assert [f.name for f in node.files] == [f"File {level}"]
+                assert node.section.depth == level
+                node = node.subsections[0] if node.subsections else None
+
+        assert len(context.captured_queries) == 2
+        assert [node.section for node in tree.sections[1:]] == [top]
+        assert [f.name for f in tree.orphan_files] == ["Orphan"]
+
+    def test_sections_are_in_position_order(self, packet):
+        PacketSection.objects.create(packet=packet, name="B", position=2)
+        PacketSection.objects.create(packet=packet, name="A", position=1)
+
+        tree = structure.load_structure(packet)
+
+        assert [node.section.name for node in tree.sections] == ["A", "B"]
+
+
+@pytest.mark.django_db
+class TestPacketStructureCache:
+    def test_structure_is_cached(self, packet):
+        make_tree(packet, depth=2)
+        structure.packet_structure(packet)
+
+        with CaptureQueriesContext(connection) as context:
+            tree = structure.packet_structure(packet)
+
+        assert len(context.captured_queries) == 0
+        assert tree.sections[0].section.name == "Level 0"
+
+    def test_changes_invalidate_the_structure(self, packet):
+        make_tree(packet, depth=1)
+        structure.packet_structure(packet)
+
+        section = PacketSection.objects.get()
+        section.name = "Renamed"
+        section.save()
+        assert structure.packet_structure(packet).sections[0].section.name == (
+            "Renamed"
+        )
+
+        PacketFile.objects.get().delete()
+        assert structure.packet_structure(packet).sections[0].files == []
+
+    def test_assigning_sections_invalidates_the_structure(self, packet):
+        section = PacketSection.objects.create(packet=packet, name="S", position=0)
+        PacketFile.objects.create(packet=packet, name="F", s3_object_key="f.pdf")
+        assert structure.packet_structure(packet).orphan_files
+
+        # the action without its form
+        assign_section.__wrapped__(
+            Mock(), Mock(), PacketFile.objects.all(), {"section": section}
+        )
+
+        assert structure.packet_structure(packet).sections[0].files
+
+
+@pytest.mark.django_db
+class TestIndexOverlay:
+    def url(self, packet):
+        return reverse(
+            "hugopacket:election_packet", kwargs={"election_id": packet.election.slug}
+        )
+
+    def test_index_queries_do_not_grow_with_depth(self, client, user, member, packet):
+        make_tree(packet, depth=2)
+        client.force_login(user)
+        client.get(self.url(packet))
+
+        with CaptureQueriesContext(connection) as shallow:
+            client.get(self.url(packet))
+
+        make_tree(packet, depth=5)
+        client.get(self.url(packet))
+        with CaptureQueriesContext(connection) as deep:
+            response = client.get(self.url(packet))
+
+        assert response.status_code == 200
+        assert len(deep.captured_queries) == len(shallow.captured_queries)
+        assert not section_queries(deep)
+
+    def test_each_member_sees_their_own_accesses(
+        self, client, user, member, packet, django_user_model
+    ):
+        make_tree(packet, depth=1)
+        packet_file = PacketFile.objects.get()
+        PacketItemAccess.objects.create(
+            packet_file=packet_file, member=member, access_count=7
+        )
+
+        other_user = django_user_model.objects.create_user(username="other")
+        other_user.user_permissions.add(
+            Permission.objects.get(codename="vote", content_type__app_label="nominate")
+        )
+        NominatingMemberProfile.objects.create(user=other_user, preferred_name="O")
+
+        client.force_login(user)
+        assert "accessed 7×" in client.get(self.url(packet)).content.decode()
+
+        client.force_login(other_user)
+        assert "accessed" not in client.get(self.url(packet)).content.decode()
+
+    def test_buffered_accesses_are_shown(self, client, user, member, packet, settings):
+        settings.HUGOPACKET_BUFFER_ACCESS_COUNTS = True
+        make_tree(packet, depth=1)
+        access = PacketItemAccess.objects.create(
+            packet_file=PacketFile.objects.get(), member=member, access_count=2
+        )
+        access.increment_access()
+
+        client.force_login(user)
+        assert "accessed 3×" in client.get(self.url(packet)).content.decode()
@@ -1,42 +1,36 @@
 from dataclasses import dataclass
-from datetime import datetime
 from functools import wraps
+from inspect import iscoroutinefunction
 from urllib.parse import urlparse
 
-from botocore.exceptions import BotoCoreError, ClientError
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.db import transaction
-from django.db.models import Prefetch
 from django.http import Http404, HttpRequest, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render, resolve_url
-from django.utils import timezone
-from django_svcs.apps import svcs_from
-from waffle.decorators import waffle_switch
+from waffle import switch_is_active
 
 from nomnom.base.feature_switches import SWITCH_HUGO_PACKET
-from nomnom.hugopacket.apps import S3Client
+from nomnom.hugopacket.apps import PacketItemResolver
+from nomnom.hugopacket.inventory import PacketFileMetadata, cached_metadata
 from nomnom.hugopacket.models import (
-    DistributionCode,
     ElectionPacket,
     PacketFile,
     PacketItemAccess,
+    pending_access_counts,
 )
+from nomnom.hugopacket.structure import packet_structure
 from nomnom.nominate.models import Election
 
 
-@dataclass
-class PacketFileMetadata:
-    last_modified: datetime
-    size: int
-
-
 @dataclass
 class PacketFileDisplay:
     packet_file: PacketFile
     metadata: PacketFileMetadata | None
+    access_count: int = 0
+    has_code: bool = False
 
     @property
     def id(self):
@@ -60,10 +54,7 @@ def request_passes_test(
     """
 
     def decorator(view_func):
-        @wraps(view_func)
-        def _wrapper_view(request, *args, **kwargs):
-            if test_func(request):
-                return view_func(request, *args, **kwargs)
+        def _redirect_to_login(request):
             path = request.build_absolute_uri()
             resolved_login_url = resolve_url(login_url or settings.LOGIN_URL)
             # If the login url is the same scheme and net location then just
@@ -78,11 +69,42 @@ def request_passes_test(
 
             return redirect_to_login(path, resolved_login_url, redirect_field_name)
 
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _async_wrapper_view(request, *args, **kwargs):
+                if await sync_to_async(test_func)(request):
+                    return await view_func(request, *args, **kwargs)
+                return _redirect_to_login(request)
+
+            return _async_wrapper_view
+
+        @wraps(view_func)
+        def _wrapper_view(request, *args, **kwargs):
+            if test_func(request):
+                return view_func(request, *args, **kwargs)
+            return _redirect_to_login(request)
+
         return _wrapper_view
 
     return decorator
 
 
+def async_waffle_switch(switch_name: str):
+    """`waffle.decorators.waffle_switch`, for async views."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            if not await sync_to_async(switch_is_active)(switch_name):
+                raise Http404()
+            return await view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
+
+
 def member_can_vote():
     def test_func(request: HttpRequest) -> bool:
         election_id = request.resolver_match.kwargs.get("election_id")
@@ -97,10 +119,16 @@ def member_can_vote():
     return request_passes_test(test_func)
 
 
-@waffle_switch(SWITCH_HUGO_PACKET)
+@async_waffle_switch(SWITCH_HUGO_PACKET)
 @login_required
 @member_can_vote()
-def index(request: HttpRequest, election_id: str) -> HttpResponse:
+async def index(request: HttpRequest, election_id: str) -> HttpResponse:
+    # The page comes from the database and the cache, and nothing on it waits
+    # for S3 (see inventory.py), so it is built in a single trip to a thread.
+    return await sync_to_async(_index)(request, election_id)
+
+
+def _index(request: HttpRequest, election_id: str) -> HttpResponse:
     election = get_object_or_404(Election, slug=election_id)
     packet = get_object_or_404(ElectionPacket, election=election)
 
@@ -111,82 +139,46 @@ def index(request: HttpRequest, election_id: str) -> HttpResponse:
     # Get member profile for access tracking
     member = request.user.convention_profile
 
-    # Prefetch access records for the current member to avoid N+1 queries
-    member_access_prefetch = Prefetch(
-        "member_accesses",
-        queryset=PacketItemAccess.objects.filter(member=member),
-        to_attr="prefetched_member_access",
-    )
-
-    # Build hierarchical section structure
-    root_sections = packet.sections.filter(parent__isnull=True).prefetch_related(
-        "subsections",
-        Prefetch(
-            "files",
-            queryset=PacketFile.objects.prefetch_related(member_access_prefetch),
-        ),
-    )
-
-    # For backward compatibility: get files without sections
-    orphan_files = packet.packetfile_set.filter(section__isnull=True).prefetch_related(
-        member_access_prefetch
-    )
-
-    # Get all packet files with access records prefetched
-    all_packet_files = packet.packetfile_set.all().prefetch_related(
-        member_access_prefetch
-    )
-
-    # Get S3 metadata for all files
-    all_prefixes = set()
-    for packet_file in all_packet_files:
-        all_prefixes.add(packet_file.s3_object_key.rsplit("/", 1)[0])
-
-    s3 = svcs_from(request).get(S3Client)
+    # The sections and files are the same for everyone; see structure.py
+    structure = packet_structure(packet)
 
-    metadata = {}
-    for prefix in all_prefixes:
-        try:
-            response = s3.list_objects_v2(Bucket=packet.s3_bucket_name, Prefix=prefix)
-        except (BotoCoreError, ClientError):
-            # we only need this for size / age, we're otherwise fine
-            continue
+    # S3 metadata for all files, from the cache; see inventory.py
+    metadata = cached_metadata(packet)
 
-        for object in response.get("Contents", []):
-            metadata[object["Key"]] = PacketFileMetadata(
-                object["LastModified"], object["Size"]
+    # What this member has accessed is laid over the tree
+    accesses = {}
+    if member:
+        accesses = {
+            access.packet_file_id: access
+            for access in PacketItemAccess.objects.filter(
+                member=member, packet_file__packet=packet
             )
+        }
+    pending_counts = pending_access_counts(access.id for access in accesses.values())
 
-    # Build display objects for all files
     def build_file_display(pf):
         display = PacketFileDisplay(pf, metadata.get(pf.s3_object_key))
-        # Add access tracking info if member exists
-        if member:
-            # Use prefetched access records instead of querying
-            prefetched_access = getattr(pf, "prefetched_member_access", [])
-            if prefetched_access:
-                access = prefetched_access[0]
-                display.access_count = access.access_count
-                display.has_code = (
-                    pf.access_type == PacketFile.AccessType.CODE
-                    and access.distribution_code is not None
-                )
-            else:
-                display.access_count = 0
-                display.has_code = False
+        access = accesses.get(pf.id)
+        if access is not None:
+            display.access_count = access.access_count + pending_counts.get(
+                access.id, 0
+            )
+            display.has_code = (
+                pf.access_type == PacketFile.AccessType.CODE
+                and access.distribution_code_id is not None
+            )
         return display
 
-    # Recursively build section hierarchy with files
-    def build_section_tree(section):
+    def build_section_tree(node):
         return {
-            "section": section,
-            "files": [build_file_display(f) for f in section.files.all()],
-            "subsections": [build_section_tree(s) for s in section.subsections.all()],
+            "section": node.section,
+            "files": [build_file_display(f) for f in node.files],
+            "subsections": [build_section_tree(s) for s in node.subsections],
         }
 
-    section_tree = [build_section_tree(s) for s in root_sections]
+    section_tree = [build_section_tree(node) for node in structure.sections]
 
-    orphan_file_list = [build_file_display(pf) for pf in orphan_files]
+    orphan_file_list = [build_file_display(pf) for pf in structure.orphan_files]
 
     return render(
         request,
@@ -200,12 +192,31 @@ def index(request: HttpRequest, election_id: str) -> HttpResponse:
     )
 
 
-@waffle_switch(SWITCH_HUGO_PACKET)
+@async_waffle_switch(SWITCH_HUGO_PACKET)
 @login_required
 @member_can_vote()
-def download_packet(
+async def download_packet(
     request: HttpRequest, election_id: str, packet_file_id: int
 ) -> HttpResponse:
+    prepared = await sync_to_async(_prepare_download)(
+        request, election_id, packet_file_id
+    )
+    if isinstance(prepared, HttpResponse):
+        return prepared
+
+    # Signing runs on the bounded S3 executor, so a slow object store holds up
+    # downloads rather than the threads the rest of the site needs.
+    return redirect(await prepared.aget_url())
+
+
+def _prepare_download(
+    request: HttpRequest, election_id: str, packet_file_id: int
+) -> HttpResponse | PacketItemResolver:
+    """Check and record the access to a packet file.
+
+    Codes are shown straight away; for a download, this returns the resolver
+    for its URL.
+    """
     election = get_object_or_404(Election, slug=election_id)
     packet_file = get_object_or_404(PacketFile, pk=packet_file_id)
     # ensure that the packet file belongs to the election
@@ -231,34 +242,13 @@ def download_packet(
         )
 
         # Assign a code if not already assigned
-        if not access.distribution_code:
-            with transaction.atomic():
-                # Get IDs of already assigned codes
-                assigned_code_ids = PacketItemAccess.objects.filter(
-                    distribution_code__packet_file=packet_file
-                ).values_list("distribution_code_id", flat=True)
-
-                # Find an unassigned code from the pool
-                unassigned_code = (
-                    DistributionCode.objects.filter(packet_file=packet_file)
-                    .exclude(id__in=assigned_code_ids)
-                    .select_for_update()
-                    .first()
-                )
-
-                if not unassigned_code:
-                    return render(
-                        request,
-                        "hugopacket/no_codes_available.html",
-                        {"packet_file": packet_file},
-                        status=503,
-                    )
-
-                # Assign the code
-                access.distribution_code = unassigned_code
-                unassigned_code.assigned_at = timezone.now()
-                unassigned_code.save(update_fields=["assigned_at"])
-                access.save(update_fields=["distribution_code"])
+        if not access.assign_code():
+            return render(
+                request,
+                "hugopacket/no_codes_available.html",
+                {"packet_file": packet_file},
+                status=503,
+            )
 
         # Record the access
         access.increment_access()
@@ -289,9 +279,7 @@ def download_packet(
         # Record the access
         access.increment_access()
 
-        # Get presigned URL and redirect
-        download_url = access.get_access_url(request)
-        return redirect(download_url)
+        return access.download_resolver(request)
 
     else:
         raise ValueError(f"Unknown access type: {packet_file.access_type}")
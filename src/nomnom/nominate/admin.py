@@ -23,6 +23,7 @@ from django.utils.safestring import mark_safe
 from django_admin_action_forms import AdminActionFormsMixin, action_with_form
 from django_admin_action_forms.forms import ActionForm
 
+from nomnom.base.signals import nomination_validity_changed
 from nomnom.nominate.decorators import user_passes_test_or_forbidden
 
 from . import models
@@ -50,13 +51,18 @@ def validate_nomination(
 
 
 def set_validation(queryset: QuerySet, valid: bool) -> None:
+    # pin down the nominations first; the queryset may depend on their validity
+    nominations = models.Nomination.objects.filter(
+        pk__in=list(queryset.values_list("pk", flat=True))
+    )
+
     # update the ones that have admin data already
-    models.NominationAdminData.objects.filter(nomination__in=queryset).update(
+    models.NominationAdminData.objects.filter(nomination__in=nominations).update(
         valid_nomination=valid
     )
 
     # find the ones that don't already have info
-    nomination_without_admin = queryset.exclude(admin__isnull=False)
+    nomination_without_admin = nominations.exclude(admin__isnull=False)
 
     # create the missing ones
     models.NominationAdminData.objects.bulk_create(
@@ -66,6 +72,16 @@ def set_validation(queryset: QuerySet, valid: bool) -> None:
         ]
     )
 
+    # and the denormalized flag the counts use
+    nominations.update(is_valid=valid)
+
+    nomination_validity_changed.send(
+        sender=models.Nomination,
+        category_ids=set(
+            nominations.prefetch_related(None).values_list("category_id", flat=True)
+        ),
+    )
+
 
 class NominatingMemberFilter(AutocompleteFilter):
     title = "Member"
@@ -91,13 +107,26 @@ class ExtendedNominationAdmin(admin.ModelAdmin):
     list_display = ["__str__", "nomination_ip_address", "valid"]
     list_filter = [NominatingMemberFilter, "category"]
     actions = [invalidate_nomination, validate_nomination]
+    # set through the admin data inline
+    readonly_fields = ["is_valid"]
 
     @admin.display(description="Valid?", boolean=True)
     def valid(self, obj) -> bool:
+        return obj.is_valid
+
+    def save_related(self, request, form, formsets, change) -> None:
+        super().save_related(request, form, formsets, change)
+
+        nomination = form.instance
         try:
-            return obj.admin.valid_nomination
+            valid = models.NominationAdminData.objects.get(
+                nomination=nomination
+            ).valid_nomination
         except models.NominationAdminData.DoesNotExist:
-            return True
+            valid = True
+
+        if valid != nomination.is_valid:
+            set_validation(models.Nomination.objects.filter(pk=nomination.pk), valid)
 
 
 class VotingInformationAdmin(admin.StackedInline):
@@ -641,12 +670,17 @@ def validate_ranking(
 
 
 def set_rank_valid(queryset: QuerySet, validation: bool) -> None:
-    models.RankAdminData.objects.filter(rank__in=queryset).update(
+    # pin down the ranks first; the queryset may depend on their validity
+    ranks = models.Rank.objects.filter(
+        pk__in=list(queryset.values_list("pk", flat=True))
+    )
+
+    models.RankAdminData.objects.filter(rank__in=ranks).update(
         invalidated=not validation
     )
 
     # find the ones that don't already have info
-    without_admin = queryset.exclude(admin__isnull=False)
+    without_admin = ranks.exclude(admin__isnull=False)
 
     # create the missing ones
     models.RankAdminData.objects.bulk_create(
@@ -656,6 +690,9 @@ def set_rank_valid(queryset: QuerySet, validation: bool) -> None:
         ]
     )
 
+    # and the denormalized flag the counts use
+    ranks.update(is_valid=validation)
+
 
 class RankAdmin(admin.ModelAdmin):
     model = models.Rank
@@ -665,10 +702,23 @@ class RankAdmin(admin.ModelAdmin):
     list_filter = ["finalist__category__election", VotingMemberFilter]
     search_fields = ["finalist__category__name", "membership__member_number"]
     actions = [invalidate_ranking, validate_ranking]
+    # set through the admin data inline
+    readonly_fields = ["is_valid"]
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[models.Rank]:
         return super().get_queryset(request).select_related("finalist", "membership")
 
+    def save_related(self, request, form, formsets, change) -> None:
+        super().save_related(request, form, formsets, change)
+
+        rank = form.instance
+        valid = not models.RankAdminData.objects.filter(
+            rank=rank, invalidated=True
+        ).exists()
+
+        if valid != rank.is_valid:
+            set_rank_valid(models.Rank.objects.filter(pk=rank.pk), valid)
+
     def category(self, obj):
         return obj.finalist.category
 
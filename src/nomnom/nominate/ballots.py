@@ -0,0 +1,121 @@
+"""Per-request loading of a member's ballot.
+
+The ballot pages need an election's categories, its finalists, and the member's
+existing nominations or ranks. These loaders fetch each of those once, in a
+fixed number of queries, so that the views, forms and templates can share them
+instead of each querying for their own.
+
+The parts of the ballot pages that only depend on the election's content (the
+category descriptions and the like) are cached as template fragments, keyed by
+the election's content version; see `content_version`.
+"""
+
+from datetime import datetime
+from functools import cached_property
+
+
+from nomnom.cache_utils import bump_version_token, version_token
+
+from . import models
+
+# how long a rendered ballot fragment is kept; they are replaced as soon as the
+# content version changes, so this only bounds how long unused ones linger.
+BALLOT_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def _content_version_key(election_id: int) -> str:
+    return f"nominate:ballot-content-version:{election_id}"
+
+
+def content_version(election_id: int) -> str:
+    """The current content version of an election's ballot pages."""
+    return version_token(_content_version_key(election_id))
+
+
+def bump_content_version(election_id: int) -> None:
+    """Invalidate the cached ballot fragments for an election."""
+    bump_version_token(_content_version_key(election_id))
+
+
+class NominationBallot:
+    """A member's nominating ballot for an election."""
+
+    def __init__(
+        self, election: models.Election, nominator: models.NominatingMemberProfile
+    ):
+        self.election = election
+        self.nominator = nominator
+
+    @cached_property
+    def content_version(self) -> str:
+        return content_version(self.election.id)
+
+    @cached_property
+    def categories(self) -> list[models.Category]:
+        return list(models.Category.objects.filter(election=self.election))
+
+    @cached_property
+    def nominations(self) -> list[models.Nomination]:
+        """The member's nominations, in ballot order."""
+        categories = {category.id: category for category in self.categories}
+        positions = {category_id: i for i, category_id in enumerate(categories)}
+
+        nominations = list(
+            models.Nomination.objects.prefetch_related(None).filter(
+                nominator=self.nominator, category_id__in=categories
+            )
+        )
+        for nomination in nominations:
+            nomination.category = categories[nomination.category_id]
+            nomination.nominator = self.nominator
+
+        return sorted(nominations, key=lambda n: (positions[n.category_id], n.id))
+
+    @cached_property
+    def nominations_by_category(
+        self,
+    ) -> dict[models.Category, list[models.Nomination]]:
+        grouped: dict[models.Category, list[models.Nomination]] = {}
+        for nomination in self.nominations:
+            grouped.setdefault(nomination.category, []).append(nomination)
+        return grouped
+
+    @cached_property
+    def most_recent(self) -> datetime | None:
+        return max((n.nomination_date for n in self.nominations), default=None)
+
+
+class VotingBallot:
+    """A member's voting ballot for an election."""
+
+    def __init__(
+        self, election: models.Election, member: models.NominatingMemberProfile
+    ):
+        self.election = election
+        self.member = member
+
+    @cached_property
+    def content_version(self) -> str:
+        return content_version(self.election.id)
+
+    @cached_property
+    def finalists(self) -> list[models.Finalist]:
+        return list(
+            models.Finalist.objects.select_related("category").filter(
+                category__election=self.election
+            )
+        )
+
+    @cached_property
+    def ranks(self) -> list[models.Rank]:
+        finalists = {finalist.id: finalist for finalist in self.finalists}
+        ranks = list(
+            models.Rank.objects.filter(
+                membership=self.member, finalist_id__in=finalists
+            )
+        )
+        for rank in ranks:
+            rank.finalist = finalists[rank.finalist_id]
+            rank.membership = self.member
+
+        return ranks
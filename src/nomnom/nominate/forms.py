@@ -1,12 +1,14 @@
+import copy
+from collections import Counter
 from collections.abc import Iterable
 from dataclasses import dataclass
-from itertools import groupby
-from operator import attrgetter
-from typing import Any, cast
+from operator import attrgetter, itemgetter
+from typing import Any
 
 from django import forms
 from django.db import models
 from django.utils.translation import gettext as _
+from django.utils.translation import gettext_lazy
 from django_svcs.apps import svcs_from
 from markdownify.templatetags.markdownify import markdownify
 
@@ -15,10 +17,105 @@ from nomnom.convention import HugoAwards
 from .models import Category, Finalist, Nomination, Rank
 
 
-@dataclass
-class RankedFinalist:
-    rank: int
-    finalist: Finalist
+@dataclass(frozen=True)
+class NominationFormSchema:
+    """The fields of a NominationForm for a set of categories.
+
+    Field definitions only depend on the categories, so they are built once per
+    election and copied into each form, the way a declarative form's base fields
+    are.
+    """
+
+    # a fingerprint of everything the fields are built from
+    signature: tuple
+    fields: dict[str, forms.Field]
+    # for each category id, the form field names of each nomination slot
+    slots: dict[int, list[list[str]]]
+
+    @staticmethod
+    def signature_for(categories: list[Category], nominations_per_member: int):
+        return (nominations_per_member,) + tuple(
+            (
+                category.id,
+                category.fields,
+                category.field_1_description,
+                category.field_2_description,
+                category.field_3_description,
+            )
+            for category in categories
+        )
+
+    @classmethod
+    def build(
+        cls, categories: list[Category], nominations_per_member: int
+    ) -> "NominationFormSchema":
+        category_field_definitions: dict[str, models.Field] = {
+            f.name: f
+            for f in Nomination._meta.get_fields()
+            if f.name.startswith("field_")
+        }
+
+        fields: dict[str, forms.Field] = {}
+        slots: dict[int, list[list[str]]] = {}
+        for category in categories:
+            field_descriptions = {
+                "field_1": category.field_1_description,
+                "field_2": category.field_2_description,
+                "field_3": category.field_3_description,
+            }
+            category_slots = slots.setdefault(category.id, [])
+            for nomination_entry in range(nominations_per_member):
+                slot = []
+                category_slots.append(slot)
+
+                for field_id in ["field_1", "field_2", "field_3"][0 : category.fields]:
+                    form_field_id = f"{category.id}-{nomination_entry}-{field_id}"
+                    field = category_field_definitions[field_id].formfield(
+                        label=field_descriptions[field_id]
+                    )
+                    field.required = False
+                    fields[form_field_id] = field
+                    slot.append(form_field_id)
+
+        return cls(
+            signature=cls.signature_for(categories, nominations_per_member),
+            fields=fields,
+            slots=slots,
+        )
+
+
+# schemas kept for each election before its entries are dropped; forms are built
+# for the whole ballot and for each category on its own, and entries left behind
+# by changes made in another process are never looked up again.
+SCHEMAS_PER_ELECTION = 64
+
+# election id -> signature -> schema. Keying by signature as well means that the
+# single-category forms don't evict the whole-ballot one, and that a stale entry
+# from another process is simply rebuilt.
+_nomination_form_schemas: dict[int, dict[tuple, NominationFormSchema]] = {}
+
+
+def _cached_schema(cache: dict, election_id: int | None, signature: tuple, build):
+    schemas = cache.setdefault(election_id, {})
+    schema = schemas.get(signature)
+    if schema is None:
+        if len(schemas) >= SCHEMAS_PER_ELECTION:
+            schemas.clear()
+        schema = schemas[signature] = build()
+
+    return schema
+
+
+def nomination_form_schema(categories: list[Category]) -> NominationFormSchema:
+    nominations_per_member = svcs_from().get(HugoAwards).hugo_nominations_per_member
+    signature = NominationFormSchema.signature_for(categories, nominations_per_member)
+
+    return _cached_schema(
+        _nomination_form_schemas,
+        categories[0].election_id if categories else None,
+        signature,
+        lambda: NominationFormSchema.build(categories, nominations_per_member),
+    )
 
 
 class NominationForm(forms.BaseForm):
@@ -29,65 +126,66 @@ class NominationForm(forms.BaseForm):
         *args,
         categories: list[Category],
         queryset: models.QuerySet | None = None,
+        nominations: Iterable[Nomination] | None = None,
         **kwargs,
     ):
         self.categories = categories
+        schema = nomination_form_schema(categories)
         if "initial" not in kwargs:
-            if queryset is not None:
+            if nominations is not None:
+                kwargs["initial"] = self._data_from_rows(
+                    (n.category_id, n.field_1, n.field_2, n.field_3)
+                    for n in sorted(nominations, key=attrgetter("category_id", "id"))
+                )
+            elif queryset is not None:
                 kwargs["initial"] = self._data_from_queryset(queryset)
 
         super().__init__(*args, **kwargs)
 
-        category_field_definitions: dict[str, models.Field] = {
-            f.name: f
-            for f in Nomination._meta.get_fields()
-            if f.name.startswith("field_")
-        }
+        self.fields = copy.deepcopy(schema.fields)
 
         fieldsets: dict[Category, list[list[forms.BoundField]]] = {}
         self.fieldsets_grouped_by_category = fieldsets
+        # comma-separated, for submitting a single category with hx-params
+        self.field_names_by_category: dict[Category, str] = {}
 
-        constitution = svcs_from().get(HugoAwards)
-
-        self.fields = {}
         for category in self.categories:
-            field_descriptions = {
-                "field_1": category.field_1_description,
-                "field_2": category.field_2_description,
-                "field_3": category.field_3_description,
-            }
-            fieldset_list = fieldsets.setdefault(category, [])
-            for nomination_entry in range(constitution.hugo_nominations_per_member):
-                fieldset = []
-                fieldset_list.append(fieldset)
-
-                for field_id in ["field_1", "field_2", "field_3"][0 : category.fields]:
-                    form_field_id = f"{category.id}-{nomination_entry}-{field_id}"
-                    kwargs = {
-                        "label": field_descriptions[field_id],
-                    }
-                    field = category_field_definitions[field_id].formfield(**kwargs)
-                    field.required = False
-                    self.fields[form_field_id] = field
-
-                    # we go into the __getitem__ here because this is how the fields are bound.
-                    # We could hack around this, but this way we're following the Django API.
-                    fieldset.append(self[form_field_id])
+            category_slots = schema.slots[category.id]
+            # we go into the __getitem__ here because this is how the fields are bound.
+            # We could hack around this, but this way we're following the Django API.
+            fieldsets[category] = [
+                [self[form_field_id] for form_field_id in slot]
+                for slot in category_slots
+            ]
+            self.field_names_by_category[category] = ",".join(
+                form_field_id for slot in category_slots for form_field_id in slot
+            )
 
         # autofocus all error fields; the browser will jump to the first one
         for field in self.errors:
             self[field].field.widget.attrs.update({"autofocus": ""})
 
     def _data_from_queryset(self, queryset: models.QuerySet) -> dict[str, Any]:
+        return self._data_from_rows(
+            queryset.prefetch_related(None)
+            .order_by("category_id", "id")
+            .values_list("category_id", "field_1", "field_2", "field_3")
+        )
+
+    def _data_from_rows(self, rows: Iterable[tuple[int, str, str, str]]):
+        """Build initial data from (category id, field 1, 2, 3) rows, in slot order."""
+        field_counts = {category.id: category.fields for category in self.categories}
         initial = {}
-        for category, nominations in groupby(
-            queryset.select_related("category").order_by("category", "id"),
-            attrgetter("category"),
-        ):
-            for i, nomination in enumerate(nominations):
-                for field_id in ["field_1", "field_2", "field_3"][0 : category.fields]:
-                    field_name = f"{category.id}-{i}-{field_id}"
-                    initial[field_name] = getattr(nomination, field_id)
+        slot = 0
+        previous_category_id = None
+        for category_id, *values in rows:
+            slot = slot + 1 if category_id == previous_category_id else 0
+            previous_category_id = category_id
+            field_count = field_counts.get(category_id, 0)
+            for field_id, value in zip(
+                ["field_1", "field_2", "field_3"][0:field_count], values
+            ):
+                initial[f"{category_id}-{slot}-{field_id}"] = value
 
         return initial
 
@@ -136,6 +234,79 @@ class NominationForm(forms.BaseForm):
         return self.cleaned_data
 
 
+@dataclass(frozen=True)
+class RankFormSchema:
+    """The fields of a RankForm for an election's finalists.
+
+    Like NominationFormSchema, this is built once per election; forms copy the
+    fields and validate through the per-category field name lists.
+    """
+
+    # a fingerprint of everything the fields are built from
+    signature: tuple
+    fields: dict[str, forms.Field]
+    # the finalist id for each field
+    finalist_ids: dict[str, int]
+    # for each category id, in ballot order, its finalists' field names
+    field_names: dict[int, list[str]]
+
+    @staticmethod
+    def signature_for(finalists: list[Finalist]):
+        return tuple(
+            (f.id, f.category_id, f.category.ballot_position, f.name) for f in finalists
+        )
+
+    @classmethod
+    def build(cls, finalists: list[Finalist]) -> "RankFormSchema":
+        counts = Counter(f.category_id for f in finalists)
+        choices = {
+            category_id: [(None, gettext_lazy("Unranked"))]
+            + [(i + 1, str(i + 1)) for i in range(count)]
+            for category_id, count in counts.items()
+        }
+
+        fields: dict[str, forms.Field] = {}
+        finalist_ids: dict[str, int] = {}
+        field_names: dict[int, list[str]] = {}
+        for finalist in sorted(
+            finalists, key=lambda f: (f.category.ballot_position, f.category_id)
+        ):
+            name = RankForm.field_key(finalist)
+            fields[name] = forms.ChoiceField(
+                label=markdownify(finalist.name, custom_settings="admin-label"),
+                choices=choices[finalist.category_id],
+                required=False,
+            )
+            finalist_ids[name] = finalist.id
+            field_names.setdefault(finalist.category_id, []).append(name)
+
+        return cls(
+            signature=cls.signature_for(finalists),
+            fields=fields,
+            finalist_ids=finalist_ids,
+            field_names=field_names,
+        )
+
+
+# election id -> signature -> schema, like the nomination form schemas
+_rank_form_schemas: dict[int, dict[tuple, RankFormSchema]] = {}
+
+
+def rank_form_schema(finalists: list[Finalist]) -> RankFormSchema:
+    return _cached_schema(
+        _rank_form_schemas,
+        finalists[0].category.election_id if finalists else None,
+        RankFormSchema.signature_for(finalists),
+        lambda: RankFormSchema.build(finalists),
+    )
+
+
+def forget_ballot_form_schemas(election_id: int) -> None:
+    """Drop the cached form schemas for an election, after its ballot changes."""
+    _nomination_form_schemas.pop(election_id, None)
+    _rank_form_schemas.pop(election_id, None)
+
+
 class RankForm(forms.BaseForm):
     base_fields = []
 
@@ -146,121 +317,85 @@ class RankForm(forms.BaseForm):
         ranks: Iterable[Rank] | None = None,
         **kwargs,
     ):
-        self.finalists = finalists
-        self.ranks = {f: None for f in finalists}
-        if ranks is not None:
-            for rank in ranks:
-                self.ranks[rank.finalist] = rank.position
+        self.finalists = list(finalists)
+        self.schema = schema = rank_form_schema(self.finalists)
 
-        super().__init__(*args, **kwargs)
-        self.fields_grouped_by_category: list[
-            tuple[Category, list[forms.BoundField]]
-        ] = []
-        self.fields = {
-            self.field_key(finalist): self.field_for_finalist(finalist)
-            for finalist in self.finalists
+        finalists_by_id = {f.id: f for f in self.finalists}
+        self.finalists_by_field = {
+            name: finalists_by_id[finalist_id]
+            for name, finalist_id in schema.finalist_ids.items()
         }
 
-        unordered_fields: dict[Category, list[forms.BoundField]] = {}
-        for finalist in self.finalists:
-            unordered_fields.setdefault(finalist.category, []).append(
-                self[self.field_key(finalist)]
-            )
+        positions = {rank.finalist_id: rank.position for rank in ranks or []}
+        kwargs["initial"] = {
+            **{
+                name: positions.get(finalist_id)
+                for name, finalist_id in schema.finalist_ids.items()
+            },
+            **kwargs.get("initial", {}),
+        }
 
-        self.fields_grouped_by_category = [
-            (category, unordered_fields[category])
-            for category in sorted(unordered_fields, key=attrgetter("ballot_position"))
+        super().__init__(*args, **kwargs)
+        self.fields = copy.deepcopy(schema.fields)
+
+        categories = {f.category_id: f.category for f in self.finalists}
+        self.fields_grouped_by_category: list[
+            tuple[Category, list[forms.BoundField]]
+        ] = [
+            (categories[category_id], [self[name] for name in names])
+            for category_id, names in schema.field_names.items()
         ]
 
         # autofocus all error fields; the browser will jump to the first one
         for field in self.errors:
             self[field].field.widget.attrs.update({"autofocus": ""})
 
-    def field_for_finalist(self, finalist: Finalist) -> forms.Field:
-        label = markdownify(finalist.name, custom_settings="admin-label")
-        field = forms.ChoiceField(
-            label=label,
-            initial=self.ranks[finalist],
-            choices=self.ranks_from_category(finalist),
-            required=False,
-        )
-        return field
-
-    def field_key(self, finalist):
-        return f"{finalist.category.id}_{finalist.id}"
-
-    def ranks_from_category(
-        self, finalist: Finalist
-    ) -> list[tuple[int, str] | tuple[None, str]]:
-        return [(None, _("Unranked"))] + [
-            (i + 1, str(i + 1)) for i in range(finalist.category.finalist_set.count())
-        ]
+    @staticmethod
+    def field_key(finalist: Finalist) -> str:
+        return f"{finalist.category_id}_{finalist.id}"
 
     def clean(self) -> dict[str, Any] | None:
-        # A lookup table for finalists by their field key.
-        finalists_by_id = {
-            self.field_key(finalist): finalist for finalist in self.finalists
-        }
         # this view of the votes is used for saving purposes.
         finalist_ranks = {}
 
-        # This view of the votes is shaped specifically to identify duplicates, and associate
-        # them with the fields that are duplicates.
-        category_rank_field_map = {}
+        for names in self.schema.field_names.values():
+            # the fields in this category with each rank, to find duplicates
+            fields_by_rank: dict[Any, list[str]] = {}
+            # the numeric ranks in this category, to check for gaps
+            ranked: list[tuple[int, str]] = []
 
-        for name, bf in self._bound_items():
-            name = cast(str, name)
-            bf = cast(forms.BoundField, bf)
+            for name in names:
+                bf = self[name]
+                rank = bf.initial if bf.field.disabled else bf.data
 
-            field = bf.field
-            rank = bf.initial if field.disabled else bf.data
+                finalist_ranks[self.finalists_by_field[name]] = rank if rank else None
+                if not rank:  # "Unranked"
+                    continue
 
-            fields_grouped_by_rank = category_rank_field_map.setdefault(
-                finalists_by_id[name].category, {}
-            )
+                fields_by_rank.setdefault(rank, []).append(name)
+                # invalid data in the rank field will be caught by the ChoiceField
+                # validation, but that happens after this step, regrettably.
+                if str(rank).isdigit():
+                    ranked.append((int(rank), name))
 
-            fields_grouped_by_rank.setdefault(rank, []).append(name)
-
-            finalist_ranks[finalists_by_id[name]] = rank if rank else None
-
-        # if any two fields in a category have the same value, attach an error to both of them.
-        for fields_grouped_by_rank in category_rank_field_map.values():
-            for rank, fields in fields_grouped_by_rank.items():
-                if rank:  # if this isn't "Unranked"
-                    if len(fields) > 1:
-                        for field in fields:
-                            self.add_error(
-                                field, "Cannot have two finalists ranked the same"
-                            )
-
-        # This is a view of the ranks by category excluding unranked. This is used to check for gaps.
-        ranks_by_category: dict[Category, list[RankedFinalist]] = {}
-        for finalist, rank in finalist_ranks.items():
-            # only try this for actual ranks; invalid data in the rank field
-            # will be caught by the ChoiceField validation, but that happens
-            # after this step, regrettably.
-            if rank and str(rank).isdigit():
-                ranks_by_category.setdefault(finalist.category, []).append(
-                    RankedFinalist(int(rank), finalist)
-                )
+            # if any two fields in a category have the same value, attach an error to both of them.
+            for fields in fields_by_rank.values():
+                if len(fields) > 1:
+                    for field in fields:
+                        self.add_error(
+                            field, "Cannot have two finalists ranked the same"
+                        )
 
-        for ranks in ranks_by_category.values():
-            sorted_ranks = sorted(ranks, key=attrgetter("rank"))
+            ranked.sort(key=itemgetter(0))
 
             # if the first rank that isn't "Unranked" isn't "1", attach an error to the lowest-ranked finalist
-            if sorted_ranks and sorted_ranks[0].rank != 1:
-                self.add_error(
-                    self.field_key(sorted_ranks[0].finalist),
-                    "Must start with 1",
-                )
+            if ranked and ranked[0][0] != 1:
+                self.add_error(ranked[0][1], "Must start with 1")
 
             # if there is a gap in the rankings, attach an error to the first field in the gap
-            for i, (rank, next_rank) in enumerate(zip(sorted_ranks, sorted_ranks[1:])):
-                if next_rank.rank - rank.rank != 1:
-                    self.add_error(
-                        self.field_key(next_rank.finalist),
-                        "Cannot have gaps in rankings",
-                    )
+            for (rank, _name), (next_rank, next_name) in zip(ranked, ranked[1:]):
+                if next_rank - rank != 1:
+                    self.add_error(next_name, "Cannot have gaps in rankings")
 
         self.cleaned_data["votes"] = finalist_ranks
 
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+def copy_validity(apps, schema):
+    Nomination = apps.get_model("nominate", "Nomination")
+    Rank = apps.get_model("nominate", "Rank")
+
+    Nomination.objects.filter(admin__valid_nomination=False).update(is_valid=False)
+    Rank.objects.filter(admin__invalidated=True).update(is_valid=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nominate", "0027_alter_category_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nomination",
+            name="is_valid",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="rank",
+            name="is_valid",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(copy_validity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="nomination",
+            index=models.Index(
+                condition=models.Q(("is_valid", True)),
+                fields=["category", "nominator"],
+                name="valid_nomination_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rank",
+            index=models.Index(
+                condition=models.Q(("is_valid", True)),
+                fields=["finalist", "membership"],
+                name="valid_rank_idx",
+            ),
+        ),
+    ]
@@ -18,6 +18,7 @@ from pyrankvote import Candidate
 from waffle import switch_is_active
 
 from nomnom.base.feature_switches import SWITCH_HUGO_PACKET
+from nomnom.base.signals import nominations_changed
 from nomnom.model_utils import AdminMetadata
 from nomnom.nominate.templatetags.nomnom_filters import html_text
 
@@ -61,6 +62,35 @@ class ElectionManager(models.Manager):
         return self.get(slug=slug)
 
 
+class ElectionAccess:
+    """A user's election permissions, checked once.
+
+    This stands in for the user in the Election methods that take one, so that
+    describing a list of elections doesn't check the same permissions for each
+    election in turn.
+    """
+
+    PERMISSIONS = (
+        "nominate.nominate",
+        "nominate.preview_nominate",
+        "nominate.vote",
+        "nominate.preview_vote",
+    )
+
+    def __init__(self, user: AbstractBaseUser):
+        self.user = user
+        self.is_anonymous = user.is_anonymous
+        self.permissions = frozenset(
+            perm for perm in self.PERMISSIONS if user.has_perm(perm)
+        )
+
+    def has_perm(self, perm: str) -> bool:
+        if perm in self.PERMISSIONS:
+            return perm in self.permissions
+
+        return self.user.has_perm(perm)
+
+
 class Election(models.Model):
     class Meta:
         permissions = [
@@ -279,9 +309,21 @@ class Election(models.Model):
             app_config = apps.get_app_config("hugopacket")
             ElectionPacket = app_config.models_module.ElectionPacket
 
-        user = request.user
+        user = ElectionAccess(request.user)
+        # evaluating a queryset here caches the instances we annotate below
+        election_list = list(elections)
 
-        for election in elections:
+        packets = {}
+        if ElectionPacket:
+            packets = {
+                packet.election_id: packet
+                for packet in ElectionPacket.objects.filter(
+                    election__in=[election.id for election in election_list]
+                )
+            }
+            can_preview_packet = user.has_perm("hugopacket.preview_packet")
+
+        for election in election_list:
             election.is_open_for_user = election.is_open_for(user)
             if not election.is_open_for_user:
                 election.explanation = election.explain_access(user=user)
@@ -291,13 +333,10 @@ class Election(models.Model):
             election.user_pretty_state = election.pretty_state(user=user)
 
             if ElectionPacket:
-                try:
-                    packet = ElectionPacket.objects.filter(election=election).first()
-                except ElectionPacket.DoesNotExist:
-                    packet = None
+                packet = packets.get(election.id)
                 election.packet_exists = packet is not None
                 election.packet_is_ready = packet and (
-                    packet.enabled or request.user.has_perm("hugopacket.preview_packet")
+                    packet.enabled or can_preview_packet
                 )
             else:
                 election.packet_exists = False
@@ -371,11 +410,7 @@ class NominationsManager(models.Manager):
 
 class NominationValidManager(NominationsManager):
     def get_queryset(self) -> models.QuerySet:
-        return (
-            super()
-            .get_queryset()
-            .filter(Q(admin__valid_nomination=True) | Q(admin__isnull=True))
-        )
+        return super().get_queryset().filter(is_valid=True)
 
 
 class Nomination(models.Model):
@@ -383,6 +418,13 @@ class Nomination(models.Model):
         permissions = [
             ("edit_ballot", "Can edit the ballot as an admin"),
         ]
+        indexes = [
+            models.Index(
+                fields=["category", "nominator"],
+                condition=Q(is_valid=True),
+                name="valid_nomination_idx",
+            ),
+        ]
 
     field_1 = models.CharField(max_length=200)
     field_2 = models.CharField(max_length=200)
@@ -396,6 +438,10 @@ class Nomination(models.Model):
     nomination_date = models.DateTimeField(null=False, auto_now=True)
     nomination_ip_address = models.CharField(max_length=64)
 
+    # mirrors admin.valid_nomination, so that counting valid nominations
+    # doesn't need to join the admin data; see admin.set_validation
+    is_valid = models.BooleanField(default=True)
+
     # this ties the method into canonicalize; ignore it if the canonicalize app
     # is not installed.
     @property
@@ -446,6 +492,16 @@ class Nomination(models.Model):
     def __str__(self):
         return f"{self.proposed_work_name()} in {self.category}"
 
+    def field_tuple(self) -> tuple[str, str, str]:
+        return (self.field_1, self.field_2, self.field_3)
+
+    def set_field_tuple(self, fields: tuple[str, str, str]) -> None:
+        self.field_1, self.field_2, self.field_3 = fields
+
+    def normalized_fields(self) -> tuple[str, ...]:
+        """The nomination's fields, ignoring case and whitespace differences."""
+        return tuple(" ".join(value.split()).casefold() for value in self.field_tuple())
+
     # make sure we have the objects manager
     objects = NominationsManager()
     valid = NominationValidManager()
@@ -459,6 +515,120 @@ class NominationAdminData(models.Model):
     valid_nomination = models.BooleanField(default=True)
 
 
+def save_ballot(
+    nominator: NominatingMemberProfile,
+    categories: Iterable[Category],
+    nominations: Iterable[Nomination],
+    ip_address: str | None,
+) -> list[Nomination]:
+    """Replace the nominator's ballot in the given categories with `nominations`.
+
+    Rather than starting from scratch, the submitted ballot is compared with the
+    existing one, category by category:
+
+    * nominations that are unchanged (ignoring case and whitespace) keep their
+      rows, admin data and canonicalization, and only have their date and IP
+      address brought up to date;
+    * the remaining submitted nominations take over the remaining existing rows
+      in slot order, as if they were new nominations;
+    * anything left over is inserted or deleted.
+
+    Returns the nominations that are new or changed, and so need linking to works.
+    """
+    category_ids = {category.id for category in categories}
+    existing: dict[int, list[Nomination]] = {}
+    for nomination in (
+        Nomination.objects.prefetch_related(None)
+        .filter(nominator=nominator, category_id__in=category_ids)
+        .order_by("id")
+    ):
+        existing.setdefault(nomination.category_id, []).append(nomination)
+
+    submitted: dict[int, list[Nomination]] = {}
+    for nomination in nominations:
+        submitted.setdefault(nomination.category_id, []).append(nomination)
+
+    to_create: list[Nomination] = []
+    to_update: list[Nomination] = []
+    changed: list[Nomination] = []
+    to_delete: list[Nomination] = []
+    unchanged: list[Nomination] = []
+    now = datetime.now(UTC)
+    for category_id in category_ids:
+        unmatched = list(existing.get(category_id, []))
+        new = []
+        for nomination in submitted.get(category_id, []):
+            match = next(
+                (
+                    n
+                    for n in unmatched
+                    if n.normalized_fields() == nomination.normalized_fields()
+                ),
+                None,
+            )
+            if match is None:
+                new.append(nomination)
+                continue
+
+            unmatched.remove(match)
+            if match.field_tuple() != nomination.field_tuple():
+                match.set_field_tuple(nomination.field_tuple())
+                to_update.append(match)
+            else:
+                unchanged.append(match)
+
+        for nomination, old in zip(new, unmatched):
+            old.set_field_tuple(nomination.field_tuple())
+            # changed nominations are new as far as validation is concerned
+            old.is_valid = True
+            to_update.append(old)
+            changed.append(old)
+
+        to_create.extend(new[len(unmatched) :])
+        to_delete.extend(unmatched[len(new) :])
+
+    for nomination in to_update:
+        nomination.nomination_ip_address = ip_address
+        nomination.nomination_date = now
+    for nomination in to_create:
+        nomination.nominator = nominator
+        nomination.nomination_ip_address = ip_address
+
+    if to_delete:
+        Nomination.objects.filter(pk__in=[n.pk for n in to_delete]).delete()
+
+    if to_update:
+        Nomination.objects.bulk_update(
+            to_update,
+            [
+                "field_1",
+                "field_2",
+                "field_3",
+                "nomination_ip_address",
+                "nomination_date",
+                "is_valid",
+            ],
+        )
+
+    # the whole ballot was submitted again, so it all dates from now
+    if unchanged:
+        Nomination.objects.filter(pk__in=[n.pk for n in unchanged]).update(
+            nomination_date=now, nomination_ip_address=ip_address
+        )
+
+    if changed:
+        NominationAdminData.objects.filter(nomination__in=changed).delete()
+
+    if to_delete or changed:
+        nominations_changed.send(
+            sender=Nomination,
+            category_ids={n.category_id for n in to_delete + changed},
+            changed_nomination_ids=[n.pk for n in changed],
+        )
+
+    return changed + Nomination.objects.bulk_create(to_create)
+
+
 class Finalist(models.Model):
     """A Finalist in the Hugo Awards.
 
@@ -489,11 +659,7 @@ class Finalist(models.Model):
 
 class ValidManager(models.Manager):
     def get_queryset(self) -> models.QuerySet:
-        return (
-            super()
-            .get_queryset()
-            .filter(Q(admin__invalidated=False) | Q(admin__isnull=True))
-        )
+        return super().get_queryset().filter(is_valid=True)
 
 
 class Rank(models.Model):
@@ -503,6 +669,13 @@ class Rank(models.Model):
                 fields=["membership", "finalist"], name="unique_rank"
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=["finalist", "membership"],
+                condition=Q(is_valid=True),
+                name="valid_rank_idx",
+            ),
+        ]
 
         permissions = [
             ("edit_ranking_ballot", "Can edit the ranking ballot as an admin"),
@@ -517,6 +690,10 @@ class Rank(models.Model):
     voter_ip_address = models.CharField(max_length=64, null=True, blank=True)
     rank_date = models.DateTimeField(null=False, auto_now=True)
 
+    # mirrors not admin.invalidated, so that counting valid ranks doesn't need
+    # to join the admin data; see admin.set_rank_valid
+    is_valid = models.BooleanField(default=True)
+
     # make sure we have the objects manager
     objects = models.Manager()
     valid = ValidManager()
@@ -526,6 +703,77 @@ class RankAdminData(AdminMetadata):
     rank = models.OneToOneField(Rank, on_delete=models.CASCADE, related_name="admin")
 
 
+def save_ranks(
+    membership: NominatingMemberProfile,
+    ranks: Iterable[Rank],
+    votes: dict[Finalist, str | int | None],
+    ip_address: str | None,
+    user_agent: str | None,
+) -> list[Rank]:
+    """Apply a submitted voting ballot on top of the member's existing `ranks`.
+
+    Only positions that differ from the existing ranks are written: new ranks
+    are inserted, moved ranks are updated and unranked finalists are deleted.
+    Inserts go through the unique_rank constraint, so a concurrent submission
+    of the same rank becomes an update instead of an error.
+
+    Returns the ranks that were inserted or updated.
+    """
+    existing = {rank.finalist_id: rank for rank in ranks}
+
+    to_create: list[Rank] = []
+    to_update: list[Rank] = []
+    to_delete: list[Rank] = []
+    now = datetime.now(UTC)
+    for finalist, vote in votes.items():
+        rank = existing.get(finalist.id)
+        if vote is None:
+            if rank is not None:
+                to_delete.append(rank)
+            continue
+
+        position = int(vote)
+        if rank is None:
+            rank = Rank(finalist=finalist, membership=membership)
+            to_create.append(rank)
+        elif rank.position != position:
+            to_update.append(rank)
+        else:
+            continue
+
+        rank.position = position
+        rank.voter_ip_address = ip_address
+        rank.rank_date = now
+
+    if to_delete:
+        Rank.objects.filter(pk__in=[rank.pk for rank in to_delete]).delete()
+
+    if to_update:
+        Rank.objects.bulk_update(
+            to_update, ["position", "voter_ip_address", "rank_date"]
+        )
+
+    touched = to_update + Rank.objects.bulk_create(
+        to_create,
+        update_conflicts=True,
+        unique_fields=["finalist", "membership"],
+        update_fields=["position", "voter_ip_address", "rank_date"],
+    )
+
+    if touched:
+        RankAdminData.objects.bulk_create(
+            [
+                RankAdminData(rank=rank, ip_address=ip_address, user_agent=user_agent)
+                for rank in touched
+            ],
+            update_conflicts=True,
+            unique_fields=["rank"],
+            update_fields=["ip_address", "user_agent"],
+        )
+
+    return touched
+
+
 # These models are configuration models specifically for admin operations.
 class ReportRecipient(models.Model):
     report_name = models.CharField(max_length=200)
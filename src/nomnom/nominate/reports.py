@@ -1,5 +1,4 @@
 import csv
-import functools
 from collections.abc import Generator, Iterable
 from io import StringIO
 from itertools import groupby
@@ -11,7 +10,7 @@ from django.contrib.auth.decorators import (
     permission_required,
     user_passes_test,
 )
-from django.db.models import Case, F, Q, QuerySet, TextField, Value, When
+from django.db.models import Case, F, QuerySet, TextField, Value, When
 from django.db.models.fields import GenericIPAddressField
 from django.http import (
     HttpRequest,
@@ -25,6 +24,7 @@ from nomnom.nominate import models, tasks
 from nomnom.nominate.decorators import user_passes_test_or_forbidden
 from nomnom.nominate.templatetags.nomnom_filters import html_text
 from nomnom.reporting import Report, ReportView
+from nomnom.view_utils import request_cached
 
 report_decorators = [
     user_passes_test(lambda u: u.is_staff, login_url="/admin/login/"),
@@ -75,7 +75,7 @@ class NominationsReport(NominationsReportBase):
         return f"{self.election.slug}-nomination-report.csv"
 
     def query_set(self) -> QuerySet:
-        return super().query_set().filter(Q(valid=True) | Q(admin_id=None))
+        return super().query_set().filter(is_valid=True)
 
 
 class InvalidatedNominationsReport(NominationsReportBase):
@@ -84,7 +84,7 @@ class InvalidatedNominationsReport(NominationsReportBase):
         return f"{self.election.slug}-invalidated-nomination-report.csv"
 
     def query_set(self) -> QuerySet:
-        return super().query_set().filter(Q(valid=False))
+        return super().query_set().filter(is_valid=False)
 
 
 class CategoryVotingReport(Report):
@@ -161,7 +161,7 @@ class ElectionReportView(ReportView):
     def get_report_class(self):
         return getattr(self, "report_class", NominationsReport)
 
-    @functools.lru_cache
+    @request_cached
     def election(self) -> models.Election:
         return get_object_or_404(models.Election, slug=self.kwargs.get("election_id"))
 
@@ -290,11 +290,11 @@ class CategoryVotes(ElectionReportView):
 
     report_class = CategoryVotingReport
 
-    @functools.lru_cache
+    @request_cached
     def category(self) -> models.Category:
         return get_object_or_404(models.Category, id=self.kwargs.get("category_id"))
 
-    @functools.lru_cache
+    @request_cached
     def report(self) -> Report:
         return CategoryVotingReport(category=self.category())
 
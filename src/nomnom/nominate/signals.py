@@ -1,11 +1,19 @@
 from django.contrib.auth.models import Group
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django_svcs.apps import svcs_from
 
 from nomnom.convention import ConventionConfiguration
 from nomnom.nominate import admin
-from nomnom.nominate.models import NominatingMemberProfile, Nomination
+from nomnom.nominate.ballots import bump_content_version
+from nomnom.nominate.forms import forget_ballot_form_schemas
+from nomnom.nominate.models import (
+    Category,
+    Election,
+    Finalist,
+    NominatingMemberProfile,
+    Nomination,
+)
 
 
 @receiver(m2m_changed, sender=Group.user_set.through)
@@ -40,3 +48,22 @@ def user_added_or_removed_from_group(sender, instance, action, pk_set, **kwargs)
                     Nomination.objects.filter(nominator=instance.convention_profile),
                     False,
                 )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    forget_ballot_form_schemas(instance.election_id)
+    bump_content_version(instance.election_id)
+
+
+@receiver(post_save, sender=Finalist)
+@receiver(post_delete, sender=Finalist)
+def finalist_changed(sender, instance, **kwargs):
+    forget_ballot_form_schemas(instance.category.election_id)
+    bump_content_version(instance.category.election_id)
+
+
+@receiver(post_save, sender=Election)
+def election_changed(sender, instance, **kwargs):
+    bump_content_version(instance.id)
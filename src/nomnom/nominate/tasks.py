@@ -24,6 +24,7 @@ from django_svcs.apps import svcs_from
 from nomnom.canonicalize import models as canonicalize
 from nomnom.convention import ConventionConfiguration, HugoAwards
 from nomnom.nominate import hugo_awards, models, reports
+from nomnom.nominate.ballots import VotingBallot
 from nomnom.nominate.forms import RankForm
 
 logger = get_task_logger(__name__)
@@ -254,15 +255,14 @@ def send_voting_ballot(self: Task, election_id, voting_member_id, message=None):
 
     logger.info(f"Sending votes for {election=} {member=}")
 
-    finalists = models.Finalist.objects.filter(category__election=election)
-    ranks = models.Rank.objects.filter(finalist__in=finalists, membership=member)
+    ballot = VotingBallot(election, member)
 
     report_date = datetime.utcnow()
     site_url = Site.objects.get_current().domain
     ballot_path = reverse("election:vote", kwargs={"election_id": election.slug})
     ballot_url = f"https://{site_url}{ballot_path}"
 
-    form = RankForm(finalists=finalists, ranks=ranks)
+    form = RankForm(finalists=ballot.finalists, ranks=ballot.ranks)
     # run "clean" to populate the form with the existing data and
     # group the finalists by category into display-oriented structures.
     # We're doing a bit of a hack here, because full_clean requires posted
@@ -394,3 +394,7 @@ def link_nominations_to_works(nomination_ids: list[int]):
                         work=work,
                         nomination=nomination,
                     )
+
+            # the category's nomination counts changed even if nothing was linked;
+            # compaction recounts it
+            canonicalize.mark_canonicalization_stale([cat_id])
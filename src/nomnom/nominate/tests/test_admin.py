@@ -1,9 +1,10 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 from faker import Faker
 
-from nomnom.nominate import factories
-from nomnom.nominate.admin import MemberCreationForm
+from nomnom.nominate import factories, models
+from nomnom.nominate.admin import MemberCreationForm, set_rank_valid, set_validation
 
 UserModel = get_user_model()
 fake = Faker()
@@ -131,3 +132,79 @@ class TestMemberCreationForm:
 
         # Verify password is unusable
         assert not member.user.has_usable_password()
+
+
+class TestValidity:
+    @pytest.fixture(autouse=True)
+    def setup(self, db):
+        self.category = factories.CategoryFactory.create(fields=1)
+        self.nomination = factories.NominationFactory.create(category=self.category)
+        self.rank = factories.RankFactory.create(
+            finalist=factories.FinalistFactory.create(category=self.category),
+            position=1,
+        )
+
+    def test_set_validation_updates_the_flag(self):
+        nominations = models.Nomination.objects.filter(pk=self.nomination.pk)
+
+        set_validation(nominations, False)
+        assert not models.Nomination.valid.filter(pk=self.nomination.pk).exists()
+        assert not models.Nomination.objects.get(
+            pk=self.nomination.pk
+        ).admin.valid_nomination
+
+        # passing the valid manager's own queryset still finds the nominations
+        set_validation(models.Nomination.objects.filter(is_valid=False), True)
+        assert models.Nomination.valid.filter(pk=self.nomination.pk).exists()
+
+    def test_set_rank_valid_updates_the_flag(self):
+        set_rank_valid(models.Rank.objects.filter(pk=self.rank.pk), False)
+        assert not models.Rank.valid.exists()
+        assert models.Rank.objects.get(pk=self.rank.pk).admin.invalidated
+
+        set_rank_valid(models.Rank.objects.filter(pk=self.rank.pk), True)
+        assert models.Rank.valid.filter(pk=self.rank.pk).exists()
+
+    def test_nomination_inline_updates_the_flag(self, admin_client):
+        nomination = self.nomination
+        response = admin_client.post(
+            reverse("admin:nominate_nomination_change", args=[nomination.pk]),
+            {
+                "field_1": nomination.field_1,
+                "field_2": nomination.field_2,
+                "field_3": nomination.field_3,
+                "nominator": nomination.nominator_id,
+                "category": nomination.category_id,
+                "nomination_ip_address": "127.0.0.1",
+                "admin-TOTAL_FORMS": "1",
+                "admin-INITIAL_FORMS": "0",
+                "admin-MIN_NUM_FORMS": "0",
+                "admin-MAX_NUM_FORMS": "1",
+                "admin-0-nomination": nomination.pk,
+                "admin-0-valid_nomination": "",
+            },
+        )
+
+        assert response.status_code == 302
+        assert not models.Nomination.valid.filter(pk=nomination.pk).exists()
+
+    def test_rank_inline_updates_the_flag(self, admin_client):
+        rank = self.rank
+        response = admin_client.post(
+            reverse("admin:nominate_rank_change", args=[rank.pk]),
+            {
+                "membership": rank.membership_id,
+                "finalist": rank.finalist_id,
+                "position": rank.position,
+                "voter_ip_address": "127.0.0.1",
+                "admin-TOTAL_FORMS": "1",
+                "admin-INITIAL_FORMS": "0",
+                "admin-MIN_NUM_FORMS": "0",
+                "admin-MAX_NUM_FORMS": "1",
+                "admin-0-rank": rank.pk,
+                "admin-0-invalidated": "on",
+            },
+        )
+
+        assert response.status_code == 302
+        assert not models.Rank.valid.filter(pk=rank.pk).exists()
@@ -0,0 +1,196 @@
+import pytest
+
+from nomnom.nominate import factories
+from nomnom.nominate.forms import (
+    NominationForm,
+    RankForm,
+    nomination_form_schema,
+    rank_form_schema,
+)
+
+pytestmark = pytest.mark.usefixtures("db")
+
+
+@pytest.fixture(name="categories")
+def make_categories():
+    election = factories.ElectionFactory.create(state="nominating")
+    return [
+        factories.CategoryFactory.create(
+            election=election, fields=2, ballot_position=1
+        ),
+        factories.CategoryFactory.create(
+            election=election, fields=1, ballot_position=2
+        ),
+    ]
+
+
+def test_schema_is_reused_for_the_same_categories(categories):
+    assert nomination_form_schema(categories) is nomination_form_schema(categories)
+
+
+def test_schema_is_rebuilt_when_a_category_changes(categories):
+    schema = nomination_form_schema(categories)
+
+    categories[0].field_1_description = "Book Title"
+    categories[0].save()
+
+    rebuilt = nomination_form_schema(categories)
+    assert rebuilt is not schema
+    assert rebuilt.fields[f"{categories[0].id}-0-field_1"].label == "Book Title"
+
+
+def test_stale_schema_is_rebuilt_without_a_signal(categories):
+    schema = nomination_form_schema(categories)
+
+    # as if another process had changed the category
+    categories[1].fields = 2
+
+    assert nomination_form_schema(categories) is not schema
+
+
+def test_single_category_schemas_do_not_evict_the_ballot(categories):
+    ballot = nomination_form_schema(categories)
+
+    single = nomination_form_schema(categories[:1])
+
+    assert single is not ballot
+    assert list(single.slots) == [categories[0].id]
+    assert nomination_form_schema(categories) is ballot
+    assert nomination_form_schema(categories[:1]) is single
+
+
+def test_forms_do_not_share_fields(categories):
+    first = NominationForm(categories=categories)
+    second = NominationForm(categories=categories)
+
+    name = f"{categories[0].id}-0-field_1"
+    assert first.fields[name] is not second.fields[name]
+    assert first.fields[name].widget is not second.fields[name].widget
+
+
+def test_fieldsets_follow_the_categories(categories):
+    form = NominationForm(categories=categories)
+
+    wide, narrow = categories
+    assert [len(slot) for slot in form.fieldsets_grouped_by_category[wide]] == [2] * 5
+    assert [len(slot) for slot in form.fieldsets_grouped_by_category[narrow]] == [1] * 5
+
+
+def test_initial_data_from_existing_nominations(categories):
+    wide, narrow = categories
+    member = factories.NominatingMemberProfileFactory.create()
+    factories.NominationFactory.create(
+        category=wide, nominator=member, field_1="t1", field_2="a1"
+    )
+    factories.NominationFactory.create(
+        category=wide, nominator=member, field_1="t2", field_2="a2"
+    )
+    factories.NominationFactory.create(category=narrow, nominator=member, field_1="x")
+
+    form = NominationForm(categories=categories, queryset=member.nomination_set.all())
+
+    assert form.initial == {
+        f"{wide.id}-0-field_1": "t1",
+        f"{wide.id}-0-field_2": "a1",
+        f"{wide.id}-1-field_1": "t2",
+        f"{wide.id}-1-field_2": "a2",
+        f"{narrow.id}-0-field_1": "x",
+    }
+
+
+@pytest.fixture(name="finalists")
+def make_finalists(categories):
+    first, second = categories
+    return [
+        factories.FinalistFactory.create(category=second, name="Z"),
+        factories.FinalistFactory.create(category=first, name="A"),
+        factories.FinalistFactory.create(category=first, name="B"),
+        factories.FinalistFactory.create(category=first, name="C"),
+    ]
+
+
+def rank_data(finalists, *ranks):
+    return {
+        RankForm.field_key(finalist): rank for finalist, rank in zip(finalists, ranks)
+    }
+
+
+def test_rank_schema_is_reused_for_the_same_finalists(finalists):
+    assert rank_form_schema(finalists) is rank_form_schema(finalists)
+
+
+def test_rank_schema_is_rebuilt_when_a_finalist_changes(finalists):
+    schema = rank_form_schema(finalists)
+
+    finalists[1].name = "Renamed"
+    finalists[1].save()
+
+    rebuilt = rank_form_schema(finalists)
+    assert rebuilt is not schema
+    assert rebuilt.fields[RankForm.field_key(finalists[1])].label == "Renamed"
+
+
+def test_rank_schema_groups_by_category_in_ballot_order(finalists):
+    z, a, b, c = finalists
+    schema = rank_form_schema(finalists)
+
+    assert list(schema.field_names) == [a.category_id, z.category_id]
+    assert schema.field_names[a.category_id] == [
+        RankForm.field_key(f) for f in (a, b, c)
+    ]
+    assert [value for value, _ in schema.fields[RankForm.field_key(a)].choices] == [
+        None,
+        1,
+        2,
+        3,
+    ]
+
+
+def test_rank_form_initial_from_ranks(finalists):
+    z, a, b, c = finalists
+    member = factories.NominatingMemberProfileFactory.create()
+    ranks = [
+        factories.RankFactory.create(membership=member, finalist=b, position=1),
+        factories.RankFactory.create(membership=member, finalist=z, position=1),
+    ]
+
+    form = RankForm(finalists=finalists, ranks=ranks)
+
+    assert form[RankForm.field_key(b)].initial == 1
+    assert form[RankForm.field_key(a)].initial is None
+    (first_category, first_fields), _ = form.fields_grouped_by_category
+    assert first_category == a.category
+    assert [bf.name for bf in first_fields] == [
+        RankForm.field_key(f) for f in (a, b, c)
+    ]
+
+
+def test_rank_form_valid_votes(finalists):
+    z, a, b, c = finalists
+    form = RankForm(finalists=finalists, data=rank_data(finalists, "1", "2", "", "1"))
+
+    assert form.is_valid(), form.errors
+    assert form.cleaned_data["votes"] == {z: "1", a: "2", b: None, c: "1"}
+
+
+SAME = "Cannot have two finalists ranked the same"
+GAP = "Cannot have gaps in rankings"
+
+
+@pytest.mark.parametrize(
+    "ranks,errors",
+    [
+        (("", "1", "1", ""), {"A": [SAME], "B": [SAME, GAP]}),
+        (("", "2", "3", ""), {"A": ["Must start with 1"]}),
+        (("", "1", "", "3"), {"C": [GAP]}),
+        # the same rank in different categories is fine
+        (("1", "1", "2", "3"), {}),
+    ],
+)
+def test_rank_form_errors_are_per_category(finalists, ranks, errors):
+    form = RankForm(finalists=finalists, data=rank_data(finalists, *ranks))
+
+    assert form.is_valid() == (not errors)
+    assert form.errors == {
+        RankForm.field_key(f): errors[f.name] for f in finalists if f.name in errors
+    }
@@ -1,15 +1,36 @@
+from datetime import UTC, datetime
+from unittest.mock import Mock
+
 import pytest
+from django.apps import apps
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser, Group, Permission
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django_svcs.apps import svcs_from
+from waffle.testutils import override_switch
 
+from nomnom.base.feature_switches import SWITCH_HUGO_PACKET
 from nomnom.convention import ConventionConfiguration
+from nomnom.nominate.admin import set_validation
 from nomnom.nominate.factories import (
     CategoryFactory,
     ElectionFactory,
+    FinalistFactory,
     NominatingMemberProfileFactory,
     NominationFactory,
 )
-from nomnom.nominate.models import Election, Nomination
+from nomnom.nominate.models import (
+    Election,
+    ElectionAccess,
+    Nomination,
+    NominationAdminData,
+    Rank,
+    RankAdminData,
+    save_ballot,
+    save_ranks,
+)
 
 pytestmark = pytest.mark.usefixtures("db")
 
@@ -203,3 +224,246 @@ def test_removing_nomination_permissions_via_group_invalidates_nominations(
 
     assert Nomination.valid.filter(nominator=nominator).count() == 0
     assert Nomination.valid.count() == 2
+
+
+class TestSaveBallot:
+    @pytest.fixture(autouse=True)
+    def setup(self, db, category, nominator):
+        self.category = category
+        self.nominator = nominator
+
+    def ballot(self, *titles: str) -> list[Nomination]:
+        return [Nomination(category=self.category, field_1=title) for title in titles]
+
+    def save(self, *titles: str) -> list[Nomination]:
+        return save_ballot(
+            self.nominator, [self.category], self.ballot(*titles), "127.0.0.1"
+        )
+
+    def saved_titles(self) -> list[str]:
+        return list(
+            Nomination.objects.filter(nominator=self.nominator)
+            .order_by("id")
+            .values_list("field_1", flat=True)
+        )
+
+    def test_first_save_creates_everything(self):
+        created = self.save("One", "Two")
+
+        assert [n.field_1 for n in created] == ["One", "Two"]
+        assert self.saved_titles() == ["One", "Two"]
+
+    def test_unchanged_nominations_keep_their_rows(self):
+        self.save("One", "Two")
+        before = set(Nomination.objects.values_list("id", flat=True))
+
+        assert self.save("Two", "One") == []
+        assert set(Nomination.objects.values_list("id", flat=True)) == before
+
+    def test_resaving_brings_the_date_up_to_date(self):
+        (original,) = self.save("One")
+        Nomination.objects.filter(pk=original.pk).update(
+            nomination_date=datetime(2024, 1, 1, tzinfo=UTC),
+            nomination_ip_address="10.0.0.1",
+        )
+
+        self.save("One")
+
+        original.refresh_from_db()
+        assert original.nomination_date > datetime(2024, 1, 1, tzinfo=UTC)
+        assert original.nomination_ip_address == "127.0.0.1"
+
+    def test_case_and_whitespace_changes_update_in_place(self):
+        (original,) = self.save("the  hobbit")
+        set_validation(Nomination.objects.filter(pk=original.pk), False)
+
+        assert self.save("The Hobbit") == []
+
+        original.refresh_from_db()
+        assert original.field_1 == "The Hobbit"
+        assert not original.admin.valid_nomination
+        assert not original.is_valid
+
+    def test_changed_slots_reuse_rows_in_order(self):
+        first, _second = self.save("One", "Two")
+        set_validation(Nomination.objects.filter(pk=first.pk), False)
+
+        relink = self.save("Uno", "Two")
+
+        assert [n.pk for n in relink] == [first.pk]
+        assert self.saved_titles() == ["Uno", "Two"]
+        assert not NominationAdminData.objects.filter(nomination=first).exists()
+        assert Nomination.valid.filter(pk=first.pk).exists()
+
+    def test_removed_and_added_nominations(self):
+        self.save("One", "Two")
+
+        created = self.save("Two", "Three", "Four")
+
+        assert self.saved_titles() == ["Three", "Two", "Four"]
+        assert [n.field_1 for n in created] == ["Three", "Four"]
+
+        self.save("Four")
+        assert self.saved_titles() == ["Four"]
+
+    def test_other_categories_are_untouched(self):
+        other = CategoryFactory(election=self.category.election, fields=1)
+        NominationFactory(category=other, nominator=self.nominator)
+
+        self.save()
+
+        assert Nomination.objects.filter(category=other).count() == 1
+
+
+class TestSaveRanks:
+    @pytest.fixture(autouse=True)
+    def setup(self, db, category, nominator):
+        self.finalists = FinalistFactory.create_batch(4, category=category)
+        self.member = nominator
+
+    def save(self, *positions: int | None, ip_address="127.0.0.1") -> list[Rank]:
+        return save_ranks(
+            self.member,
+            Rank.objects.filter(membership=self.member),
+            dict(zip(self.finalists, positions)),
+            ip_address=ip_address,
+            user_agent="test",
+        )
+
+    def positions(self) -> dict[int, int]:
+        return dict(
+            Rank.objects.filter(membership=self.member).values_list(
+                "finalist_id", "position"
+            )
+        )
+
+    def test_first_save_creates_ranks_and_admin_data(self):
+        touched = self.save(1, 2, None, None)
+
+        assert len(touched) == 2
+        assert self.positions() == {
+            self.finalists[0].id: 1,
+            self.finalists[1].id: 2,
+        }
+        assert RankAdminData.objects.filter(rank__in=touched).count() == 2
+
+    def test_unchanged_ranks_are_not_written(self, django_assert_num_queries):
+        self.save(1, 2, None, None)
+        ranks = list(Rank.objects.filter(membership=self.member))
+
+        with django_assert_num_queries(0):
+            touched = save_ranks(
+                self.member,
+                ranks,
+                dict(zip(self.finalists, ["1", "2", None, None])),
+                ip_address="10.0.0.1",
+                user_agent="other",
+            )
+
+        assert touched == []
+        assert not RankAdminData.objects.filter(ip_address="10.0.0.1").exists()
+
+    def test_only_changed_positions_are_touched(self):
+        self.save(1, 2, None, None)
+        first = Rank.objects.get(finalist=self.finalists[0])
+
+        touched = self.save(1, None, 2, None, ip_address="10.0.0.1")
+
+        assert [rank.finalist for rank in touched] == [self.finalists[2]]
+        assert self.positions() == {
+            self.finalists[0].id: 1,
+            self.finalists[2].id: 2,
+        }
+        assert Rank.objects.get(finalist=self.finalists[0]).pk == first.pk
+        assert set(
+            RankAdminData.objects.filter(ip_address="10.0.0.1").values_list(
+                "rank__finalist", flat=True
+            )
+        ) == {self.finalists[2].id}
+
+    def test_stale_existing_ranks_upsert_on_conflict(self):
+        self.save(1, None, None, None)
+
+        # as if another submission had inserted the rank since ours was loaded
+        touched = save_ranks(
+            self.member,
+            [],
+            {self.finalists[0]: "2"},
+            ip_address=None,
+            user_agent=None,
+        )
+
+        assert len(touched) == 1
+        assert self.positions() == {self.finalists[0].id: 2}
+
+
+class TestEnrichWithUserData:
+    @pytest.fixture(autouse=True)
+    def setup(self, db, nominator):
+        nominator.user.user_permissions.add(Permission.objects.get(codename="vote"))
+        self.user_id = nominator.user.id
+
+    def add_election(self, enabled: bool | None = None) -> Election:
+        election = ElectionFactory(state=Election.STATE.VOTING)
+        if enabled is not None:
+            apps.get_model("hugopacket", "ElectionPacket").objects.create(
+                election=election, name="Packet", enabled=enabled
+            )
+        return election
+
+    def enrich(self) -> tuple[list[Election], int]:
+        request = RequestFactory().get("/")
+        # a fresh user, without any cached permissions
+        request.user = get_user_model().objects.get(id=self.user_id)
+        with CaptureQueriesContext(connection) as context:
+            elections = list(
+                Election.enrich_with_user_data(Election.objects.order_by("id"), request)
+            )
+        return elections, len(context.captured_queries)
+
+    def test_elections_are_described_for_the_user(self):
+        self.add_election()
+
+        with override_switch(SWITCH_HUGO_PACKET, active=False):
+            (election,), _ = self.enrich()
+
+        assert election.is_open_for_user
+        assert election.user_state == "Voting is open"
+        assert not election.packet_exists
+
+    def test_packets_are_attached(self):
+        self.add_election(enabled=True)
+        self.add_election(enabled=False)
+        self.add_election()
+
+        with override_switch(SWITCH_HUGO_PACKET, active=True):
+            (enabled, disabled, missing), _ = self.enrich()
+
+        assert enabled.packet_exists and enabled.packet_is_ready
+        assert disabled.packet_exists and not disabled.packet_is_ready
+        assert not missing.packet_exists
+
+    def test_queries_do_not_grow_with_elections(self):
+        self.add_election(enabled=True)
+        with override_switch(SWITCH_HUGO_PACKET, active=True):
+            # warm up any per-process lookups first
+            self.enrich()
+            _, few = self.enrich()
+
+            for i in range(5):
+                self.add_election(enabled=bool(i % 2))
+            _, many = self.enrich()
+
+        assert many == few
+
+
+def test_election_access_checks_each_permission_once():
+    user = Mock(is_anonymous=False)
+    user.has_perm.side_effect = lambda perm: perm == "nominate.vote"
+
+    access = ElectionAccess(user)
+    assert access.has_perm("nominate.vote")
+    assert not access.has_perm("nominate.nominate")
+    assert access.has_perm("nominate.vote")
+
+    assert user.has_perm.call_count == len(ElectionAccess.PERMISSIONS)
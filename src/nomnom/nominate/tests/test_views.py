@@ -5,7 +5,9 @@ from unittest.mock import Mock
 import pytest
 from django.contrib.auth.models import AnonymousUser, Permission
 from django.core import mail
+from django.db import connection
 from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from nomnom.nominate import factories, models
@@ -342,6 +344,188 @@ class TestNominationViewHTMX(NominationViewInvariants, NominationHTMXSubmitMixin
         return reverse("election:nominate", kwargs={"election_id": self.election.slug})
 
 
+class TestNominationPageQueries(TestCase):
+    # sessions, auth, the election, its categories and the member's nominations
+    QUERY_BUDGET = 10
+
+    def setup_method(self, test_method):
+        self.election = factories.ElectionFactory.create(state="nominating")
+        self.member = factories.NominatingMemberProfileFactory.create()
+        self.user = self.member.user
+        self.user.user_permissions.add(
+            Permission.objects.get(
+                codename="nominate", content_type__app_label="nominate"
+            )
+        )
+
+    def add_category(self):
+        category = factories.CategoryFactory.create(election=self.election, fields=2)
+        factories.NominationFactory.create_batch(
+            3, category=category, nominator=self.member
+        )
+
+    def page_queries(self) -> int:
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse("election:nominate", kwargs={"election_id": self.election.slug})
+            )
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    def test_query_budget(self):
+        self.add_category()
+        # warm up any per-process lookups first
+        self.page_queries()
+        small = self.page_queries()
+
+        for _ in range(5):
+            self.add_category()
+        large = self.page_queries()
+
+        assert large == small
+        assert large <= self.QUERY_BUDGET
+
+
+class TestNominationPageFragments(TestCase):
+    def setup_method(self, test_method):
+        self.election = factories.ElectionFactory.create(state="nominating")
+        self.category = factories.CategoryFactory.create(
+            election=self.election, fields=1, description="Original description"
+        )
+        self.member = factories.NominatingMemberProfileFactory.create()
+        self.user = self.member.user
+        self.user.user_permissions.add(
+            Permission.objects.get(
+                codename="nominate", content_type__app_label="nominate"
+            )
+        )
+
+    def page(self) -> str:
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("election:nominate", kwargs={"election_id": self.election.slug})
+        )
+        assert response.status_code == 200
+        return response.content.decode()
+
+    def test_category_details_are_cached(self):
+        assert "Original description" in self.page()
+
+        # an update that bypasses the model signals keeps the cached fragment
+        models.Category.objects.filter(pk=self.category.pk).update(
+            description="Sneaky description"
+        )
+        assert "Original description" in self.page()
+
+    def test_saving_the_category_replaces_the_fragment(self):
+        self.page()
+
+        self.category.description = "New description"
+        self.category.save()
+
+        page = self.page()
+        assert "New description" in page
+        assert "Original description" not in page
+
+    def test_saving_the_election_replaces_the_fragment(self):
+        self.page()
+
+        models.Category.objects.filter(pk=self.category.pk).update(
+            description="New description"
+        )
+        self.election.save()
+
+        assert "New description" in self.page()
+
+
+class TestNominationCategoryView(TestCase):
+    def setup_method(self, test_method):
+        self.election = factories.ElectionFactory.create(state="nominating")
+        self.member = factories.NominatingMemberProfileFactory.create()
+        self.user = self.member.user
+        self.user.user_permissions.add(
+            Permission.objects.get(
+                codename="nominate", content_type__app_label="nominate"
+            )
+        )
+        self.c1 = factories.CategoryFactory.create(
+            election=self.election, fields=2, ballot_position=1
+        )
+        self.c2 = factories.CategoryFactory.create(
+            election=self.election, fields=2, ballot_position=2
+        )
+
+    def submit(self, category, data, htmx=True):
+        self.client.force_login(self.user)
+        return self.client.post(
+            reverse(
+                "election:nominate-category",
+                kwargs={"election_id": self.election.slug, "category_id": category.id},
+            ),
+            data=data,
+            headers={"HX-Request": "true"} if htmx else {},
+        )
+
+    def test_saves_only_the_posted_category(self):
+        other = factories.NominationFactory.create(
+            category=self.c2, nominator=self.member
+        )
+
+        response = self.submit(self.c1, field_data(self.c1, 0, "title", "author"))
+
+        assert response.status_code == 200
+        assert list(
+            self.member.nomination_set.filter(category=self.c1).values_list(
+                "field_1", flat=True
+            )
+        ) == ["title"]
+        assert self.member.nomination_set.filter(pk=other.pk).exists()
+
+    def test_renders_only_the_category_block(self):
+        response = self.submit(self.c1, field_data(self.c1, 0, "title", "author"))
+
+        content = response.content.decode()
+        assert f'id="category_block_{self.c1.id}"' in content
+        assert f'id="category_block_{self.c2.id}"' not in content
+        assert "nominating_ballot" not in content
+
+    def test_invalid_category_is_not_saved(self):
+        response = self.submit(self.c1, field_data(self.c1, 0, "title", ""))
+
+        assert response.status_code == 200
+        assert "This field is required" in response.content.decode()
+        assert not self.member.nomination_set.exists()
+
+    def test_category_from_another_election_is_not_found(self):
+        elsewhere = factories.CategoryFactory.create(fields=2)
+        response = self.submit(elsewhere, field_data(elsewhere, 0, "title", "author"))
+
+        assert response.status_code == 404
+
+    def test_without_htmx_redirects_to_the_category(self):
+        response = self.submit(
+            self.c1, field_data(self.c1, 0, "title", "author"), htmx=False
+        )
+
+        assert response.status_code == 302
+        assert response.url.endswith(f"#category_{self.c1.id}")
+
+    def test_full_page_posts_to_category_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("election:nominate", kwargs={"election_id": self.election.slug})
+        )
+
+        assert (
+            reverse(
+                "election:nominate-category",
+                kwargs={"election_id": self.election.slug, "category_id": self.c1.id},
+            )
+            in response.content.decode()
+        )
+
+
 class TestAdminNominationView(TestCase):
     def setup_method(self, test_method):
         self.election = factories.ElectionFactory(state="nominating")
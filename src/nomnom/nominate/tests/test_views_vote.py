@@ -2,7 +2,9 @@ from itertools import chain
 from typing import Protocol, cast
 
 import pytest
+from django.db import connection
 from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
 from pytest_lazy_fixtures import lf
 
 from nomnom.nominate import factories, models
@@ -13,6 +15,9 @@ pytestmark = pytest.mark.django_db
 
 with_db = pytest.mark.django_db
 
+# sessions, auth, the election, its categories, finalists and the member's ranks
+VOTE_PAGE_QUERY_BUDGET = 10
+
 
 class Submit(Protocol):
     def __call__(self, data: dict, extra: dict | None = None) -> HttpResponse: ...
@@ -346,3 +351,40 @@ def make_category_2(election):
     factories.FinalistFactory.create(category=category)
     factories.FinalistFactory.create(category=category)
     return category
+
+
+def _vote_page_queries(tp, member, view_url) -> int:
+    tp.client.force_login(member.user)
+    with CaptureQueriesContext(connection) as context:
+        response = tp.get(view_url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+def test_vote_page_query_budget(tp, member, election, view_url):
+    def add_category():
+        category = factories.CategoryFactory.create(election=election)
+        for finalist in factories.FinalistFactory.create_batch(6, category=category):
+            factories.RankFactory.create(finalist=finalist, membership=member)
+
+    add_category()
+    # warm up any per-process lookups first
+    _vote_page_queries(tp, member, view_url)
+    small = _vote_page_queries(tp, member, view_url)
+
+    for _ in range(5):
+        add_category()
+    large = _vote_page_queries(tp, member, view_url)
+
+    assert large == small
+    assert large <= VOTE_PAGE_QUERY_BUDGET
+
+
+def test_vote_page_category_fragment_follows_category_changes(tp, member, c1, view_url):
+    tp.client.force_login(member.user)
+    assert c1.name in tp.get(view_url).content.decode()
+
+    c1.name = "Best Renamed Thing"
+    c1.save()
+
+    assert "Best Renamed Thing" in tp.get(view_url).content.decode()
@@ -19,6 +19,11 @@ urlpatterns = [
         name="closed",
     ),
     path("<election_id>/nominate/", views.NominationView.as_view(), name="nominate"),
+    path(
+        "<election_id>/nominate/<int:category_id>/",
+        views.NominationCategoryView.as_view(),
+        name="nominate-category",
+    ),
     path("<election_id>/vote/", views.VoteView.as_view(), name="vote"),
     path(
         "<election_id>/edit_nominating_ballot/<member_id>",
@@ -1,7 +1,7 @@
 # ruff: noqa: F401
 from .base import access_denied, login_error
 from .election import ClosedElectionView, ElectionModeView, ElectionView
-from .nominate import AdminNominationView, NominationView
+from .nominate import AdminNominationView, NominationCategoryView, NominationView
 from .vote import (
     AdminVoteView,
     CategoryResultsPrettyView,
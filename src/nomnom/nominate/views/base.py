@@ -1,5 +1,3 @@
-import functools
-
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.http import HttpRequest, HttpResponse
@@ -8,14 +6,15 @@ from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 
 from nomnom.nominate import models
+from nomnom.view_utils import request_cached
 
 
 class ElectionView(TemplateView):
-    @functools.lru_cache
+    @request_cached
     def election(self):
         return get_object_or_404(models.Election, slug=self.kwargs.get("election_id"))
 
-    @functools.lru_cache
+    @request_cached
     def categories(self):
         return models.Category.objects.filter(election=self.election())
 
@@ -40,7 +39,7 @@ class NominatorView(ElectionView):
         ctx.update(super().get_context_data(**kwargs))
         return ctx
 
-    @functools.lru_cache
+    @request_cached
     def profile(self) -> models.NominatingMemberProfile:
         try:
             profile = self.request.user.convention_profile
@@ -1,8 +1,3 @@
-import functools
-from datetime import datetime
-from itertools import groupby
-from operator import attrgetter
-
 from django.contrib import messages
 from django.contrib.auth.decorators import (
     login_required,
@@ -18,46 +13,37 @@ from ipware import get_client_ip
 from render_block import render_block_to_string
 
 from nomnom.nominate import models
+from nomnom.nominate.ballots import NominationBallot
 from nomnom.nominate.decorators import user_passes_test_or_forbidden
 from nomnom.nominate.forms import NominationForm
 from nomnom.nominate.tasks import link_nominations_to_works, send_ballot
+from nomnom.view_utils import request_cached
 
 from .base import NominatorView
 
 
 class NominationView(NominatorView):
     template_name = "nominate/nominate.html"
+    # the per-category save buttons post here, if set
+    category_save_url_name: str | None = "election:nominate-category"
+
+    @request_cached
+    def ballot(self) -> NominationBallot:
+        return NominationBallot(self.election(), self.profile())
 
     def get_context_data(self, **kwargs):
-        nominations = kwargs.pop("nominations", None)
-        most_recent: datetime | None = None
-        if nominations is None:
-            if self.profile() and self.election():
-                nominations = groupby(
-                    self.profile().nomination_set.filter(
-                        category__election=self.election()
-                    ),
-                    attrgetter("category"),
-                )
-                nominations = {cat: list(noms) for cat, noms in nominations}
-                if nominations:
-                    most_recent = (
-                        self.profile()
-                        .nomination_set.filter(category__election=self.election())
-                        .latest("nomination_date")
-                    ).nomination_date
+        ballot = self.ballot()
         form = kwargs.pop("form", None)
         if form is None:
             form = NominationForm(
-                categories=list(self.categories()),
-                queryset=self.profile().nomination_set.filter(
-                    category__election=self.election()
-                ),
+                categories=ballot.categories, nominations=ballot.nominations
             )
         ctx = {
             "form": form,
-            "nominations": nominations,
-            "most_recent": most_recent,
+            "nominations": kwargs.pop("nominations", ballot.nominations_by_category),
+            "most_recent": ballot.most_recent,
+            "category_save_url_name": self.category_save_url_name,
+            "ballot_version": ballot.content_version,
         }
         ctx.update(super().get_context_data(**kwargs))
         return ctx
@@ -65,6 +51,25 @@ class NominationView(NominatorView):
     def can_nominate(self, request) -> bool:
         return self.election().user_can_nominate(request.user)
 
+    def saved_anchor(self, request: HttpRequest) -> str | None:
+        # Kind of hacky but works - the place on the page is passed in the submit
+        return request.POST.get("save_all", None)
+
+    def form_categories(self) -> list[models.Category]:
+        """The categories that a submitted ballot covers."""
+        return self.ballot().categories
+
+    def render_form(self, request: HttpRequest, form: NominationForm) -> HttpResponse:
+        """Render the ballot form for an htmx request."""
+        return HttpResponse(
+            render_block_to_string(
+                "nominate/nominate.html",
+                "form",
+                context=self.get_context_data(form=form),
+                request=request,
+            )
+        )
+
     def get_template_names(self) -> list[str]:
         if self.can_nominate(self.request):
             return super().get_template_names()
@@ -88,27 +93,24 @@ class NominationView(NominatorView):
         profile = self.profile()
         client_ip_address, _ignored = get_client_ip(request=request)
 
-        # Kind of hacky but works - the place on the page is passwed in the submit
-        category_saved = request.POST.get("save_all", None)
+        category_saved = self.saved_anchor(request)
         should_email = "save_and_email" in request.POST
 
-        form = NominationForm(categories=list(self.categories()), data=request.POST)
+        form = NominationForm(categories=self.form_categories(), data=request.POST)
 
         if form.is_valid():
-            # first, we clear all of the existing nominations for this user and election; they've
-            # submitted a new ballot, so we're going to start from scratch.
-            profile.nomination_set.filter(category__election=self.election()).delete()
-
-            # now, we're going to iterate through the formsets and save the nominations
-            for nomination in form.cleaned_data["nominations"]:
-                nomination.nominator = profile
-                nomination.nomination_ip_address = client_ip_address
-            nominations = models.Nomination.objects.bulk_create(
-                form.cleaned_data["nominations"]
+            # only the nominations that actually changed are written; unchanged ones
+            # keep their canonicalization.
+            nominations = models.save_ballot(
+                profile,
+                form.categories,
+                form.cleaned_data["nominations"],
+                client_ip_address,
             )
 
             def on_commit_callback():
-                link_nominations_to_works.delay([n.pk for n in nominations])
+                if nominations:
+                    link_nominations_to_works.delay([n.pk for n in nominations])
                 if should_email:
                     send_ballot.delay(self.election().id, profile.id)
                 self.post_save_hook(request, did_email=should_email)
@@ -116,14 +118,7 @@ class NominationView(NominatorView):
             transaction.on_commit(on_commit_callback)
 
             if request.htmx:
-                return HttpResponse(
-                    render_block_to_string(
-                        "nominate/nominate.html",
-                        "form",
-                        context=self.get_context_data(form=form),
-                        request=request,
-                    )
-                )
+                return self.render_form(request, form)
             else:
                 url = reverse(
                     "election:nominate",
@@ -135,14 +130,7 @@ class NominationView(NominatorView):
         else:
             messages.warning(request, "Something wasn't quite right with your ballot")
             if request.htmx:
-                return HttpResponse(
-                    render_block_to_string(
-                        "nominate/nominate.html",
-                        "form",
-                        context=self.get_context_data(form=form),
-                        request=request,
-                    )
-                )
+                return self.render_form(request, form)
             else:
                 return self.render_to_response(self.get_context_data(form=form))
 
@@ -153,8 +141,52 @@ class NominationView(NominatorView):
         messages.success(request, message)
 
 
+class NominationCategoryView(NominationView):
+    """Save a single category of the nominating ballot.
+
+    The per-category save buttons post here via htmx; only that category is
+    validated, saved and re-rendered.
+    """
+
+    http_method_names = ["post"]
+
+    @request_cached
+    def category(self) -> models.Category:
+        return get_object_or_404(
+            models.Category,
+            election=self.election(),
+            pk=self.kwargs.get("category_id"),
+        )
+
+    def form_categories(self) -> list[models.Category]:
+        return [self.category()]
+
+    def saved_anchor(self, request: HttpRequest) -> str | None:
+        return f"category_{self.category().id}"
+
+    def render_form(self, request: HttpRequest, form: NominationForm) -> HttpResponse:
+        category = self.category()
+        return HttpResponse(
+            render_block_to_string(
+                "nominate/nominate.html",
+                "category",
+                context={
+                    "election": self.election(),
+                    "form": form,
+                    "category": category,
+                    "fieldset_list": form.fieldsets_grouped_by_category[category],
+                    "category_save_url_name": self.category_save_url_name,
+                    "ballot_version": self.ballot().content_version,
+                },
+                request=request,
+            )
+        )
+
+
 class AdminNominationView(NominationView):
     template_name = "nominate/admin_nominate.html"
+    # admins always save the whole ballot, since each save emails the member
+    category_save_url_name = None
 
     @method_decorator(login_required)
     @method_decorator(user_passes_test_or_forbidden(lambda u: u.is_staff))
@@ -168,7 +200,7 @@ class AdminNominationView(NominationView):
         # is always `True`
         return True
 
-    @functools.lru_cache
+    @request_cached
     def profile(self) -> models.NominatingMemberProfile:
         return get_object_or_404(
             models.NominatingMemberProfile, id=self.kwargs.get("member_id")
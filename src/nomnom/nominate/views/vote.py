@@ -1,6 +1,5 @@
-import functools
 from collections.abc import Generator
-from datetime import datetime, timezone
+from datetime import datetime
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
@@ -18,6 +17,7 @@ from render_block import render_block_to_string
 
 from django_svcs.apps import svcs_from
 from nomnom.nominate import models
+from nomnom.nominate.ballots import VotingBallot
 from nomnom.nominate.decorators import user_passes_test_or_forbidden
 from nomnom.nominate.forms import RankForm
 from nomnom.nominate.hugo_awards import (
@@ -28,6 +28,7 @@ from nomnom.nominate.hugo_awards import (
 from nomnom.nominate.tasks import send_voting_ballot
 from nomnom.nominate.templatetags import nomnom_filters
 from nomnom.convention import HugoAwards
+from nomnom.view_utils import request_cached
 
 from .base import ElectionView, NominatorView
 
@@ -35,25 +36,25 @@ from .base import ElectionView, NominatorView
 class VoteView(NominatorView):
     template_name = "nominate/vote.html"
 
+    @request_cached
+    def ballot(self) -> VotingBallot:
+        return VotingBallot(self.election(), self.profile())
+
     def build_ballot_forms(self, data=None) -> RankForm:
         args = [] if data is None else [data]
         return RankForm(*args, finalists=self.finalists(), ranks=self.ranks())
 
-    def finalists(self):
-        return models.Finalist.objects.select_related("category").filter(
-            category__election=self.election()
-        )
+    def finalists(self) -> list[models.Finalist]:
+        return self.ballot().finalists
 
-    def ranks(self):
-        return models.Rank.objects.select_related("finalist__category").filter(
-            finalist__in=self.finalists(), membership=self.profile()
-        )
+    def ranks(self) -> list[models.Rank]:
+        return self.ballot().ranks
 
     def get_context_data(self, **kwargs):
         form = kwargs.pop("form", None)
         if form is None:
             form = self.build_ballot_forms()
-        ctx = {"form": form}
+        ctx = {"form": form, "ballot_version": self.ballot().content_version}
         ctx.update(super().get_context_data(**kwargs))
         return ctx
 
@@ -79,46 +80,14 @@ class VoteView(NominatorView):
         form = self.build_ballot_forms(request.POST)
 
         if form.is_valid():
-            ranks_to_create = []
-            ranks_to_delete = []
-            for finalist, vote in form.cleaned_data["votes"].items():
-                rank = models.Rank(finalist=finalist, membership=self.profile())
-
-                if vote is None:
-                    ranks_to_delete.append(rank)
-                else:
-                    rank.position = int(vote)
-                    rank.voter_ip_address = client_ip_address
-                    rank.rank_date = datetime.now(timezone.utc)
-                    ranks_to_create.append(rank)
-
-            created_ranks = models.Rank.objects.bulk_create(
-                ranks_to_create,
-                update_conflicts=True,
-                unique_fields=["finalist", "membership"],
-                update_fields=["position", "voter_ip_address", "rank_date"],
+            models.save_ranks(
+                self.profile(),
+                self.ranks(),
+                form.cleaned_data["votes"],
+                ip_address=client_ip_address,
+                user_agent=user_agent,
             )
 
-            admin_records = [
-                models.RankAdminData(
-                    rank=rank, ip_address=client_ip_address, user_agent=user_agent
-                )
-                for rank in created_ranks
-            ]
-            models.RankAdminData.objects.bulk_create(
-                admin_records,
-                update_conflicts=True,
-                unique_fields=["rank"],
-                update_fields=["ip_address", "user_agent"],
-            )
-
-            # Find all ranks that are in the ranks_to_delete list in the database
-            # using the ORM.
-            models.Rank.objects.filter(
-                finalist__in=[rank.finalist for rank in ranks_to_delete],
-                membership=self.profile(),
-            ).delete()
-
             def on_commit_callback():
                 self.post_save_hook(request)
 
@@ -169,10 +138,7 @@ class EmailVotes(NominatorView):
             self.template_name = "nominate/email/votes_for_user.html"
             self.content_type = "text/html"
 
-        finalists = models.Finalist.objects.filter(category__election=self.election())
-        ranks = models.Rank.objects.filter(
-            finalist__in=finalists, membership=self.profile()
-        )
+        ballot = VotingBallot(self.election(), self.profile())
 
         report_date = datetime.utcnow()
         site_url = Site.objects.get_current().domain
@@ -181,7 +147,7 @@ class EmailVotes(NominatorView):
         )
         ballot_url = f"https://{site_url}{ballot_path}"
 
-        form = RankForm(finalists=finalists, ranks=ranks)
+        form = RankForm(finalists=ballot.finalists, ranks=ballot.ranks)
         # run "clean" to populate the form with the existing data and
         # group the finalists by category into display-oriented structures.
         # We're doing a bit of a hack here, because full_clean requires posted
@@ -227,7 +193,7 @@ class AdminVoteView(VoteView):
         # is always `True`
         return True
 
-    @functools.lru_cache
+    @request_cached
     def profile(self):
         return get_object_or_404(
             models.NominatingMemberProfile, id=self.kwargs.get("member_id")
@@ -294,7 +260,7 @@ class ElectionResultsPrettyView(ElectionView):
 class CategoryResultsPrettyView(ElectionView):
     template_name = "admin/nominate/category/results.html"
 
-    @functools.lru_cache
+    @request_cached
     def category(self):
         return get_object_or_404(models.Category, id=self.kwargs.get("category_id"))
 
@@ -1,5 +1,4 @@
 import csv
-import functools
 from abc import abstractmethod
 from collections.abc import Generator, Iterable
 from datetime import UTC, datetime
@@ -12,6 +11,8 @@ from django.http import HttpRequest, HttpResponse, HttpResponseBase
 from django.shortcuts import render
 from django.views.generic import View
 
+from nomnom.view_utils import request_cached
+
 
 class Report:
     @abstractmethod
@@ -86,7 +87,7 @@ class ReportView(View):
 
         return report_class
 
-    @functools.lru_cache
+    @request_cached
     def report(self) -> Report:
         return self.prepare_report()
 
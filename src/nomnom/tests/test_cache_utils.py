@@ -0,0 +1,21 @@
+from django.core.cache import cache
+
+from nomnom.cache_utils import bump_version_token, version_token
+
+
+def test_token_is_stable_until_bumped():
+    cache.delete("test:version")
+    version = version_token("test:version")
+
+    assert version_token("test:version") == version
+
+    bump_version_token("test:version")
+    assert version_token("test:version") != version
+
+
+def test_lost_tokens_are_replaced():
+    version = version_token("test:version")
+
+    cache.delete("test:version")
+
+    assert version_token("test:version") not in (None, version)
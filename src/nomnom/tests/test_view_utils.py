@@ -0,0 +1,150 @@
+import gc
+import weakref
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+
+from nomnom.nominate import factories
+from nomnom.nominate.ballots import NominationBallot, VotingBallot
+from nomnom.nominate.forms import RankForm
+from nomnom.nominate.views import NominationView
+from nomnom.view_utils import request_cached
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    @request_cached
+    def value(self, offset=0):
+        self.calls += 1
+        return self.calls + offset
+
+
+def test_results_are_cached_on_the_instance():
+    counter = Counter()
+
+    assert counter.value() == 1
+    assert counter.value() == 1
+    assert counter.calls == 1
+
+
+def test_arguments_are_part_of_the_key():
+    counter = Counter()
+
+    assert counter.value() == 1
+    assert counter.value(offset=10) == 12
+    assert counter.value(offset=10) == 12
+    assert counter.calls == 2
+
+
+def test_instances_do_not_share_results():
+    first, second = Counter(), Counter()
+    first.calls = 100
+
+    assert first.value() == 101
+    assert second.value() == 1
+
+
+def test_instances_are_not_kept_alive():
+    counter = Counter()
+    counter.value()
+    ref = weakref.ref(counter)
+
+    del counter
+    gc.collect()
+
+    assert ref() is None
+
+
+@pytest.mark.django_db
+def test_views_do_not_accumulate_across_requests(client, monkeypatch):
+    election = factories.ElectionFactory.create(state="nominating")
+    factories.CategoryFactory.create(election=election, fields=2)
+    member = factories.NominatingMemberProfileFactory.create()
+    member.user.user_permissions.add(
+        Permission.objects.get(codename="nominate", content_type__app_label="nominate")
+    )
+    client.force_login(member.user)
+
+    views: list[weakref.ref] = []
+    setup = NominationView.setup
+
+    def tracking_setup(self, request, *args, **kwargs):
+        views.append(weakref.ref(self))
+        setup(self, request, *args, **kwargs)
+
+    monkeypatch.setattr(NominationView, "setup", tracking_setup)
+
+    url = reverse("election:nominate", kwargs={"election_id": election.slug})
+    for _ in range(25):
+        assert client.get(url).status_code == 200
+    gc.collect()
+
+    assert len(views) == 25
+    assert [ref for ref in views if ref() is not None] == []
+
+
+def track_instances(monkeypatch, cls) -> list[weakref.ref]:
+    instances: list[weakref.ref] = []
+    init = cls.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        instances.append(weakref.ref(self))
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(cls, "__init__", tracking_init)
+    return instances
+
+
+# saves schedule on-commit work that refers to the view, which a test transaction
+# would hold on to
+@pytest.mark.django_db(transaction=True)
+def test_category_saves_do_not_keep_views_or_ballots(client, monkeypatch):
+    election = factories.ElectionFactory.create(state="nominating")
+    category = factories.CategoryFactory.create(election=election, fields=1)
+    member = factories.NominatingMemberProfileFactory.create()
+    member.user.user_permissions.add(
+        Permission.objects.get(codename="nominate", content_type__app_label="nominate")
+    )
+    client.force_login(member.user)
+    ballots = track_instances(monkeypatch, NominationBallot)
+
+    url = reverse(
+        "election:nominate-category",
+        kwargs={"election_id": election.slug, "category_id": category.id},
+    )
+    for i in range(5):
+        response = client.post(
+            url,
+            {f"{category.id}-0-field_1": f"Title {i}"},
+            headers={"HX-Request": "true"},
+        )
+        assert response.status_code == 200
+    gc.collect()
+
+    assert len(ballots) == 5
+    assert [ref for ref in ballots if ref() is not None] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_voting_does_not_keep_views_or_ballots(client, monkeypatch):
+    election = factories.ElectionFactory.create(state="voting")
+    category = factories.CategoryFactory.create(election=election)
+    finalist = factories.FinalistFactory.create(category=category)
+    member = factories.NominatingMemberProfileFactory.create()
+    member.user.user_permissions.add(
+        Permission.objects.get(codename="vote", content_type__app_label="nominate")
+    )
+    client.force_login(member.user)
+    ballots = track_instances(monkeypatch, VotingBallot)
+
+    url = reverse("election:vote", kwargs={"election_id": election.slug})
+    for _ in range(4):
+        assert client.get(url).status_code == 200
+    assert client.post(url, {RankForm.field_key(finalist): "1"}).status_code == 302
+    gc.collect()
+
+    assert len(ballots) == 5
+    assert [ref for ref in ballots if ref() is not None] == []
@@ -0,0 +1,36 @@
+import functools
+from collections.abc import Callable
+from typing import Concatenate, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+S = TypeVar("S")
+
+
+def request_cached(
+    method: Callable[Concatenate[S, P], R],
+) -> Callable[Concatenate[S, P], R]:
+    """Memoize a method on the instance it is called on.
+
+    Django makes a new view instance for every request, so on a view this caches
+    for the duration of the request. Unlike `functools.lru_cache`, the results
+    live and die with the instance, rather than in a process-wide cache that
+    keeps every view (and its request) alive and is shared between requests.
+    """
+    attr = f"_request_cached_{method.__qualname__}"
+
+    @functools.wraps(method)
+    def wrapper(self, *args: P.args, **kwargs: P.kwargs) -> R:
+        try:
+            results = self.__dict__[attr]
+        except KeyError:
+            results = self.__dict__[attr] = {}
+
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            return results[key]
+        except KeyError:
+            result = results[key] = method(self, *args, **kwargs)
+            return result
+
+    return wrapper